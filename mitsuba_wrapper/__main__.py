@@ -1,13 +1,26 @@
 if __name__ == "__main__":
     import mitsuba as mi
 
-    # We must set this before importing any other Mitsuba modules
-    mi.set_variant("scalar_spectral")
-    # mi.set_variant("llvm_ad_rgb")
-    # mi.set_variant("scalar_rgb")
+    # We must set this before importing any other Mitsuba modules. To render with whichever variant renders the scene
+    # the fastest on this machine instead, use `select_variant` (which calibrates every variant the first time).
+    variant = "scalar_spectral"
+    mi.set_variant(variant)
     mi.set_log_level(mi.LogLevel.Debug)
 
     from mitsuba_wrapper.crt_scene import my_scene
+    from mitsuba_wrapper.film import HDRFilm
+    from mitsuba_wrapper.integrator import AOV, Stokes
+    from mitsuba_wrapper.intern import intern
+    from mitsuba_wrapper.output import ImageWriter
+    from mitsuba_wrapper.references import check_references
+    from mitsuba_wrapper.tracing import Tracer, load_scene, render_synced, trace, tracing
+    from mitsuba_wrapper.variant import polarized_variant, requires_polarization
+
+    # Stokes integrators and polarizers need the polarized counterpart of the variant. The models only hold scalar
+    # types, which are shared between variants, so the scene remains valid after switching.
+    if requires_polarization(my_scene):
+        variant = polarized_variant(variant)
+        mi.set_variant(variant)
 
     # mi_scene1 = mi.load_dict(scene1)
     # mi.xml.dict_to_xml(scene1, "scene1.xml")
@@ -15,13 +28,29 @@ if __name__ == "__main__":
     # mi.Bitmap(image1).write("scene1.exr")
 
     # mi_scene2 = mi.load_dict(cbox.model_dump(mode="python", exclude_none=True))
-    # mi.xml.dict_to_xml(cbox.model_dump(mode="python", exclude_none=True), "scene2.xml")
+    # export_xml(cbox, "scene2.xml")
     # image2 = mi.render(mi_scene2)
     # mi.Bitmap(image2).write("scene2.exr")
 
 
-    mi_scene = mi.load_dict(my_scene.model_dump(mode="python", exclude_none=True))
-    assert isinstance(mi_scene, mi.Scene)
+    # Record how long each stage takes (and how much memory it uses); open the trace in chrome://tracing or Perfetto.
+    tracer = Tracer()
+    with tracing(tracer):
+        # Catch broken references before Mitsuba starts loading meshes.
+        check_references(my_scene).raise_for_errors()
+        interned = intern(my_scene)
+        mi_scene = load_scene(interned)
 
-    image = mi.render(mi_scene, spp=31**2)
-    mi.Bitmap(image).write("my_first_render.exr")
+        film = my_scene.sensor.film
+        match (my_scene.integrator, film):
+            case (AOV() as integrator, HDRFilm(pixel_format=pixel_format)):
+                channel_names = integrator.channel_names(pixel_format)
+            case (Stokes() as integrator, HDRFilm(pixel_format=pixel_format)):
+                channel_names = integrator.channel_names(pixel_format, variant)
+            case _:
+                channel_names = None
+        with ImageWriter(film) as writer:
+            with trace("render"):
+                image = render_synced(mi_scene, spp=31**2)
+            writer.submit(image, "my_first_render", channel_names)
+    tracer.write("my_first_render.trace.json")
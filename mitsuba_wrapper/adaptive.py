@@ -0,0 +1,222 @@
+import math
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Self, final
+
+import mitsuba as mi
+import numpy as np
+import numpy.typing as npt
+
+from mitsuba_wrapper.multiview import set_crop_window
+from mitsuba_wrapper.roi import widen_by_filter
+from mitsuba_wrapper.sampler import Sampler
+from mitsuba_wrapper.scene import Scene
+from mitsuba_wrapper.tracing import load_scene, render_synced, trace
+
+type Tile = tuple[int, int, int, int]
+
+# Fewest batches the noise of a pass can be estimated from.
+_MIN_PASSES = 2
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class AdaptiveResult:
+    image: npt.NDArray[np.float32]
+    # Samples taken for every pixel.
+    samples: npt.NDArray[np.int64]
+    # Estimated relative standard error of every tile, as an image of tiles.
+    error: npt.NDArray[np.float32]
+    # Number of refinement rounds after the base pass.
+    rounds: int
+
+    @property
+    def total_samples(self: Self) -> int:
+        return int(self.samples.sum())
+
+
+class _Accumulator:
+    """
+    Merges renders of regions of an image, each counting as one batch of samples, weighted by their sample counts.
+
+    The spread of the batch means of a pixel estimates the variance of its samples: with `n_i` samples in a batch of
+    mean `m_i`, and `N` samples of mean `m` in total, `sum(n_i * (m_i - m)**2) / (batches - 1)` estimates it without
+    bias.
+    """
+
+    def __init__(self, height: int, width: int, channels: int) -> None:
+        super().__init__()
+        self.samples: npt.NDArray[np.int64] = np.zeros((height, width), dtype=np.int64)
+        self.batches: npt.NDArray[np.int64] = np.zeros((height, width), dtype=np.int64)
+        self.sum: npt.NDArray[np.float64] = np.zeros((height, width, channels))
+        self.sum_squares: npt.NDArray[np.float64] = np.zeros((height, width, channels))
+
+    def add(self, x: int, y: int, image: npt.NDArray[np.float32], spp: int) -> None:
+        region = np.s_[y : y + image.shape[0], x : x + image.shape[1]]
+        self.samples[region] += spp
+        self.batches[region] += 1
+        self.sum[region] += spp * image
+        self.sum_squares[region] += spp * np.square(image, dtype=np.float64)
+
+    def mean(self) -> npt.NDArray[np.float64]:
+        return self.sum / np.maximum(self.samples, 1)[..., None]
+
+    def relative_error(self, epsilon: float) -> npt.NDArray[np.float64]:
+        """
+        Returns the relative standard error of every pixel, over its color channels (the first three at most).
+        """
+        samples = np.maximum(self.samples, 1)[..., None]
+        mean = self.sum / samples
+        spread = np.maximum(self.sum_squares - samples * np.square(mean), 0.0)
+        variance = spread / np.maximum(self.batches - 1, 1)[..., None] / samples
+        color = np.s_[..., : min(3, mean.shape[2])]
+        return np.sqrt(variance[color].mean(axis=-1)) / (np.abs(mean[color]).mean(axis=-1) + epsilon)
+
+
+def _split(window: Tile, tile_size: int) -> list[Tile]:
+    (left, top, width, height) = window
+    return [
+        (x, y, min(tile_size, left + width - x), min(tile_size, top + height - y))
+        for y in range(top, top + height, tile_size)
+        for x in range(left, left + width, tile_size)
+    ]
+
+
+def _tile_errors(
+    pixel_error: npt.NDArray[np.float64], window: Tile, tiles: list[Tile], tile_size: int
+) -> npt.NDArray[np.float32]:
+    """
+    Returns the root mean square of the relative error of the pixels of every tile, as an image of tiles.
+    """
+    (left, top, width, height) = window
+    errors = np.zeros((math.ceil(height / tile_size), math.ceil(width / tile_size)), dtype=np.float32)
+    for index, (x, y, tile_width, tile_height) in enumerate(tiles):
+        region = pixel_error[y - top : y - top + tile_height, x - left : x - left + tile_width]
+        errors.flat[index] = np.sqrt(np.mean(np.square(region)))
+    return errors
+
+
+def _extra_spp(error: float, target: float, taken: int, max_spp: int) -> int:
+    """
+    Returns how many more samples per pixel a tile with an error above the target takes in a round.
+    """
+    # Variance falls with the number of samples, so this many more reach the target, if the estimate holds. At most as
+    # many as were taken are added, so that the estimate is refined before spending more.
+    needed = math.ceil(taken * ((error / target) ** 2 - 1))
+    return min(1 << max(0, math.ceil(math.log2(max(needed, 1)))), max(taken, 1), max_spp - taken)
+
+
+def _refine(
+    render: Callable[[Tile, int], npt.NDArray[np.float32]],
+    accumulator: _Accumulator,
+    window: Tile,
+    tiles: list[Tile],
+    errors: npt.NDArray[np.float32],
+    *,
+    target: float,
+    max_spp: int,
+    sampler: Sampler,
+) -> bool:
+    """
+    Renders every tile still above the target, and below `max_spp`, again with more samples, and returns whether
+    there were any.
+    """
+    (left, top, _, _) = window
+    refined = False
+    for index, tile in enumerate(tiles):
+        (x, y, _, _) = tile
+        error = float(errors.flat[index])
+        taken = int(accumulator.samples[y - top, x - left])
+        if error <= target or taken >= max_spp:
+            continue
+        extra = sampler.valid_sample_count(_extra_spp(error, target, taken, max_spp))
+        accumulator.add(x - left, y - top, render(tile, extra), extra)
+        refined = True
+    return refined
+
+
+def render_adaptive(
+    scene: Scene,
+    target: float,
+    *,
+    spp: None | int = None,
+    passes: int = 4,
+    tile_size: int = 32,
+    max_spp: None | int = None,
+    max_rounds: int = 8,
+    seed: int = 0,
+    epsilon: float = 1e-3,
+) -> AdaptiveResult:
+    """
+    Renders the main sensor of a scene until every tile of its image reaches a target noise level, spending samples
+    only where they are needed.
+
+    A base pass renders the whole image in several batches, whose spread gives the noise of every pixel. Each round
+    then renders the tiles still above the target again with more samples and a new seed, cropping the film to them
+    widened by the radius of the reconstruction filter (see `widen_by_filter`), and merges their interiors into the
+    image weighted by their sample counts.
+
+    NOTE: In JIT variants, kernels depend on the number of samples per pixel and on the size of the crop, so the
+    extra samples of a round are rounded up to a power of two, which keeps the number of kernels to compile low.
+
+    Args:
+        scene: The scene.
+        target: Relative standard error every tile should reach, as the root mean square over its pixels, e.g. 0.02.
+        spp: Samples per pixel of the base pass. Defaults to those of the sensor's sampler.
+        passes: Number of batches the base pass is split into (at least two).
+        tile_size: Width and height of the tiles, in pixels.
+        max_spp: Most samples per pixel of any tile. Defaults to 16 times those of the base pass.
+        max_rounds: Most rounds of refinement after the base pass.
+        seed: Seed of the first batch; every later render uses the next one.
+        epsilon: Added to pixel values when computing their relative error, so that black pixels do not count as
+            infinitely noisy.
+
+    Raises:
+        ValueError: If the base pass is split into fewer than two batches.
+    """
+    if passes < _MIN_PASSES:
+        raise ValueError(f"The noise of the base pass can only be estimated from two batches or more, not {passes}")
+    sampler = scene.sensor.sampler
+    spp = spp or sampler.sample_count
+    # NOTE: Mitsuba rounds sample counts its samplers do not support up, which the weights of the batches have to
+    # account for.
+    batch_spp = sampler.valid_sample_count(max(1, spp // passes))
+    max_spp = max_spp or 16 * batch_spp * passes
+    film = scene.sensor.film
+    window = film.crop_window
+
+    mi_scene = load_scene(scene)
+    params = mi.traverse(mi_scene)
+    seeds = iter(range(seed, 2**32))
+
+    def render(tile: Tile, tile_spp: int) -> npt.NDArray[np.float32]:
+        rendered = widen_by_filter(film, tile)
+        set_crop_window(params, rendered)
+        with trace("render", tile=tile, spp=tile_spp):
+            image = np.array(render_synced(mi_scene, spp=tile_spp, seed=next(seeds)), dtype=np.float32)
+        (x, y, width, height) = tile
+        (x0, y0, _, _) = rendered
+        return image[y - y0 : y - y0 + height, x - x0 : x - x0 + width]
+
+    with trace("base_pass"):
+        batches = [render(window, batch_spp) for _ in range(passes)]
+    accumulator = _Accumulator(window[3], window[2], batches[0].shape[2])
+    for batch in batches:
+        accumulator.add(0, 0, batch, batch_spp)
+    del batches
+
+    tiles = _split(window, tile_size)
+    rounds = 0
+    errors = _tile_errors(accumulator.relative_error(epsilon), window, tiles, tile_size)
+    while rounds < max_rounds:
+        if not _refine(render, accumulator, window, tiles, errors, target=target, max_spp=max_spp, sampler=sampler):
+            break
+        rounds += 1
+        errors = _tile_errors(accumulator.relative_error(epsilon), window, tiles, tile_size)
+
+    return AdaptiveResult(
+        image=accumulator.mean().astype(np.float32),
+        samples=accumulator.samples,
+        error=errors,
+        rounds=rounds,
+    )
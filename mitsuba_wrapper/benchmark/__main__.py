@@ -0,0 +1,61 @@
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    import mitsuba as mi
+
+    parser = argparse.ArgumentParser(
+        prog="python -m mitsuba_wrapper.benchmark",
+        description="Times every stage of the pipeline, optionally comparing the results against a baseline.",
+    )
+    _ = parser.add_argument("--variant", default="scalar_rgb", help="Mitsuba variant to run with")
+    _ = parser.add_argument("--spp", type=int, default=4, help="Samples per pixel of the render stage")
+    _ = parser.add_argument("--repeat", type=int, default=3, help="Number of times every case is run")
+    _ = parser.add_argument("--cases", nargs="+", metavar="CASE", help="Names of the cases to run (default: all)")
+    _ = parser.add_argument(
+        "--display-resolutions",
+        nargs="+",
+        default=["40x30", "80x60", "160x120"],
+        metavar="WIDTHxHEIGHT",
+        help="Resolutions of the virtual display cases",
+    )
+    _ = parser.add_argument("--output", type=str, help="File to write the results to, as JSON")
+    _ = parser.add_argument("--baseline", type=str, help="Results to compare against; exits with 1 on regressions")
+    _ = parser.add_argument("--threshold", type=float, default=0.1, help="Relative slowdown counted as a regression")
+    _ = parser.add_argument("--min-delta", type=float, default=1e-3, help="Slowdown in seconds never counted as one")
+    args = parser.parse_args()
+
+    # We must set this before importing any other Mitsuba modules
+    mi.set_variant(args.variant)
+
+    from mitsuba_wrapper.benchmark.suite import Results, Timing, compare, default_cases, run
+
+    resolutions = [
+        (int(width), int(height)) for (width, height) in (size.split("x") for size in args.display_resolutions)
+    ]
+    cases = default_cases(resolutions)
+    if args.cases is not None:
+        unknown = set(args.cases) - {case.name for case in cases}
+        if unknown:
+            parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+        cases = [case for case in cases if case.name in args.cases]
+
+    def report(timing: Timing) -> None:
+        print(f"{timing.case:<28} {timing.stage:<10} {timing.best * 1e3:12.3f} ms", flush=True)
+
+    results = run(cases, spp=args.spp, repeat=args.repeat, progress=report)
+    if args.output is not None:
+        results.write(args.output)
+
+    if args.baseline is not None:
+        baseline = Results.read(args.baseline)
+        if baseline.metadata.get("variant") != results.metadata["variant"]:
+            print(f"warning: the baseline was run with the {baseline.metadata.get('variant')} variant", file=sys.stderr)
+        comparisons = compare(baseline, results, threshold=args.threshold, min_delta=args.min_delta)
+        print()
+        for comparison in comparisons:
+            flag = "REGRESSED" if comparison.regressed else ""
+            timing = f"{comparison.baseline * 1e3:12.3f} ms -> {comparison.current * 1e3:12.3f} ms"
+            print(f"{comparison.case:<28} {comparison.stage:<10} {timing} ({comparison.ratio:6.2f}x) {flag}")
+        if any(comparison.regressed for comparison in comparisons):
+            sys.exit(1)
@@ -0,0 +1,217 @@
+"""
+Benchmarks of every stage of the pipeline, from building the models of a scene to writing the rendered image.
+
+Run them with `python -m mitsuba_wrapper.benchmark`, which can also compare the results against a baseline.
+"""
+
+import functools
+import importlib
+import json
+import platform
+import tempfile
+import time
+from collections.abc import Callable, Iterable, Mapping, Sequence
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Literal, Self, final
+
+import mitsuba as mi
+
+from mitsuba_wrapper import cbox_class, cbox_dict, crt_scene
+from mitsuba_wrapper.ref import ID
+from mitsuba_wrapper.scene import Scene
+from mitsuba_wrapper.screen.virtual_display import VirtualDisplay
+from mitsuba_wrapper.tracing import render_synced
+
+type Stage = Literal["construct", "validate", "dump", "load", "render", "write"]
+
+STAGES: tuple[Stage, ...] = ("construct", "validate", "dump", "load", "render", "write")
+# Bump whenever the format of result files changes.
+_RESULTS_VERSION = 1
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class Case:
+    name: str
+    # Builds the scene from scratch: either its models or, for hand-written scenes, the dictionary given to Mitsuba
+    # (which skips validation and dumping).
+    build: Callable[[], Scene | dict[str, Any]]
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class Timing:
+    case: str
+    stage: Stage
+    # The duration of every repetition, in seconds.
+    seconds: list[float]
+
+    @property
+    def best(self: Self) -> float:
+        """
+        The fastest repetition, which is the least affected by whatever else the machine is doing.
+        """
+        return min(self.seconds)
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class Comparison:
+    case: str
+    stage: Stage
+    baseline: float
+    current: float
+    regressed: bool
+
+    @property
+    def ratio(self: Self) -> float:
+        return self.current / self.baseline if self.baseline > 0 else float("inf")
+
+
+@final
+@dataclass(slots=True)
+class Results:
+    timings: list[Timing] = field(default_factory=list)
+    # The settings and environment the benchmarks ran with, e.g. the variant and the number of samples per pixel.
+    metadata: dict[str, Any] = field(default_factory=dict)
+
+    def write(self: Self, path: str | Path) -> None:
+        data = {
+            "version": _RESULTS_VERSION,
+            "metadata": self.metadata,
+            "timings": [asdict(timing) for timing in self.timings],
+        }
+        _ = Path(path).write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+
+    @classmethod
+    def read(cls: type[Self], path: str | Path) -> Self:
+        """
+        Raises:
+            ValueError: If the file was written by an incompatible version.
+        """
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        if data.get("version") != _RESULTS_VERSION:
+            raise ValueError(f"{path} does not hold version {_RESULTS_VERSION} benchmark results")
+        return cls([Timing(**timing) for timing in data["timings"]], data["metadata"])
+
+
+def _virtual_display_scene(width: int, height: int) -> Scene:
+    display = VirtualDisplay(height_resolution=height, width_resolution=width, height_length=3, width_length=4)
+    shapes = {
+        ID("the_room"): crt_scene.the_room,
+        ID("our_room"): crt_scene.shapes[ID("our_room")],
+        **display.to_shapes(origin=(0.5, 0.5, -8.101)),
+    }
+    return Scene.model_validate({**crt_scene.config, **crt_scene.bsdfs, **shapes})
+
+
+def default_cases(display_resolutions: Iterable[tuple[int, int]] = ((40, 30), (80, 60), (160, 120))) -> list[Case]:
+    """
+    Returns the Cornell box, both as models and as a hand-written dictionary, the CRT scene, and the virtual display of
+    the CRT scene at each of the given resolutions (width, height).
+
+    NOTE: The scenes defined by modules are built by reloading the module, which runs the code defining them again.
+    """
+    return [
+        Case("cbox_class", lambda: importlib.reload(cbox_class).cbox),
+        Case("cbox_dict", lambda: importlib.reload(cbox_dict).d),
+        Case("crt_scene", lambda: importlib.reload(crt_scene).my_scene),
+        *(
+            Case(
+                f"virtual_display_{width}x{height}",
+                lambda width=width, height=height: _virtual_display_scene(width, height),
+            )
+            for (width, height) in display_resolutions
+        ),
+    ]
+
+
+def _timed[T](timings: dict[Stage, list[float]], stage: Stage, fn: Callable[[], T]) -> T:
+    start = time.perf_counter()
+    result = fn()
+    timings.setdefault(stage, []).append(time.perf_counter() - start)
+    return result
+
+
+def run_case(case: Case, spp: int = 4, repeat: int = 3) -> list[Timing]:
+    """
+    Runs every stage of the pipeline for a case `repeat` times, timing each stage separately.
+
+    Stages are run in order, each on the output of the previous one: building the models (`construct`), validating
+    them from their JSON form (`validate`), dumping them into the dictionary Mitsuba loads (`dump`), loading it
+    (`load`), rendering at a fixed number of samples per pixel (`render`) and writing the image as OpenEXR (`write`).
+    Hand-written scenes have no `validate` and `dump` stages.
+    """
+    timings: dict[Stage, list[float]] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for _ in range(repeat):
+            built = _timed(timings, "construct", case.build)
+            if isinstance(built, Scene):
+                dumped_json = built.model_dump(mode="json", exclude_none=True)
+                _ = _timed(timings, "validate", lambda: Scene.model_validate(dumped_json))
+                scene_dict = _timed(
+                    timings, "dump", functools.partial(built.model_dump, mode="python", exclude_none=True)
+                )
+            else:
+                scene_dict = built
+            mi_scene = _timed(timings, "load", lambda: mi.load_dict(scene_dict))
+            image = _timed(timings, "render", lambda: render_synced(mi_scene, spp=spp))
+            path = Path(directory) / f"{case.name}.exr"
+            _timed(timings, "write", lambda: mi.Bitmap(image).write(str(path)))
+    return [Timing(case.name, stage, timings[stage]) for stage in STAGES if stage in timings]
+
+
+def run(
+    cases: Sequence[Case],
+    spp: int = 4,
+    repeat: int = 3,
+    progress: None | Callable[[Timing], None] = None,
+) -> Results:
+    """
+    Runs every case (see `run_case`), calling `progress` with each timing as it becomes available.
+    """
+    results = Results(
+        metadata={
+            "variant": mi.variant(),
+            "spp": spp,
+            "repeat": repeat,
+            "mitsuba": mi.__version__,
+            "python": platform.python_version(),
+            "machine": platform.node(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        }
+    )
+    for case in cases:
+        for timing in run_case(case, spp, repeat):
+            results.timings.append(timing)
+            if progress is not None:
+                progress(timing)
+    return results
+
+
+def compare(
+    baseline: Results,
+    current: Results,
+    threshold: float = 0.1,
+    min_delta: float = 1e-3,
+) -> list[Comparison]:
+    """
+    Compares the fastest repetition of every stage run in both sets of results.
+
+    Args:
+        baseline: The stored results to compare against.
+        current: The new results.
+        threshold: Relative slowdown beyond which a stage has regressed, e.g. 0.1 for 10% slower.
+        min_delta: Absolute slowdown (in seconds) below which a stage is never considered to have regressed, since
+            stages which take next to no time are dominated by noise.
+    """
+    before: Mapping[tuple[str, Stage], Timing] = {(t.case, t.stage): t for t in baseline.timings}
+    comparisons: list[Comparison] = []
+    for timing in current.timings:
+        if (previous := before.get((timing.case, timing.stage))) is None:
+            continue
+        (old, new) = (previous.best, timing.best)
+        regressed = new > old * (1 + threshold) and new - old > min_delta
+        comparisons.append(Comparison(timing.case, timing.stage, old, new, regressed))
+    return comparisons
@@ -2,20 +2,24 @@ from typing import Literal, final
 
 from pydantic import BaseModel, Field
 
+from mitsuba_wrapper.ref import Ref
 from mitsuba_wrapper.spectrum import RGB, Spectrum
+from mitsuba_wrapper.texture import Texture
 from mitsuba_wrapper.utils import Color3f
 
 type DiffuseType = Literal["diffuse"]
 type DielectricType = Literal["dielectric"]
 type ConductorType = Literal["conductor"]
+type NullType = Literal["null"]
+type PolarizerType = Literal["polarizer"]
 
-type BSDFType = Literal[DiffuseType, DielectricType, ConductorType]
-type BSDF = Diffuse | Dielectric | Conductor
+type BSDFType = Literal[DiffuseType, DielectricType, ConductorType, NullType, PolarizerType]
+type BSDF = Diffuse | Dielectric | Conductor | Null | Polarizer
 
 
 @final
 class Diffuse(BaseModel, frozen=True):
-    reflectance: Spectrum = Field(
+    reflectance: Spectrum | Texture | Ref = Field(
         # TODO: SRGB, or RGB?
         default_factory=lambda: RGB(value=Color3f(root=(0.5, 0.5, 0.5))),
         description="Specifies the diffuse albedo of the material",
@@ -60,16 +64,15 @@ class Dielectric(BaseModel, frozen=True):
         default="air",
         description="Exterior index of refraction specified numerically or using a known material name",
     )
-    # TODO: Spectrum | Texture
     # TODO: SRGB, or RGB?
-    specular_reflectance: Spectrum = Field(
+    specular_reflectance: Spectrum | Texture | Ref = Field(
         default_factory=lambda: RGB(value=Color3f(root=(1.0, 1.0, 1.0))),
         description="""
             Optional factor that can be used to modulate the specular reflection component. Note that for physical
             realism, this parameter should never be touched
         """,
     )
-    specular_transmittance: Spectrum = Field(
+    specular_transmittance: Spectrum | Texture | Ref = Field(
         default_factory=lambda: RGB(value=Color3f(root=(1.0, 1.0, 1.0))),
         description="""
             Optional factor that can be used to modulate the specular transmission component. Note that for physical
@@ -155,21 +158,20 @@ class Conductor(BaseModel, frozen=True):
         default="none",
         description="Name of the material preset, see conductor-ior-list",
     )
-    # TODO: Add texture support
-    eta: None | float | Spectrum = Field(
+    eta: None | float | Spectrum | Texture = Field(
         default=None,
         description="""
             Real component of the material's index of refraction. (Default: based on the value of material)
         """,
     )
-    k: None | float | Spectrum = Field(
+    k: None | float | Spectrum | Texture = Field(
         default=None,
         description="""
             Imaginary component of the material's index of refraction. (Default: based on the value of material)
         """,
     )
     # TODO: SRGB, or RGB?
-    specular_reflectance: Spectrum = Field(
+    specular_reflectance: Spectrum | Texture | Ref = Field(
         default_factory=lambda: RGB(value=Color3f(root=(1.0, 1.0, 1.0))),
         description="""
             Optional factor that can be used to modulate the specular reflection component. Note that for physical
@@ -177,3 +179,37 @@ class Conductor(BaseModel, frozen=True):
         """,
     )
     type: ConductorType = "conductor"
+
+
+@final
+class Null(BaseModel, frozen=True):
+    """
+    A BSDF which does not interact with light. Used to mark the boundaries of participating media.
+    """
+
+    type: NullType = "null"
+
+
+@final
+class Polarizer(BaseModel, frozen=True):
+    """
+    A linear polarizer. It only affects the polarization state of light in polarized variants; otherwise it acts as a
+    neutral density filter.
+    """
+
+    theta: float | Spectrum | Texture = Field(
+        default=0.0,
+        description="Specifies the rotation angle (in degrees) of the polarizer around the optical axis",
+    )
+    transmittance: float | Spectrum | Texture = Field(
+        default=1.0,
+        description="Optional factor that can be used to modulate the specular transmission",
+    )
+    polarizing: bool = Field(
+        default=True,
+        description="""
+            Optional flag to disable polarization changes in order to use this as a neutral density filter, even in
+            polarized render modes
+        """,
+    )
+    type: PolarizerType = "polarizer"
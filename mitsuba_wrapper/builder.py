@@ -0,0 +1,174 @@
+from collections.abc import Iterator, Mapping
+from typing import Any, Self, final
+
+from pydantic import TypeAdapter
+
+from mitsuba_wrapper.integrator import Integrator
+from mitsuba_wrapper.ref import iter_refs
+from mitsuba_wrapper.scene import Scene, SceneObject
+from mitsuba_wrapper.sensor import Sensor
+from mitsuba_wrapper.shape import Shape, ShapeGroup
+
+_SCENE_OBJECT: TypeAdapter[SceneObject] = TypeAdapter(SceneObject)
+_SHAPE: TypeAdapter[Shape] = TypeAdapter(Shape)
+
+
+@final
+class SceneBuilder:
+    """
+    Assembles a scene one object at a time.
+
+    Unlike a `Scene`, which is frozen and validated as a whole, a builder can be added to in any order. Objects are
+    validated as they are added (which is free for models, since they were validated when they were created), and
+    references are tracked as they are added, so building the scene takes time linear in its size instead of
+    validating it again.
+
+    Objects may refer to objects which are added later; `build` orders the scene so that every object comes after the
+    objects it refers to, which Mitsuba requires.
+    """
+
+    def __init__(self, integrator: None | Integrator = None, sensor: None | Sensor = None) -> None:
+        self.integrator: None | Integrator = integrator
+        self.sensor: None | Sensor = sensor
+        # Shape groups which are still being added to are kept as mutable dictionaries of their children.
+        self._objects: dict[str, SceneObject | dict[str, Shape]] = {}
+        # The IDs each object (or, for shape groups, any of its children) refers to.
+        self._references: dict[str, list[str]] = {}
+        # The objects referring to each ID which has not been added yet.
+        self._dangling: dict[str, set[str]] = {}
+
+    @classmethod
+    def from_scene(cls: type[Self], scene: Scene) -> Self:
+        """
+        Returns a builder holding the objects of a scene, to make changes to it.
+        """
+        return cls(scene.integrator, scene.sensor).add_all(scene.model_extra or {})
+
+    def __contains__(self, id: object) -> bool:
+        return id in self._objects
+
+    def __len__(self) -> int:
+        return len(self._objects)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._objects)
+
+    @property
+    def dangling(self) -> Mapping[str, set[str]]:
+        """
+        The IDs which are referred to but have not been added, with the IDs of the objects referring to them.
+        """
+        return self._dangling
+
+    def add(self, id: str, value: SceneObject | Mapping[str, Any], group: None | str = None) -> Self:
+        """
+        Adds an object to the scene, or a shape to one of its shape groups.
+
+        Args:
+            id: The ID of the object, which must be unique within the scene (or within the group).
+            value: The object, either as a model or in the form `Scene.model_validate` accepts.
+            group: The ID of the shape group to add the shape to, if any.
+
+        Raises:
+            ValueError: If the ID is taken or reserved, or `group` is not a shape group.
+            pydantic.ValidationError: If `value` is not a valid object.
+        """
+        if group is not None:
+            return self._add_to_group(group, id, _SHAPE.validate_python(value))
+        if id in self._objects or id in Scene.model_fields:
+            raise ValueError(f"Duplicate ID {id!r}")
+        validated = _SCENE_OBJECT.validate_python(value)
+        self._objects[id] = validated
+        _ = self._dangling.pop(id, None)
+        self._track(id, validated)
+        return self
+
+    def add_all(self, objects: Mapping[str, SceneObject | Mapping[str, Any]], group: None | str = None) -> Self:
+        """
+        Adds several objects at once; see `add`.
+        """
+        for id, value in objects.items():
+            _ = self.add(id, value, group)
+        return self
+
+    def add_group(self, id: str, shapes: Mapping[str, Shape | Mapping[str, Any]] | None = None) -> Self:
+        """
+        Adds a shape group, optionally with its first shapes. More shapes can be added with `add(..., group=id)`.
+        """
+        return self.add(id, ShapeGroup.model_validate({})).add_all(shapes or {}, group=id)
+
+    def build(self) -> Scene:
+        """
+        Returns the scene assembled so far. The builder can still be used (and built again) afterwards.
+
+        Raises:
+            ValueError: If the integrator or sensor are missing, an object refers to an ID which was never added, or
+                objects refer to each other in a cycle.
+        """
+        if self.integrator is None or self.sensor is None:
+            raise ValueError("A scene needs an integrator and a sensor")
+        if self._dangling:
+            references = ", ".join(
+                f"{id!r} (from {', '.join(map(repr, sorted(by)))})" for id, by in self._dangling.items()
+            )
+            raise ValueError(f"References to undefined IDs: {references}")
+        objects: dict[str, SceneObject] = {}
+        for id in self._ordered():
+            match self._objects[id]:
+                case dict() as children:
+                    # NOTE: The children have already been validated, so we can skip validation when building the
+                    # group (and the scene).
+                    objects[id] = ShapeGroup.model_construct(None, **children)
+                case value:
+                    objects[id] = value
+        return Scene.model_construct(None, integrator=self.integrator, sensor=self.sensor, **objects)
+
+    def _add_to_group(self, group: str, id: str, shape: Shape) -> Self:
+        match self._objects.get(group):
+            case dict() as children:
+                pass
+            case ShapeGroup() as existing:
+                children = self._objects[group] = dict(existing.model_extra or {})
+            case _:
+                raise ValueError(f"{group!r} is not a shape group")
+        if id in children:
+            raise ValueError(f"Duplicate ID {id!r} in shape group {group!r}")
+        children[id] = shape
+        self._track(group, shape)
+        return self
+
+    def _track(self, id: str, value: SceneObject) -> None:
+        for ref in iter_refs(value):
+            self._references.setdefault(id, []).append(ref.id)
+            if ref.id not in self._objects:
+                self._dangling.setdefault(ref.id, set()).add(id)
+
+    def _ordered(self) -> list[str]:
+        """
+        Returns the IDs of all objects, in the order they were added except that every object comes after the objects
+        it refers to.
+        """
+        order: list[str] = []
+        done: set[str] = set()
+        visiting: set[str] = set()
+        for root in self._objects:
+            if root in done:
+                continue
+            # Depth-first search with an explicit stack, since chains of references can be arbitrarily long.
+            visiting.add(root)
+            stack = [(root, iter(self._references.get(root, ())))]
+            while stack:
+                (id, references) = stack[-1]
+                for reference in references:
+                    if reference in visiting:
+                        raise ValueError(f"Objects refer to each other in a cycle through {reference!r}")
+                    if reference not in done:
+                        visiting.add(reference)
+                        stack.append((reference, iter(self._references.get(reference, ()))))
+                        break
+                else:
+                    _ = stack.pop()
+                    visiting.remove(id)
+                    done.add(id)
+                    order.append(id)
+        return order
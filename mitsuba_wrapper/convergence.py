@@ -0,0 +1,156 @@
+import math
+import time
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from typing import Literal, Self, final
+
+import mitsuba as mi
+import numpy as np
+import numpy.typing as npt
+
+from mitsuba_wrapper.sampler import Independent, LDSampler, MultiJitter, Orthogonal, Sampler, Stratified
+from mitsuba_wrapper.scene import Scene
+from mitsuba_wrapper.tracing import load_scene, render_synced, trace
+
+type Budget = Literal["spp", "time"]
+
+# Samples per pixel of the renders timing a sampler before equal-time renders.
+_PILOT_SPP = 4
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class ConvergencePoint:
+    sampler: str
+    # The budget the point was rendered with: samples per pixel, or seconds.
+    budget: float
+    # Samples per pixel actually taken, the most the sampler supports within the budget.
+    spp: int
+    # Seconds a render took, averaged over the trials.
+    seconds: float
+    # Relative mean squared error against the reference (see `relative_mse`), averaged over the trials.
+    error: float
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class Convergence:
+    mode: Budget
+    points: list[ConvergencePoint]
+
+    def best(self: Self) -> dict[float, str]:
+        """
+        Returns the sampler with the lowest error at every budget.
+        """
+        best: dict[float, ConvergencePoint] = {}
+        for point in self.points:
+            if point.budget not in best or point.error < best[point.budget].error:
+                best[point.budget] = point
+        return {budget: point.sampler for budget, point in best.items()}
+
+    def ranking(self: Self) -> list[str]:
+        """
+        Returns the samplers from the one converging the fastest to the one converging the slowest, by the geometric
+        mean of their errors over every budget.
+        """
+        errors: dict[str, list[float]] = {}
+        for point in self.points:
+            errors.setdefault(point.sampler, []).append(math.log(max(point.error, 1e-30)))
+        return sorted(errors, key=lambda sampler: sum(errors[sampler]) / len(errors[sampler]))
+
+
+def default_samplers() -> dict[str, Sampler]:
+    return {
+        "independent": Independent(),
+        "stratified": Stratified(),
+        "multijitter": MultiJitter(),
+        "orthogonal": Orthogonal(),
+        "ldsampler": LDSampler(),
+    }
+
+
+def relative_mse(
+    image: npt.NDArray[np.float32],
+    reference: npt.NDArray[np.float32],
+    epsilon: float = 1e-2,
+) -> float:
+    """
+    Returns the mean squared error of an image relative to the squared values of a reference, so that bright and dark
+    regions weigh alike. `epsilon` keeps black pixels from dominating it.
+    """
+    return float(np.mean(np.square(image - reference) / (np.square(reference) + epsilon)))
+
+
+def _render(mi_scene: mi.Scene, spp: int, seed: int) -> tuple[npt.NDArray[np.float32], float]:
+    start = time.perf_counter()
+    image = render_synced(mi_scene, spp=spp, seed=seed)
+    seconds = time.perf_counter() - start
+    return (np.array(image, dtype=np.float32), seconds)
+
+
+def _load(scene: Scene, sampler: Sampler) -> mi.Scene:
+    sensor = scene.sensor.model_copy(update={"sampler": sampler})
+    return load_scene(scene.model_copy(update={"sensor": sensor}))
+
+
+def render_reference(scene: Scene, spp: int = 1024, seed: int = 0) -> npt.NDArray[np.float32]:
+    """
+    Renders a reference image of a scene's main sensor with many independent samples.
+    """
+    with trace("reference", spp=spp):
+        return _render(_load(scene, Independent(sample_count=spp)), spp, seed)[0]
+
+
+def compare_samplers(
+    scene: Scene,
+    budgets: Sequence[float],
+    mode: Budget = "spp",
+    samplers: None | Mapping[str, Sampler] = None,
+    reference: None | npt.NDArray[np.float32] = None,
+    *,
+    reference_spp: int = 1024,
+    trials: int = 1,
+    seed: int = 0,
+) -> Convergence:
+    """
+    Renders the main sensor of a scene with every sampler under the same budgets, either of samples per pixel or of
+    time, and measures the error of every render against a reference, to find the sampler converging the fastest.
+
+    Every budget is rounded down to the most samples per pixel the sampler supports within it (see
+    `SamplerLike.valid_sample_count`). Time budgets are turned into samples per pixel from the time a short render
+    takes with each sampler, once its kernels are compiled.
+
+    Args:
+        scene: The scene.
+        budgets: The budgets: samples per pixel, or seconds per render.
+        mode: Whether the budgets are samples per pixel or seconds.
+        samplers: The samplers to compare, by name. Defaults to every sampler (see `default_samplers`).
+        reference: The reference image. Rendered with `reference_spp` independent samples if not given.
+        reference_spp: Samples per pixel of the reference image.
+        trials: Number of renders with different seeds every error is averaged over.
+        seed: Seed of the first trial; the reference is rendered with the seed after the last trial.
+    """
+    samplers = default_samplers() if samplers is None else samplers
+    if reference is None:
+        reference = render_reference(scene, reference_spp, seed + trials)
+    points: list[ConvergencePoint] = []
+    for name, sampler in samplers.items():
+        mi_scene = _load(scene, sampler)
+        seconds_per_spp = 0.0
+        if mode == "time":
+            pilot = sampler.valid_sample_count(_PILOT_SPP)
+            # The first render also compiles kernels (in JIT variants), so the second one is timed.
+            _ = _render(mi_scene, pilot, seed)
+            seconds_per_spp = _render(mi_scene, pilot, seed)[1] / pilot
+        for budget in budgets:
+            target = budget if mode == "spp" else budget / seconds_per_spp
+            spp = sampler.valid_sample_count(max(1, math.floor(target)), round_up=False)
+            errors: list[float] = []
+            times: list[float] = []
+            for trial in range(trials):
+                with trace("render", sampler=name, spp=spp, trial=trial):
+                    (image, seconds) = _render(mi_scene, spp, seed + trial)
+                errors.append(relative_mse(image, reference))
+                times.append(seconds)
+            points.append(ConvergencePoint(name, budget, spp, sum(times) / trials, sum(errors) / trials))
+    return Convergence(mode, points)
@@ -0,0 +1,202 @@
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Self, final
+
+import mitsuba as mi
+import numpy as np
+import numpy.typing as npt
+
+from mitsuba_wrapper.convergence import relative_mse
+from mitsuba_wrapper.integrator import AOV, Integrator, PathBasedIntegrator, Stokes
+from mitsuba_wrapper.scene import Scene
+from mitsuba_wrapper.tracing import load_scene, render_synced, trace
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class DepthSample:
+    depth: int
+    # Mean radiance of the image rendered with paths of at most `depth` bounces.
+    energy: float
+    # Fraction of the total energy of the scene added by paths of exactly `depth` bounces.
+    added: float
+    # Seconds the render took.
+    seconds: float
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class RouletteSample:
+    rr_depth: int
+    # Relative mean squared error against the reference (see `relative_mse`).
+    error: float
+    seconds: float
+
+    @property
+    def efficiency(self: Self) -> float:
+        """
+        The inverse of the error times the time taken: how fast renders with this depth converge.
+        """
+        return 1.0 / max(self.error * self.seconds, 1e-30)
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class DepthProfile:
+    depths: list[DepthSample]
+    # Total energy of the scene: that of the deepest render, plus an estimate of what deeper paths would add.
+    total_energy: float
+    # The recommended depths, or -1 for `max_depth` if the energy was not converging by the deepest render.
+    max_depth: int
+    rr_depth: int
+    roulette: list[RouletteSample] = field(default_factory=list)
+
+    def apply(self: Self, integrator: Integrator) -> Integrator:
+        """
+        Returns a copy of a path based integrator (or of an integrator wrapping one) with the recommended depths.
+        """
+        match integrator:
+            case PathBasedIntegrator():
+                return integrator.model_copy(update={"max_depth": self.max_depth, "rr_depth": self.rr_depth})
+            case AOV(integrator=inner) | Stokes(integrator=inner):
+                return integrator.model_copy(update={"integrator": self.apply(inner)})
+            case _:
+                raise ValueError(f"{type(integrator).__name__} integrators have no path depths")
+
+
+def _path_integrator(integrator: Integrator) -> PathBasedIntegrator:
+    match integrator:
+        case PathBasedIntegrator():
+            return integrator
+        case AOV(integrator=inner) | Stokes(integrator=inner):
+            return inner
+        case _:
+            raise ValueError(f"{type(integrator).__name__} integrators have no path depths")
+
+
+def _render(
+    mi_scene: mi.Scene,
+    integrator: PathBasedIntegrator,
+    depths: tuple[int, int],
+    spp: int,
+    seed: int,
+) -> tuple[npt.NDArray[np.float32], float]:
+    (max_depth, rr_depth) = depths
+    mi_integrator = mi.load_dict(
+        integrator.model_copy(update={"max_depth": max_depth, "rr_depth": rr_depth}).model_dump(
+            mode="python", exclude_none=True
+        )
+    )
+    start = time.perf_counter()
+    image = render_synced(mi_scene, mi_integrator, spp=spp, seed=seed)
+    seconds = time.perf_counter() - start
+    # Only the color channels count, not those of alpha or AOVs.
+    return (np.array(image, dtype=np.float32)[..., : min(3, image.shape[-1])], seconds)
+
+
+def _profile_bounces(
+    mi_scene: mi.Scene,
+    integrator: PathBasedIntegrator,
+    max_depth: int,
+    spp: int,
+    seed: int,
+) -> tuple[list[DepthSample], float, float]:
+    """
+    Returns the energy every depth adds, the total energy of the scene, and the ratio of the energy every bounce adds
+    to that of the bounce before it, over the deepest bounces (at least 1 if the energy is not converging).
+    """
+    energies: list[float] = []
+    times: list[float] = []
+    for depth in range(1, max_depth + 1):
+        # Russian roulette starts at `rr_depth`, so paths which never get that deep never meet it.
+        with trace("render", max_depth=depth):
+            (image, seconds) = _render(mi_scene, integrator, (depth, max_depth + 1), spp, seed)
+        energies.append(float(image.mean()))
+        times.append(seconds)
+    added = np.diff(energies, prepend=0.0)
+    # Contributions of deep bounces fall roughly geometrically, which gives the energy of the bounces not rendered.
+    # The ratio is taken over a quarter of the depths, since the energy of a single bounce is noisy.
+    span = max(max_depth // 4, 1)
+    (last, before) = (float(added[-span:].sum()), float(added[-2 * span : -span].sum()))
+    ratio = (last / before) ** (1 / span) if max_depth >= 2 * span and last > 0 and before > 0 else 1.0
+    tail = float(added[-1]) * ratio / (1 - ratio) if ratio < 1 else 0.0
+    total = energies[-1] + tail
+    depths = [
+        DepthSample(depth, energy, float(contribution) / total if total else 0.0, seconds)
+        for depth, (energy, contribution, seconds) in enumerate(zip(energies, added, times, strict=True), 1)
+    ]
+    return (depths, total, ratio)
+
+
+def _profile_roulette(
+    mi_scene: mi.Scene,
+    integrator: PathBasedIntegrator,
+    max_depth: int,
+    spps: tuple[int, int],
+    seed: int,
+) -> list[RouletteSample]:
+    """
+    Returns the error and time of renders starting Russian roulette at every depth, the last of which never starts it.
+    """
+    (spp, reference_spp) = spps
+    with trace("reference", spp=reference_spp):
+        (reference, _) = _render(mi_scene, integrator, (max_depth, max_depth + 1), reference_spp, seed + 1)
+    roulette: list[RouletteSample] = []
+    for rr_depth in range(1, max_depth + 2):
+        with trace("render", rr_depth=rr_depth):
+            (image, seconds) = _render(mi_scene, integrator, (max_depth, rr_depth), spp, seed)
+        roulette.append(RouletteSample(rr_depth, relative_mse(image, reference), seconds))
+    return roulette
+
+
+def profile_depths(
+    scene: Scene,
+    *,
+    max_depth: int = 16,
+    threshold: float = 0.01,
+    spp: int = 16,
+    reference_spp: int = 256,
+    seed: int = 0,
+) -> DepthProfile:
+    """
+    Measures how much energy and time every bounce of the paths of a scene adds, and recommends the `max_depth` and
+    `rr_depth` of its (path based) integrator, which `DepthProfile.apply` sets on the integrator.
+
+    The scene is rendered at every depth up to `max_depth` with Russian roulette disabled and the same seed, so that
+    renders mostly differ by the bounces added (only by them in JIT variants), which makes the energy of every bounce
+    far less noisy than the renders.
+    The recommended `max_depth` is the smallest depth missing at most `threshold` of the total energy, estimating what
+    deeper paths add from how fast the contribution of the last bounces falls. The recommended `rr_depth` is the one
+    at which renders with that `max_depth` converge the fastest, i.e. with the least error for the time they take;
+    Russian roulette is unbiased, so it trades noise for time and nothing else.
+
+    Args:
+        scene: The scene.
+        max_depth: The deepest paths rendered.
+        threshold: Fraction of the total energy the recommended `max_depth` may miss.
+        spp: Samples per pixel of every render.
+        reference_spp: Samples per pixel of the reference the errors of Russian roulette are measured against.
+        seed: Seed of the renders; the reference is rendered with the next one.
+
+    Raises:
+        ValueError: If the integrator of the scene is not path based.
+    """
+    integrator = _path_integrator(scene.integrator)
+    mi_scene = load_scene(scene)
+
+    (depths, total, ratio) = _profile_bounces(mi_scene, integrator, max_depth, spp, seed)
+    allowed = threshold * abs(total)
+    recommended = -1
+    if enough := [sample.depth for sample in depths if total - sample.energy <= allowed]:
+        recommended = enough[0]
+    elif ratio < 1:
+        # Every bounce deeper than the deepest rendered shrinks the energy still missing by the ratio.
+        missing = total - depths[-1].energy
+        recommended = max_depth + math.ceil(math.log(allowed / missing) / math.log(ratio))
+
+    # Roulette is measured with the paths the recommended depth allows, up to the deepest rendered.
+    depth = max_depth if recommended < 0 else min(recommended, max_depth)
+    roulette = _profile_roulette(mi_scene, integrator, depth, (spp, reference_spp), seed)
+    best = max(roulette, key=lambda sample: sample.efficiency)
+    return DepthProfile(depths, total, recommended, best.rr_depth, roulette)
@@ -0,0 +1,207 @@
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass, field
+from typing import Any, Literal, Self, final
+
+import mitsuba as mi
+from pydantic import BaseModel
+
+from mitsuba_wrapper.ref import Ref
+from mitsuba_wrapper.scene import Scene
+from mitsuba_wrapper.spectrum import RGB, SRGB, Uniform
+from mitsuba_wrapper.tracing import load_scene
+from mitsuba_wrapper.utils import Color3f, Transform4f
+
+type ChangeKind = Literal["update", "structural"]
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class Change:
+    kind: ChangeKind
+    # Where the change was found, as a dotted path of IDs and field names, e.g. "light.emitter.radiance".
+    path: str
+    # For updates, the key of the parameter in `mi.traverse` and its new value.
+    key: None | str = None
+    value: Any = None
+
+
+@final
+@dataclass(slots=True)
+class SceneDiff:
+    changes: list[Change] = field(default_factory=list)
+
+    @property
+    def structural(self: Self) -> bool:
+        """
+        Whether the scene has to be reloaded for the changes to take effect.
+        """
+        return any(change.kind == "structural" for change in self.changes)
+
+    @property
+    def updates(self: Self) -> list[Change]:
+        return [change for change in self.changes if change.kind == "update"]
+
+
+def _references(model: BaseModel, path: str) -> Iterator[tuple[str, str]]:
+    for name, value in model:
+        match value:
+            case Ref(id=id):
+                yield (id, f"{path}.{name}")
+            case BaseModel():
+                yield from _references(value, f"{path}.{name}")
+            case _:
+                pass
+
+
+def referrers(scene: Scene) -> dict[str, list[str]]:
+    """
+    Returns the paths of the references to every referenced ID of a scene.
+
+    Mitsuba names the parameters of an object referenced by other objects after whichever reference it traverses first
+    (e.g. "floor.bsdf.reflectance.value" rather than "white.reflectance.value"), so these are the names its parameters
+    may have.
+    """
+    paths: dict[str, list[str]] = {}
+    for id, value in (scene.model_extra or {}).items():
+        for target, path in _references(value, id):
+            paths.setdefault(target, []).append(path)
+    return paths
+
+
+class _Differ:
+    def __init__(self, params: None | mi.SceneParameters, aliases: Mapping[str, list[str]]) -> None:
+        super().__init__()
+        self.params: None | mi.SceneParameters = params
+        self.aliases: Mapping[str, list[str]] = aliases
+        self.diff: SceneDiff = SceneDiff()
+
+    def resolve(self, key: str, seen: None | frozenset[str] = None) -> None | str:
+        """
+        Returns the name `key` goes by among the parameters, if they expose it.
+        """
+        assert self.params is not None
+        if key in self.params:
+            return key
+        seen = seen or frozenset()
+        (head, _, rest) = key.partition(".")
+        for alias in self.aliases.get(head, ()):
+            if alias not in seen and (resolved := self.resolve(f"{alias}.{rest}", seen | {alias})) is not None:
+                return resolved
+        return None
+
+    def update(self, path: str, key: str, value: Any) -> None:
+        # Without the parameters of a loaded scene, every change which could be an update is assumed to be one.
+        resolved = key if self.params is None else self.resolve(key)
+        if resolved is None:
+            self.structural(path)
+        else:
+            self.diff.changes.append(Change("update", path, resolved, value))
+
+    def structural(self, path: str) -> None:
+        self.diff.changes.append(Change("structural", path))
+
+    def color(self, path: str, key: str, color: Color3f) -> None:
+        # NOTE: Spectral variants store the coefficients of a spectral upsampling model rather than the color itself,
+        # so colors can only be updated in place in RGB variants.
+        if mi.is_rgb:
+            self.update(path, key, color.root)
+        else:
+            self.structural(path)
+
+    def compare(self, old: Any, new: Any, path: str) -> None:
+        if old is new or old == new:
+            return
+        match (old, new):
+            case (RGB(), RGB()):
+                self.color(path, f"{path}.value", new.value)
+            case (SRGB(value=None), SRGB(color=Color3f() as color, value=None)):
+                self.color(path, f"{path}.value", color)
+            case (Uniform(), Uniform()):
+                self.update(path, f"{path}.value", new.value)
+            case (Transform4f(), Transform4f()):
+                self.update(path, path, new.model_dump(mode="python"))
+            case (float() | int(), float()) if not isinstance(old, bool):
+                self.update(path, path, new)
+            case (BaseModel(), BaseModel()) if type(old) is type(new):
+                self.compare_fields(old, new, path)
+            case _:
+                self.structural(path)
+
+    def compare_fields(self, old: BaseModel, new: BaseModel, path: str) -> None:
+        for name in type(old).model_fields:
+            self.compare(getattr(old, name), getattr(new, name), f"{path}.{name}")
+        self.compare_objects(old.model_extra or {}, new.model_extra or {}, path)
+
+    def compare_objects(self, old: Mapping[str, Any], new: Mapping[str, Any], prefix: None | str = None) -> None:
+        if old.keys() != new.keys():
+            self.structural(prefix or "scene")
+            return
+        for id, value in old.items():
+            self.compare(value, new[id], id if prefix is None else f"{prefix}.{id}")
+
+
+def diff_scenes(
+    old: Scene,
+    new: Scene,
+    params: None | mi.SceneParameters = None,
+    aliases: None | Mapping[str, list[str]] = None,
+) -> SceneDiff:
+    """
+    Returns the changes between two versions of a scene, each of which either updates a parameter of the loaded scene
+    in place (colors and uniform spectra, transforms of analytic shapes and sensors, and other floating point
+    parameters Mitsuba exposes) or changes its structure, which requires reloading it.
+
+    Unchanged objects are skipped by identity before they are compared, so scenes derived from one another (e.g. with
+    `model_copy` or a `SceneBuilder`) are diffed in time proportional to the number of changed objects.
+
+    Args:
+        old: The scene as it is loaded.
+        new: The scene it should become.
+        params: The parameters of the loaded scene (as returned by `mi.traverse`). When given, changes to anything it
+            does not expose (e.g. the transform of a mesh, which is baked into its vertices) are structural.
+        aliases: The result of `referrers(old)`, used to find the parameters of referenced objects. Computed when
+            `params` is given and this is not.
+    """
+    if aliases is None:
+        aliases = referrers(old) if params is not None else {}
+    differ = _Differ(params, aliases)
+    if old.integrator != new.integrator:
+        differ.structural("integrator")
+    differ.compare(old.sensor, new.sensor, "sensor")
+    differ.compare_objects(old.model_extra or {}, new.model_extra or {})
+    return differ.diff
+
+
+@final
+class LiveScene:
+    """
+    A scene loaded into Mitsuba which is kept in sync with its model.
+
+    Changing the model through `update` applies whatever can be changed in place to the loaded scene, and only reloads
+    it when a change affects its structure.
+    """
+
+    def __init__(self, scene: Scene) -> None:
+        self.scene: Scene = scene
+        self.mi_scene: mi.Scene = load_scene(scene)
+        self.params: mi.SceneParameters = mi.traverse(self.mi_scene)
+        self.aliases: dict[str, list[str]] = referrers(scene)
+
+    def update(self, scene: Scene) -> SceneDiff:
+        """
+        Brings the loaded scene in line with `scene`, returning the changes which were made.
+        """
+        diff = diff_scenes(self.scene, scene, self.params, self.aliases)
+        if diff.structural:
+            self.mi_scene = load_scene(scene)
+            self.params = mi.traverse(self.mi_scene)
+            self.aliases = referrers(scene)
+        elif diff.changes:
+            for change in diff.changes:
+                assert change.key is not None
+                current: Any = self.params[change.key]
+                # Convert to the (variant-specific) type of the parameter, e.g. a scalar transform to a JIT one.
+                self.params[change.key] = type(current)(change.value)
+            _ = self.params.update()
+        self.scene = scene
+        return diff
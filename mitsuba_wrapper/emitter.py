@@ -2,19 +2,23 @@ from typing import Literal, final
 
 from pydantic import BaseModel, Field
 
-from mitsuba_wrapper.spectrum import Spectrum
+from mitsuba_wrapper.ref import Ref
+from mitsuba_wrapper.spectrum import Spectrum, Uniform
+from mitsuba_wrapper.texture import Texture
 from mitsuba_wrapper.utils import Placeable, Point3f
 
 type AreaType = Literal["area"]
 type PointType = Literal["point"]
+type ConstantType = Literal["constant"]
+type EnvmapType = Literal["envmap"]
 
-type EmitterType = AreaType | PointType
-type Emitter = Area | Point
+type EmitterType = AreaType | PointType | ConstantType | EnvmapType
+type Emitter = Area | Point | Constant | Envmap
 
 
 @final
 class Area(BaseModel, frozen=True):
-    radiance: Spectrum = Field(
+    radiance: Spectrum | Texture | Ref = Field(
         description="Specifies the emitted radiance in units of power per unit area per unit steradian"
     )
     type: AreaType = "area"
@@ -22,7 +26,9 @@ class Area(BaseModel, frozen=True):
 
 @final
 class Point(Placeable, frozen=True):
-    intensity: Spectrum = Field(description="Specifies the radiant intensity in units of power per unit steradian")
+    intensity: Spectrum | Ref = Field(
+        description="Specifies the radiant intensity in units of power per unit steradian",
+    )
     position: None | Point3f = Field(
         default=None,
         description="""
@@ -31,3 +37,31 @@ class Point(Placeable, frozen=True):
         """,
     )
     type: PointType = "point"
+
+
+@final
+class Constant(BaseModel, frozen=True):
+    radiance: Spectrum | Texture | Ref = Field(
+        default_factory=lambda: Uniform(value=1.0),
+        description="Specifies the emitted radiance in units of power per unit area per unit steradian",
+    )
+    type: ConstantType = "constant"
+
+
+@final
+class Envmap(Placeable, frozen=True):
+    filename: str = Field(
+        description="Filename of the radiance-valued input image to be loaded; must be in latitude-longitude format",
+    )
+    scale: float = Field(
+        default=1.0,
+        description="A scale factor that is applied to the radiance values stored in the input image",
+    )
+    mis_compensation: bool = Field(
+        default=False,
+        description="""
+            Compensate sampling for the presence of other Monte Carlo techniques that will be combined using multiple
+            importance sampling (MIS)? This is extremely cheap to do and can slightly reduce variance
+        """,
+    )
+    type: EnvmapType = "envmap"
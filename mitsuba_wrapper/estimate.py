@@ -0,0 +1,348 @@
+import functools
+import math
+from collections import Counter
+from collections.abc import Iterator, Mapping, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Literal, Self, final
+
+import mitsuba as mi
+import numpy as np
+import numpy.typing as npt
+from pydantic import BaseModel, RootModel
+
+from mitsuba_wrapper.film import Film, HDRFilm, PixelFormatType, SpecFilm
+from mitsuba_wrapper.integrator import AOV, Direct, Integrator, PathBasedIntegrator, Stokes
+from mitsuba_wrapper.multiview import scene_sensors, set_crop_window
+from mitsuba_wrapper.ref import Ref
+from mitsuba_wrapper.roi import filter_radius, widen_by_filter
+from mitsuba_wrapper.scene import Scene
+from mitsuba_wrapper.shape import Cube, Instance, Obj, Ply, Rectangle, Sphere
+from mitsuba_wrapper.tracing import load_scene, render_synced, trace, traced
+
+type OverBudget = Literal["reject", "tile"]
+
+# NOTE: The constants below are rough figures for Mitsuba 3 in single precision, meant to tell scenes which fit apart
+# from scenes which do not, rather than to predict memory usage to the byte.
+
+_FLOAT_BYTES = 4
+_PIXEL_FORMAT_CHANNELS: Mapping[PixelFormatType, int] = {
+    "luminance": 1,
+    "luminance_alpha": 2,
+    "rgb": 3,
+    "rgba": 4,
+    "xyz": 3,
+    "xyza": 4,
+}
+# Positions, normals and texture coordinates of a vertex, and the indices of a triangle.
+_VERTEX_BYTES = 8 * _FLOAT_BYTES
+_TRIANGLE_BYTES = 3 * 4
+# The acceleration structure (Embree's BVH, or OptiX's on the GPU) built over every primitive.
+_ACCELERATION_BYTES_PER_PRIMITIVE = 64
+# The state of a plugin (e.g. a shape's bounds, transforms and parameters) besides its geometry.
+_PLUGIN_BYTES = 1024
+# JIT variants trace every sample of the image at once, keeping the state of every path in memory.
+_WAVEFRONT_BYTES_PER_SAMPLE = 64
+# Russian roulette ends most paths within a few bounces of the depth it starts at.
+_ROULETTE_DEPTH = 3
+# Geometry of the built-in meshes, as (vertices, triangles).
+_CUBE_MESH = (24, 12)
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class Estimate:
+    # Memory taken by the film(s) while rendering, in bytes: the accumulation buffers and the developed image, and in
+    # JIT variants the state of every sample in flight. Only the largest sensor counts, since one is rendered at a time.
+    film_bytes: int
+    # Memory taken by meshes and the acceleration structure, in bytes.
+    geometry_bytes: int
+    # Memory taken by the plugins themselves, in bytes.
+    plugin_bytes: int
+    # Number of triangles and analytic shapes.
+    primitives: int
+    # Number of plugins of every kind, e.g. {"shape": 3600, "bsdf": 5, "emitter": 3601}.
+    plugins: dict[str, int]
+    # Rough relative cost of rendering the scene, proportional to the number of rays traced times the cost of tracing
+    # one. Only meaningful in comparison with the cost of other scenes.
+    cost: float
+    # Parts of the scene which could not be estimated, e.g. missing mesh files.
+    warnings: list[str] = field(default_factory=list)
+
+    @property
+    def total_bytes(self: Self) -> int:
+        return self.film_bytes + self.geometry_bytes + self.plugin_bytes
+
+
+@functools.cache
+def _mesh_size(path: Path, size: int, mtime: int) -> tuple[int, int]:
+    """
+    Returns the number of vertices and triangles of a mesh file, reading only as much of it as needed: the header of
+    a PLY file, or the vertex and face statements of an OBJ file. Cached by path, size and modification time.
+    """
+    (vertices, triangles) = (0, 0)
+    with path.open("rb") as f:
+        if path.suffix.lower() == ".ply":
+            for line in f:
+                match line.split():
+                    case [b"element", b"vertex", count]:
+                        vertices = int(count)
+                    case [b"element", b"face", count]:
+                        triangles = int(count)
+                    case [b"end_header"]:
+                        break
+                    case _:
+                        pass
+        else:
+            for line in f:
+                if line.startswith(b"v "):
+                    vertices += 1
+                elif line.startswith(b"f "):
+                    # Polygons are split into triangles.
+                    triangles += len(line.split()) - 3
+    return (vertices, triangles)
+
+
+def _plugin_kind(model: BaseModel) -> str:
+    # Models are grouped into modules by the kind of plugin they declare, e.g. "mitsuba_wrapper.bsdf".
+    return type(model).__module__.rpartition(".")[2]
+
+
+def iter_plugins(model: BaseModel) -> Iterator[BaseModel]:
+    """
+    Yields a model and every plugin nested in it, depth first. References are not followed.
+    """
+    yield model
+    for _, value in model:
+        if isinstance(value, BaseModel) and not isinstance(value, (Ref, RootModel)):
+            yield from iter_plugins(value)
+
+
+def _film_channels(film: Film, integrator: Integrator, variant: str) -> int:
+    """
+    Returns the number of channels of the images rendered with a film.
+    """
+    match (film, integrator):
+        case (SpecFilm(), _):
+            return len(film.channel_names())
+        case (HDRFilm(pixel_format=pixel_format), AOV()):
+            return len(integrator.channel_names(pixel_format))
+        case (HDRFilm(pixel_format=pixel_format), Stokes()):
+            return len(integrator.channel_names(pixel_format, variant))
+        case (HDRFilm(pixel_format=pixel_format), _):
+            return _PIXEL_FORMAT_CHANNELS[pixel_format]
+
+
+def film_bytes(film: Film, integrator: Integrator, spp: int, variant: None | str = None) -> int:
+    """
+    Returns the memory taken by a film while rendering (see `Estimate.film_bytes`), in bytes.
+
+    The film accumulates every channel of the image and the weight of the samples, twice when it compensates for
+    roundoff error, and then develops the result into an image.
+    """
+    variant = variant or mi.variant() or "scalar_rgb"
+    (_, _, width, height) = film.crop_window
+    channels = _film_channels(film, integrator, variant)
+    pixels = width * height
+    accumulated = pixels * (channels + 1) * _FLOAT_BYTES * (2 if film.compensate else 1)
+    developed = pixels * channels * _FLOAT_BYTES
+    wavefront = pixels * spp * _WAVEFRONT_BYTES_PER_SAMPLE if variant.startswith(("llvm_", "cuda_")) else 0
+    return accumulated + developed + wavefront
+
+
+def _path_length(integrator: Integrator) -> int:
+    match integrator:
+        case Direct():
+            return 1
+        case AOV(integrator=inner) | Stokes(integrator=inner):
+            return _path_length(inner)
+        case PathBasedIntegrator(max_depth=max_depth, rr_depth=rr_depth):
+            typical = rr_depth + _ROULETTE_DEPTH
+            return typical if max_depth < 0 else min(max_depth, typical)
+        case _:
+            raise ValueError(f"Unsupported integrator: {type(integrator).__name__}")
+
+
+class _Estimator:
+    def __init__(self) -> None:
+        super().__init__()
+        self.vertices: int = 0
+        self.triangles: int = 0
+        self.primitives: int = 0
+        self.plugins: Counter[str] = Counter()
+        self.warnings: list[str] = []
+
+    def visit(self, model: BaseModel) -> None:
+        for plugin in iter_plugins(model):
+            self.plugins[_plugin_kind(plugin)] += 1
+            match plugin:
+                case Obj(filename=filename) | Ply(filename=filename):
+                    self.mesh(filename)
+                case Cube():
+                    self.vertices += _CUBE_MESH[0]
+                    self.triangles += _CUBE_MESH[1]
+                # NOTE: The shapes of a shape group are only counted once, however often the group is instanced.
+                case Sphere() | Rectangle() | Instance():
+                    self.primitives += 1
+                case _:
+                    pass
+
+    def mesh(self, filename: str) -> None:
+        path = Path(filename)
+        try:
+            stat = path.stat()
+        except OSError:
+            self.warnings.append(f"Cannot estimate the size of missing mesh {filename!r}")
+            return
+        (vertices, triangles) = _mesh_size(path.resolve(), stat.st_size, stat.st_mtime_ns)
+        self.vertices += vertices
+        self.triangles += triangles
+
+    @property
+    def geometry_bytes(self: Self) -> int:
+        primitives = self.triangles + self.primitives
+        return (
+            self.vertices * _VERTEX_BYTES
+            + self.triangles * _TRIANGLE_BYTES
+            + primitives * _ACCELERATION_BYTES_PER_PRIMITIVE
+        )
+
+
+@traced("estimate")
+def estimate(scene: Scene, variant: None | str = None) -> Estimate:
+    """
+    Estimates the memory a scene takes while it is rendered, and the cost of rendering it, without loading it.
+
+    Args:
+        scene: The scene.
+        variant: The variant the scene is rendered with. Defaults to the current variant.
+    """
+    estimator = _Estimator()
+    estimator.visit(scene.integrator)
+    sensors = scene_sensors(scene)
+    for id, value in (scene.model_extra or {}).items():
+        # The sensors are visited below.
+        if id not in sensors:
+            estimator.visit(value)
+    for sensor in sensors.values():
+        estimator.visit(sensor)
+
+    samples = 0
+    film = 0
+    for sensor in sensors.values():
+        (_, _, width, height) = sensor.film.crop_window
+        samples += width * height * sensor.sampler.sample_count
+        film = max(film, film_bytes(sensor.film, scene.integrator, sensor.sampler.sample_count, variant))
+    primitives = estimator.triangles + estimator.primitives
+    # Every bounce of a path traces a ray and a shadow ray, each taking time logarithmic in the number of primitives.
+    cost = samples * _path_length(scene.integrator) * math.log2(primitives + 2)
+    return Estimate(
+        film_bytes=film,
+        geometry_bytes=estimator.geometry_bytes,
+        plugin_bytes=estimator.plugins.total() * _PLUGIN_BYTES,
+        primitives=primitives,
+        plugins=dict(estimator.plugins),
+        cost=cost,
+        warnings=estimator.warnings,
+    )
+
+
+def plan_tiles(scene: Scene, budget: int, variant: None | str = None) -> list[tuple[int, int, int, int]]:
+    """
+    Splits the crop window of the film of the scene's main sensor into tiles, as (x, y, width, height), small enough
+    for the scene to be rendered within `budget` bytes one tile at a time. Returns the crop window itself when the
+    scene fits as it is.
+
+    Tiles are bands of whole rows, which keeps their count low and their memory even. Every band is rendered widened by
+    the radius of the reconstruction filter (see `render_tiles`), which its size accounts for.
+
+    Args:
+        scene: The scene.
+        budget: Memory available to render the scene, in bytes.
+        variant: The variant the scene is rendered with. Defaults to the current variant.
+
+    Raises:
+        ValueError: If the scene does not fit even when rendered one row at a time.
+    """
+    result = estimate(scene, variant)
+    film = scene.sensor.film
+    window = film.crop_window
+    (x, y, width, height) = window
+    fixed = result.geometry_bytes + result.plugin_bytes
+    if fixed + film_bytes(film, scene.integrator, scene.sensor.sampler.sample_count, variant) <= budget:
+        return [window]
+    row = film_bytes(film.cropped(x, y, width, 1), scene.integrator, scene.sensor.sampler.sample_count, variant)
+    margin = math.ceil(filter_radius(film.rfilter))
+    rows = (budget - fixed) // row - 2 * margin
+    if rows < 1:
+        needed = f"{fixed + (1 + 2 * margin) * row} bytes even when rendered one row at a time"
+        raise ValueError(f"The scene needs {needed}, more than the budget of {budget} bytes")
+    return [(x, top, width, min(rows, y + height - top)) for top in range(y, y + height, rows)]
+
+
+def enforce_budget(
+    scene: Scene,
+    budget: int,
+    over_budget: OverBudget = "tile",
+    variant: None | str = None,
+) -> list[tuple[int, int, int, int]]:
+    """
+    Checks that a scene can be rendered within a memory budget, returning the tiles to render it in (see
+    `plan_tiles`); a single tile when it fits as it is.
+
+    Args:
+        scene: The scene.
+        budget: Memory available to render the scene, in bytes.
+        over_budget: What to do with scenes which do not fit: reject them, or render them in tiles.
+        variant: The variant the scene is rendered with. Defaults to the current variant.
+
+    Raises:
+        ValueError: If the scene does not fit and `over_budget` is "reject", or it does not fit even in tiles.
+    """
+    tiles = plan_tiles(scene, budget, variant)
+    if over_budget == "reject" and len(tiles) > 1:
+        total = estimate(scene, variant).total_bytes
+        raise ValueError(f"The scene needs about {total} bytes, more than the budget of {budget} bytes")
+    return tiles
+
+
+def render_tiles(
+    scene: Scene,
+    tiles: Sequence[tuple[int, int, int, int]],
+    *,
+    spp: None | int = None,
+    seed: int = 0,
+) -> npt.NDArray[np.float32]:
+    """
+    Renders the main sensor of a scene one tile at a time, from a single loaded copy of the scene, and returns the
+    image of the crop window of its film.
+
+    Every tile is rendered widened by the radius of the reconstruction filter (see `widen_by_filter`), and only its
+    interior is kept, so that pixels on the edges of tiles converge to the same values as in a render of the whole film.
+
+    Args:
+        scene: The scene.
+        tiles: Regions of the film to render, as (x, y, width, height), covering its crop window (see `plan_tiles`).
+        spp: Samples per pixel, overriding the sampler of the sensor.
+        seed: Seed of the first tile; every later tile uses the next one, so that tiles do not repeat each other's
+            noise.
+    """
+    film = scene.sensor.film
+    (left, top, width, height) = film.crop_window
+    # The scene is loaded with the film cropped to the first tile, so that no buffer for the whole film is allocated.
+    sensor = scene.sensor.model_copy(update={"film": film.cropped(*widen_by_filter(film, tiles[0]))})
+    mi_scene = load_scene(scene.model_copy(update={"sensor": sensor}))
+    params = mi.traverse(mi_scene)
+    image: None | npt.NDArray[np.float32] = None
+    for index, (x, y, tile_width, tile_height) in enumerate(tiles):
+        rendered = widen_by_filter(film, (x, y, tile_width, tile_height))
+        set_crop_window(params, rendered)
+        with trace("render", tile=(x, y, tile_width, tile_height)):
+            tile = np.array(render_synced(mi_scene, spp=spp or 0, seed=seed + index), dtype=np.float32)
+        if image is None:
+            image = np.zeros((height, width, tile.shape[2]), dtype=np.float32)
+        (x0, y0, _, _) = rendered
+        interior = tile[y - y0 : y - y0 + tile_height, x - x0 : x - x0 + tile_width]
+        image[y - top : y - top + tile_height, x - left : x - left + tile_width] = interior
+    assert image is not None
+    return image
@@ -0,0 +1,301 @@
+import functools
+import json
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from xml.sax.saxutils import quoteattr
+
+import mitsuba as mi
+import numpy as np
+import numpy.typing as npt
+from pydantic import BaseModel
+
+from mitsuba_wrapper.ref import Ref
+from mitsuba_wrapper.scene import Scene, SceneObject
+from mitsuba_wrapper.shape import Cube, Ply, Rectangle
+from mitsuba_wrapper.spectrum import RGB
+from mitsuba_wrapper.utils import Color3f, Point3f, Transform4f, Vector3f
+
+# The element a model is written as, by the module which defines it.
+_TAGS: Mapping[str, str] = {
+    "mitsuba_wrapper.bsdf": "bsdf",
+    "mitsuba_wrapper.emitter": "emitter",
+    "mitsuba_wrapper.film": "film",
+    "mitsuba_wrapper.integrator": "integrator",
+    "mitsuba_wrapper.medium": "medium",
+    "mitsuba_wrapper.phase": "phase",
+    "mitsuba_wrapper.reconstruction_filter": "rfilter",
+    "mitsuba_wrapper.sampler": "sampler",
+    "mitsuba_wrapper.sensor": "sensor",
+    "mitsuba_wrapper.shape": "shape",
+    "mitsuba_wrapper.spectrum": "spectrum",
+    "mitsuba_wrapper.texture": "texture",
+    "mitsuba_wrapper.volume": "volume",
+}
+_INDENT = "    "
+
+_PLY_VERTEX = np.dtype([
+    ("x", "<f4"),
+    ("y", "<f4"),
+    ("z", "<f4"),
+    ("nx", "<f4"),
+    ("ny", "<f4"),
+    ("nz", "<f4"),
+    ("u", "<f4"),
+    ("v", "<f4"),
+])
+_PLY_FACE = np.dtype([("count", "u1"), ("indices", "<u4", (3,))])
+# Number of shapes whose geometry is held in memory at once while writing a sidecar mesh.
+_BATCH_SIZE = 1 << 16
+
+type _Mergeable = Cube | Rectangle
+type _MergeKey = tuple[type[_Mergeable], Any, Any, Any, Any, bool]
+
+
+@dataclass(frozen=True, slots=True)
+class _Mesh:
+    positions: npt.NDArray[np.float64]
+    normals: npt.NDArray[np.float64]
+    texcoords: npt.NDArray[np.float64]
+    faces: npt.NDArray[np.uint32]
+
+
+@functools.cache
+def _cube_mesh() -> _Mesh:
+    # NOTE: Mitsuba builds cubes as meshes, so its own geometry is used to make sure merged cubes look the same.
+    params = mi.traverse(mi.load_dict({"type": "cube"}))
+    return _Mesh(
+        positions=np.array(params["vertex_positions"], dtype=np.float64).reshape(-1, 3),
+        normals=np.array(params["vertex_normals"], dtype=np.float64).reshape(-1, 3),
+        texcoords=np.array(params["vertex_texcoords"], dtype=np.float64).reshape(-1, 2),
+        faces=np.array(params["faces"], dtype=np.uint32).reshape(-1, 3),
+    )
+
+
+# Rectangles are analytic shapes in Mitsuba; this mesh spans the same square and has the same parameterization.
+_RECTANGLE_MESH = _Mesh(
+    positions=np.array([(-1, -1, 0), (1, -1, 0), (1, 1, 0), (-1, 1, 0)], dtype=np.float64),
+    normals=np.array([(0, 0, 1)] * 4, dtype=np.float64),
+    texcoords=np.array([(0, 0), (1, 0), (1, 1), (0, 1)], dtype=np.float64),
+    faces=np.array([(0, 1, 2), (2, 3, 0)], dtype=np.uint32),
+)
+
+
+def _matrix(transform: None | Transform4f) -> npt.NDArray[np.float64]:
+    """
+    Returns a transform as a row-major matrix.
+    """
+    if transform is None:
+        return np.eye(4)
+    return np.array([row.root for row in transform.root], dtype=np.float64)
+
+
+def _write_ply(path: Path, mesh: _Mesh, shapes: list[_Mergeable]) -> None:
+    """
+    Writes the geometry of `shapes`, each an instance of `mesh` placed by its `to_world`, as one binary PLY mesh.
+    """
+    vertex_count = len(mesh.positions)
+    header = [
+        "ply",
+        "format binary_little_endian 1.0",
+        f"element vertex {len(shapes) * vertex_count}",
+        *(f"property float {name}" for name in _PLY_VERTEX.names or ()),
+        f"element face {len(shapes) * len(mesh.faces)}",
+        "property list uchar uint vertex_indices",
+        "end_header",
+    ]
+    with path.open("wb") as f:
+        _ = f.write("".join(f"{line}\n" for line in header).encode("ascii"))
+        for start in range(0, len(shapes), _BATCH_SIZE):
+            matrices = np.stack([_matrix(shape.to_world) for shape in shapes[start : start + _BATCH_SIZE]])
+            linear = matrices[:, :3, :3]
+            positions = np.einsum("nij,vj->nvi", linear, mesh.positions) + matrices[:, None, :3, 3]
+            # Normals transform by the inverse transpose, computed as the cofactor matrix (with the sign of the
+            # determinant), which stays well-defined for rectangles scaled to zero along their normal.
+            (c0, c1, c2) = (linear[:, :, 0], linear[:, :, 1], linear[:, :, 2])
+            cofactor = np.stack([np.cross(c1, c2), np.cross(c2, c0), np.cross(c0, c1)], axis=-1)
+            cofactor *= np.where(np.linalg.det(linear) < 0, -1.0, 1.0)[:, None, None]
+            normals = np.einsum("nij,vj->nvi", cofactor, mesh.normals)
+            normals /= np.linalg.norm(normals, axis=-1, keepdims=True)
+            vertices = np.empty(positions.shape[:2], dtype=_PLY_VERTEX)
+            for axis, (p, n) in enumerate([("x", "nx"), ("y", "ny"), ("z", "nz")]):
+                vertices[p] = positions[..., axis]
+                vertices[n] = normals[..., axis]
+            vertices["u"] = mesh.texcoords[:, 0]
+            vertices["v"] = mesh.texcoords[:, 1]
+            _ = f.write(vertices.tobytes())
+        for start in range(0, len(shapes), _BATCH_SIZE):
+            offsets = np.arange(start, min(start + _BATCH_SIZE, len(shapes)), dtype=np.uint32) * vertex_count
+            faces = np.empty((len(offsets), len(mesh.faces)), dtype=_PLY_FACE)
+            faces["count"] = 3
+            faces["indices"] = mesh.faces[None] + offsets[:, None, None]
+            _ = f.write(faces.tobytes())
+
+
+def _merge_key(shape: SceneObject) -> None | _MergeKey:
+    if not isinstance(shape, Cube | Rectangle) or shape.silhouette_sampling_weight != 1:
+        return None
+    key = (type(shape), shape.bsdf, shape.emitter, shape.interior, shape.exterior, shape.flip_normals)
+    try:
+        _ = hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def _scene_objects(
+    scene: Scene,
+    mesh_dir: Path,
+    mesh_filename: Callable[[Path], str],
+    merge_threshold: None | int,
+) -> Iterator[tuple[str, SceneObject]]:
+    """
+    Yields the top-level objects of a scene in order, except that cubes and rectangles which share all of their
+    properties but their placement are merged into one mesh per group, written to `mesh_dir` and yielded last.
+    """
+    extras = scene.model_extra or {}
+    groups: dict[_MergeKey, list[tuple[str, _Mergeable]]] = {}
+    for id, value in extras.items():
+        if merge_threshold is not None and (key := _merge_key(value)) is not None:
+            groups.setdefault(key, []).append((id, value))
+        else:
+            yield (id, value)
+    for index, ((kind, bsdf, emitter, interior, exterior, flip_normals), members) in enumerate(groups.items()):
+        if merge_threshold is None or len(members) < merge_threshold:
+            yield from members
+            continue
+        mesh_dir.mkdir(parents=True, exist_ok=True)
+        path = mesh_dir / f"merged_{index}.ply"
+        _write_ply(path, _cube_mesh() if kind is Cube else _RECTANGLE_MESH, [shape for (_, shape) in members])
+        id = f"merged_{index}"
+        while id in extras:
+            id = f"{id}_"
+        yield (
+            id,
+            Ply(
+                filename=mesh_filename(path),
+                bsdf=bsdf,
+                emitter=emitter,
+                interior=interior,
+                exterior=exterior,
+                flip_normals=flip_normals,
+            ),
+        )
+
+
+def _format(values: Iterable[float]) -> str:
+    return ", ".join(repr(float(value)) for value in values)
+
+
+def _xml_attributes(**attributes: None | str) -> str:
+    return "".join(f" {key}={quoteattr(value)}" for key, value in attributes.items() if value is not None)
+
+
+def _xml_object(
+    model: BaseModel,
+    dumped: Mapping[str, Any],
+    depth: int,
+    name: None | str = None,
+    id: None | str = None,
+) -> Iterator[str]:
+    indent = _INDENT * depth
+    tag = _TAGS[type(model).__module__]
+    yield f"{indent}<{tag}{_xml_attributes(type=dumped['type'], name=name, id=id)}>\n"
+    for key, value in model:
+        if key != "type" and value is not None:
+            yield from _xml_property(key, value, dumped[key], depth + 1)
+    yield f"{indent}</{tag}>\n"
+
+
+def _xml_property(name: str, value: Any, dumped: Any, depth: int) -> Iterator[str]:
+    indent = _INDENT * depth
+    match value:
+        case Ref(id=id):
+            yield f"{indent}<ref{_xml_attributes(name=name, id=id)}/>\n"
+        case RGB(value=color) | (Color3f() as color):
+            yield f"{indent}<rgb{_xml_attributes(name=name, value=_format(color.root))}/>\n"
+        case Point3f() | Vector3f():
+            tag = "point" if isinstance(value, Point3f) else "vector"
+            yield f"{indent}<{tag}{_xml_attributes(name=name, value=_format(value.root))}/>\n"
+        case Transform4f():
+            matrix = " ".join(repr(entry) for entry in _matrix(value).ravel().tolist())
+            yield f"{indent}<transform{_xml_attributes(name=name)}>\n"
+            yield f"{indent}{_INDENT}<matrix{_xml_attributes(value=matrix)}/>\n"
+            yield f"{indent}</transform>\n"
+        case BaseModel():
+            yield from _xml_object(value, dumped, depth, name=name)
+        case _:
+            # Scalars are written the way they serialize, which takes custom serializers into account.
+            match dumped:
+                case bool():
+                    (tag, text) = ("boolean", str(dumped).lower())
+                case int():
+                    (tag, text) = ("integer", str(dumped))
+                case float():
+                    (tag, text) = ("float", repr(dumped))
+                case str():
+                    (tag, text) = ("string", dumped)
+                case _:
+                    raise ValueError(f"Cannot write property {name!r} of type {type(value).__name__} as XML")
+            yield f"{indent}<{tag}{_xml_attributes(name=name, value=text)}/>\n"
+
+
+def _xml_document(scene: Scene, objects: Iterable[tuple[str, SceneObject]]) -> Iterator[str]:
+    yield '<scene version="3.0.0">\n'
+    for model in (scene.integrator, scene.sensor):
+        yield from _xml_object(model, model.model_dump(mode="json"), 1)
+    for id, value in objects:
+        # NOTE: Mitsuba reserves IDs with a leading underscore, such as those the importer gives unnamed objects.
+        # Nothing can refer to an unnamed object, so it is written without an ID.
+        yield from _xml_object(value, value.model_dump(mode="json"), 1, id=None if id.startswith("_") else id)
+    yield "</scene>\n"
+
+
+def _json_document(scene: Scene, objects: Iterable[tuple[str, SceneObject]]) -> Iterator[str]:
+    yield f'{{"type": "scene",\n"integrator": {scene.integrator.model_dump_json(exclude_none=True)},\n'
+    yield f'"sensor": {scene.sensor.model_dump_json(exclude_none=True)}'
+    for id, value in objects:
+        yield f",\n{json.dumps(id)}: {value.model_dump_json(exclude_none=True)}"
+    yield "}\n"
+
+
+def export_xml(scene: Scene, path: str | Path, merge_threshold: None | int = 2) -> None:
+    """
+    Writes a scene as a Mitsuba 3 scene file.
+
+    The file is written one object at a time, so only the object being written is ever converted, and no Mitsuba
+    objects are created. Cubes and rectangles which differ only in their placement are merged into a single binary
+    PLY mesh per group, stored in a directory next to the scene file (named after it, with the suffix `_meshes`) and
+    referenced by a relative path, so the scene file stays small no matter how many of them the scene contains.
+
+    Args:
+        scene: The scene to write.
+        path: The scene file.
+        merge_threshold: Minimum number of shapes in a group for it to be merged, or None to write every shape as is.
+    """
+    path = Path(path)
+    mesh_dir = path.parent / f"{path.stem}_meshes"
+    objects = _scene_objects(scene, mesh_dir, lambda mesh: mesh.relative_to(path.parent).as_posix(), merge_threshold)
+    with path.open("w", encoding="utf-8") as f:
+        f.writelines(_xml_document(scene, objects))
+
+
+def export_json(scene: Scene, path: str | Path, merge_threshold: None | int = 2) -> None:
+    """
+    Writes a scene as JSON, in the form `Scene.model_validate_json` reads.
+
+    Like `export_xml`, the file is written one object at a time, and groups of cubes and rectangles are merged into
+    binary PLY meshes stored next to it. The meshes are referenced by absolute paths, since Mitsuba resolves the
+    filenames of scenes loaded from dictionaries against the working directory.
+
+    Args:
+        scene: The scene to write.
+        path: The JSON file.
+        merge_threshold: Minimum number of shapes in a group for it to be merged, or None to write every shape as is.
+    """
+    path = Path(path)
+    mesh_dir = path.parent / f"{path.stem}_meshes"
+    objects = _scene_objects(scene, mesh_dir, lambda mesh: str(mesh.resolve()), merge_threshold)
+    with path.open("w", encoding="utf-8") as f:
+        f.writelines(_json_document(scene, objects))
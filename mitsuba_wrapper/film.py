@@ -1,37 +1,50 @@
-from typing import Literal, final
+import builtins
+from itertools import pairwise
+from typing import Literal, Self, final
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 from mitsuba_wrapper.reconstruction_filter import GaussianFilter, ReconstructionFilter
+from mitsuba_wrapper.spectrum import Regular, Spectrum
 
 type FileFormatType = Literal["openexr", "rgbe", "pfm"]
 type PixelFormatType = Literal["luminance", "luminance_alpha", "rgb", "rgba", "xyz", "xyza"]
 type ComponentFormatType = Literal["float16", "float32", "uint32"]
 
 type HDRFilmType = Literal["hdrfilm"]
+type SpecFilmType = Literal["specfilm"]
 
-# Having a type declared this way is not supported by pydantic; causes model errors.
-# type FilmType = HDRFilmType
-# type Film = HDRFilm
+# NOTE: Declaring an alias for a single model is not supported by pydantic (it causes model errors), so these aliases
+# only became possible once there was more than one film.
+type FilmType = HDRFilmType | SpecFilmType
+type Film = HDRFilm | SpecFilm
 
 
-@final
-class HDRFilm(BaseModel, frozen=True):
+class FilmLike(BaseModel, frozen=True):
     width: int = Field(default=768, description="Width of the film in pixels")
     height: int = Field(default=576, description="Height of the film in pixels")
-    file_format: FileFormatType = Field(
-        default="openexr",
+    crop_offset_x: None | int = Field(
+        default=None,
+        ge=0,
         description="""
-            Denotes the desired output file format. The options are openexr (for ILM's OpenEXR format), rgbe (for Greg
-            Ward's RGBE format), or pfm (for the Portable Float Map format)
+            Horizontal offset of the region of the film which is rendered. When a region is given, only that region is
+            rendered, and the rendered image has the size of the region. (Default: 0)
         """,
     )
-    pixel_format: PixelFormatType = Field(
-        default="rgb",
-        description="""
-            Specifies the desired pixel format of output images. The options are luminance, luminance_alpha, rgb, rgba,
-            xyz and xyza
-        """,
+    crop_offset_y: None | int = Field(
+        default=None,
+        ge=0,
+        description="Vertical offset of the region of the film which is rendered. (Default: 0)",
+    )
+    crop_width: None | int = Field(
+        default=None,
+        gt=0,
+        description="Width of the region of the film which is rendered. (Default: the rest of the film)",
+    )
+    crop_height: None | int = Field(
+        default=None,
+        gt=0,
+        description="Height of the region of the film which is rendered. (Default: the rest of the film)",
     )
     component_format: ComponentFormatType = Field(
         default="float16",
@@ -61,4 +74,91 @@ class HDRFilm(BaseModel, frozen=True):
         default_factory=GaussianFilter,
         description="Reconstruction filter that should be used by the film",
     )
+
+    @model_validator(mode="after")
+    def check_crop(self: Self) -> Self:
+        (x, y, width, height) = self.crop_window
+        if width <= 0 or height <= 0 or x + width > self.width or y + height > self.height:
+            raise ValueError(f"The crop window {self.crop_window} does not fit the film ({self.width}x{self.height})")
+        return self
+
+    @property
+    def crop_window(self: Self) -> tuple[int, int, int, int]:
+        """
+        The region of the film which is rendered, as (x, y, width, height).
+        """
+        x = self.crop_offset_x or 0
+        y = self.crop_offset_y or 0
+        width = self.width - x if self.crop_width is None else self.crop_width
+        height = self.height - y if self.crop_height is None else self.crop_height
+        return (x, y, width, height)
+
+    def cropped(self: Self, x: int, y: int, width: int, height: int) -> Self:
+        """
+        Returns a copy of the film which only renders the given region (of the whole film).
+        """
+        crop = {"crop_offset_x": x, "crop_offset_y": y, "crop_width": width, "crop_height": height}
+        return self.model_validate({**dict(self), **crop})
+
+
+@final
+class HDRFilm(FilmLike, frozen=True):
+    file_format: FileFormatType = Field(
+        default="openexr",
+        description="""
+            Denotes the desired output file format. The options are openexr (for ILM's OpenEXR format), rgbe (for Greg
+            Ward's RGBE format), or pfm (for the Portable Float Map format)
+        """,
+    )
+    pixel_format: PixelFormatType = Field(
+        default="rgb",
+        description="""
+            Specifies the desired pixel format of output images. The options are luminance, luminance_alpha, rgb, rgba,
+            xyz and xyza. Images rendered by an AOV integrator carry the AOV channels after those of the pixel format
+        """,
+    )
     type: HDRFilmType = "hdrfilm"
+
+
+@final
+class SpecFilm(FilmLike, extra="allow", frozen=True):
+    """
+    A film recording one channel per sensor response function (band), so that any number of spectral bands comes out
+    of a single render. Requires a spectral variant, and is always written as OpenEXR.
+
+    The bands are given as additional fields, whose names are used as the names of the channels.
+    """
+
+    __pydantic_extra__: dict[str, Spectrum]  # pyright: ignore[reportIncompatibleVariableOverride]
+    type: SpecFilmType = "specfilm"
+
+    def channel_names(self: Self) -> list[str]:
+        """
+        Returns the names of the channels of an image rendered with this film, in order.
+        """
+        # NOTE: Mitsuba orders the bands by name, not by the order in which they are declared.
+        return sorted(self.model_extra or {})
+
+    # NOTE: `type` is the field above within the class body, so the builtin is spelled out.
+    @classmethod
+    def with_bands(
+        cls: builtins.type[Self],
+        wavelength_min: float = 400.0,
+        wavelength_max: float = 700.0,
+        count: int = 3,
+        **kwargs: object,
+    ) -> Self:
+        """
+        Returns a film with `count` bands of equal width spanning the given range of wavelengths, each of which
+        responds uniformly to the wavelengths it covers.
+
+        Args:
+            wavelength_min: Minimum wavelength of the first band in nanometers.
+            wavelength_max: Maximum wavelength of the last band in nanometers.
+            count: Number of bands.
+            kwargs: Other fields of the film.
+        """
+        width = (wavelength_max - wavelength_min) / count
+        edges = [wavelength_min + i * width for i in range(count + 1)]
+        bands = {f"{lo:g}-{hi:g}nm": Regular.box(lo, hi) for lo, hi in pairwise(edges)}
+        return cls.model_validate(kwargs | bands)
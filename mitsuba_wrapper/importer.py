@@ -0,0 +1,327 @@
+import hashlib
+import re
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, final
+from xml.etree import ElementTree
+
+import mitsuba as mi
+import numpy as np
+import numpy.typing as npt
+
+from mitsuba_wrapper.intern import intern
+from mitsuba_wrapper.scene import Scene
+from mitsuba_wrapper.snapshot import SceneSnapshot, write_snapshot
+from mitsuba_wrapper.tracing import trace, traced
+from mitsuba_wrapper.utils import Transform4f, atomic_write
+from mitsuba_wrapper.utils import cache_dir as default_cache_dir
+
+# Tags of elements which declare plugins, as opposed to setting properties of the plugin they are nested in. Spectra
+# are only plugins when they have a type.
+_OBJECT_TAGS = frozenset({
+    "bsdf",
+    "emitter",
+    "film",
+    "integrator",
+    "medium",
+    "phase",
+    "rfilter",
+    "sampler",
+    "sensor",
+    "shape",
+    "spectrum",
+    "texture",
+    "volume",
+})
+# The property a nested plugin (or a reference to one) is assigned to when its element does not name one.
+_DEFAULT_NAMES: Mapping[str, str] = {
+    "bsdf": "bsdf",
+    "emitter": "emitter",
+    "film": "film",
+    "integrator": "integrator",
+    "phase": "phase",
+    "rfilter": "rfilter",
+    "sampler": "sampler",
+}
+_VARIABLE = re.compile(r"\$(\w+)")
+_SEPARATOR = re.compile(r"[\s,]+")
+
+
+@dataclass(slots=True)
+class _Object:
+    tag: str
+    attributes: dict[str, str]
+    properties: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class _Transform:
+    name: str
+    matrix: npt.NDArray[np.float64] = field(default_factory=lambda: np.eye(4))
+
+
+def _value(frame: _Object) -> dict[str, Any]:
+    return {"type": frame.attributes["type"], **frame.properties}
+
+
+def _floats(text: str) -> list[float]:
+    return [float(value) for value in _SEPARATOR.split(text.strip())]
+
+
+def _vector(attributes: Mapping[str, str], default: float) -> list[float]:
+    if "value" in attributes:
+        values = _floats(attributes["value"])
+        return values * 3 if len(values) == 1 else values
+    return [float(attributes.get(axis, default)) for axis in ("x", "y", "z")]
+
+
+def _transform_op(tag: str, attributes: Mapping[str, str]) -> npt.NDArray[np.float64]:
+    """
+    Returns the matrix of a transform operation such as `<translate x="1"/>`.
+    """
+    match tag:
+        case "translate":
+            transform = mi.ScalarTransform4f.translate(_vector(attributes, 0.0))
+        case "scale":
+            transform = mi.ScalarTransform4f.scale(_vector(attributes, 1.0))
+        case "rotate":
+            axis = _vector(attributes, 0.0)
+            transform = mi.ScalarTransform4f.rotate(axis, float(attributes["angle"]))
+        case "lookat":
+            transform = mi.ScalarTransform4f.look_at(
+                origin=_floats(attributes["origin"]),
+                target=_floats(attributes["target"]),
+                up=_floats(attributes.get("up", "0, 1, 0")),
+            )
+        case "matrix":
+            values = _floats(attributes["value"])
+            match len(values):
+                case 16:
+                    return np.array(values).reshape(4, 4)
+                case 9:
+                    matrix = np.eye(4)
+                    matrix[:3, :3] = np.array(values).reshape(3, 3)
+                    return matrix
+                case n:
+                    raise ValueError(f"A transformation matrix needs 9 or 16 values, got {n}")
+        case _:
+            raise ValueError(f"Unsupported transform operation <{tag}>")
+    return np.array(transform.matrix, dtype=np.float64)
+
+
+class _Parser:
+    def __init__(self, path: Path, parameters: Mapping[str, object]) -> None:
+        super().__init__()
+        self.base_dir: Path = path.parent.resolve()
+        self.parameters: dict[str, str] = {name: str(value) for name, value in parameters.items()}
+        self.scene: dict[str, Any] = {}
+        # The tag of every top-level object, by ID, to tell what unnamed references refer to.
+        self.kinds: dict[str, str] = {}
+        self.unnamed: int = 0
+        self.stack: list[None | _Object | _Transform] = []
+
+    def substitute(self, value: str) -> str:
+        def lookup(match: re.Match[str]) -> str:
+            if (name := match[1]) not in self.parameters:
+                raise ValueError(f"Undefined parameter ${name}")
+            return self.parameters[name]
+
+        return _VARIABLE.sub(lookup, value)
+
+    def start(self, tag: str, attributes: dict[str, str]) -> None:
+        parent = self.stack[-1] if self.stack else None
+        frame: None | _Object | _Transform = None
+        match tag:
+            case "scene" if not self.stack:
+                pass
+            case "default" if len(self.stack) == 1:
+                # Parameters passed by the caller take precedence over the defaults declared by the scene.
+                if attributes["name"] not in self.parameters:
+                    self.parameters[attributes["name"]] = attributes["value"]
+            case _ if tag in _OBJECT_TAGS and (tag != "spectrum" or "type" in attributes):
+                frame = _Object(tag, attributes)
+            case "transform" if isinstance(parent, _Object):
+                frame = _Transform(attributes["name"])
+            case _ if isinstance(parent, _Transform):
+                parent.matrix = _transform_op(tag, attributes) @ parent.matrix
+            case "ref" if isinstance(parent, _Object):
+                self.set_reference(parent, attributes)
+            case _ if isinstance(parent, _Object):
+                self.set_property(parent, tag, attributes)
+            case _:
+                raise ValueError(f"Unexpected element <{tag}>")
+        self.stack.append(frame)
+
+    def end(self) -> None:
+        frame = self.stack.pop()
+        parent = self.stack[-1] if self.stack else None
+        match frame:
+            case _Transform(name=name, matrix=matrix):
+                assert isinstance(parent, _Object)
+                # NOTE: to_transform4f expects a Mitsuba matrix, which iterates over its columns rather than its rows.
+                parent.properties[name] = Transform4f.to_transform4f(matrix.T)
+            case _Object() if len(self.stack) == 1:
+                self.add_top_level(frame)
+            case _Object():
+                assert isinstance(parent, _Object)
+                parent.properties[self.child_name(parent, frame)] = _value(frame)
+            case _:
+                pass
+
+    def fresh_id(self) -> str:
+        self.unnamed += 1
+        return f"_unnamed_{self.unnamed - 1}"
+
+    def child_name(self, parent: _Object, child: _Object) -> str:
+        if (name := child.attributes.get("name")) is not None:
+            return name
+        if (child.tag, parent.attributes.get("type")) in {("shape", "shapegroup"), ("sensor", "batch")}:
+            return child.attributes.get("id") or self.fresh_id()
+        if (name := _DEFAULT_NAMES.get(child.tag)) is None:
+            raise ValueError(f"A <{child.tag}> nested in a <{parent.tag}> must have a name")
+        return name
+
+    def add_top_level(self, frame: _Object) -> None:
+        # The first sensor is the scene's `sensor`; any others are kept as objects, by their ID.
+        if frame.tag == "integrator" or (frame.tag == "sensor" and "sensor" not in self.scene):
+            if frame.tag in self.scene:
+                raise ValueError(f"Scenes with more than one <{frame.tag}> are not supported")
+            self.scene[frame.tag] = _value(frame)
+            return
+        id = frame.attributes.get("id") or self.fresh_id()
+        if id in self.scene or id in {"integrator", "sensor", "type"}:
+            raise ValueError(f"Duplicate ID {id!r}")
+        self.kinds[id] = frame.tag
+        self.scene[id] = _value(frame)
+
+    def set_reference(self, parent: _Object, attributes: Mapping[str, str]) -> None:
+        id = attributes["id"]
+        if id not in self.kinds:
+            raise ValueError(f"Reference to undefined ID {id!r}")
+        if (name := attributes.get("name")) is None:
+            # Instances refer to their shape group; otherwise the kind of the referenced object determines the property.
+            name = "shapegroup" if parent.attributes.get("type") == "instance" else _DEFAULT_NAMES.get(self.kinds[id])
+        if name is None:
+            raise ValueError(f"A reference to the <{self.kinds[id]}> {id!r} must have a name")
+        parent.properties[name] = {"type": "ref", "id": id}
+
+    def set_property(self, parent: _Object, tag: str, attributes: Mapping[str, str]) -> None:
+        name = attributes["name"]
+        match tag:
+            case "integer":
+                value = int(attributes["value"])
+            case "float":
+                value = float(attributes["value"])
+            case "boolean":
+                if (text := attributes["value"].lower()) not in {"true", "false"}:
+                    raise ValueError(f"Invalid boolean {attributes['value']!r} for {name!r}")
+                value = text == "true"
+            case "string" if name == "filename":
+                # Mitsuba resolves files relative to the scene file, so make them independent of the working directory.
+                value = str(self.base_dir / attributes["value"])
+            case "string":
+                value = attributes["value"]
+            case "point" | "vector":
+                value = _vector(attributes, 0.0)
+            case "rgb":
+                color = _floats(attributes["value"])
+                value = {"type": "rgb", "value": color * 3 if len(color) == 1 else color}
+            case "spectrum" if "value" in attributes and ":" in attributes["value"]:
+                pairs = [pair.split(":") for pair in attributes["value"].replace(",", " ").split()]
+                value = {
+                    "type": "irregular",
+                    "wavelengths": [float(wavelength) for wavelength, _ in pairs],
+                    "values": [float(value) for _, value in pairs],
+                }
+            case "spectrum" if "value" in attributes:
+                value = {"type": "uniform", "value": float(attributes["value"])}
+            case _:
+                raise ValueError(f"Unsupported property <{tag}> {name!r}")
+        parent.properties[name] = value
+
+
+@traced("parse_xml")
+def parse_xml(path: str | Path, **parameters: object) -> Scene:
+    """
+    Parses a Mitsuba 3 scene file into a `Scene`.
+
+    The file is streamed, and each element is discarded as soon as it has been converted, so memory usage is
+    proportional to the resulting model rather than to the size of the file. Relative filenames are resolved against
+    the directory of the scene file.
+
+    Args:
+        path: The scene file.
+        parameters: Values for the scene's parameters, which take precedence over its `<default>` declarations.
+
+    Raises:
+        ValueError: If the file uses an element or plugin the models do not support.
+    """
+    path = Path(path)
+    parser = _Parser(path, parameters)
+    for event, element in ElementTree.iterparse(path, events=("start", "end")):
+        if event == "start":
+            parser.start(element.tag, {key: parser.substitute(value) for key, value in element.attrib.items()})
+        else:
+            parser.end()
+            element.clear()
+    with trace("validate"):
+        return Scene.model_validate({"integrator": {"type": "path"}} | parser.scene)
+
+
+@final
+class SceneImporter:
+    """
+    Imports scene files, caching the result.
+
+    Imported scenes go through the same optimization passes as scenes built in Python. The optimized model is stored as
+    a binary snapshot (see `write_snapshot`) in a cache directory shared by all workers on a host, keyed by the scene
+    file (path, size and modification time) and the parameters, and later imports of the same scene load the snapshot
+    instead of parsing and optimizing the file again. Snapshots hold no code, so reading one written by another worker
+    is safe. Cached scenes which cannot be read or no longer validate (e.g. after the models changed) are imported
+    again, as are scenes which are not cached.
+
+    NOTE: Only the scene file itself is part of the key; meshes and textures it refers to are loaded by Mitsuba (or
+    the texture manager) when the scene is rendered.
+    """
+
+    def __init__(self, cache_dir: Path | None = None) -> None:
+        self.cache_dir: Path = cache_dir if cache_dir is not None else default_cache_dir("scenes")
+
+    def cache_path(self, path: str | Path, optimize: bool = True, **parameters: object) -> Path:
+        """
+        Returns the path of the cached scene imported from `path` with the given parameters.
+        """
+        source = Path(path).resolve()
+        stat = source.stat()
+        arguments = "\0".join(f"{name}={value}" for name, value in sorted(parameters.items()))
+        key = f"{source}\0{stat.st_size}\0{stat.st_mtime_ns}\0{optimize}\0{arguments}"
+        return self.cache_dir / f"{hashlib.sha256(key.encode()).hexdigest()[:32]}.snapshot"
+
+    @traced("import")
+    def load(self, path: str | Path, optimize: bool = True, **parameters: object) -> Scene:
+        """
+        Returns the scene defined by a scene file, parsing it (and populating the cache) on a miss.
+
+        Args:
+            path: The scene file.
+            optimize: Whether to run the scene through `intern`.
+            parameters: Values for the scene's parameters, which take precedence over its `<default>` declarations.
+        """
+        cached = self.cache_path(path, optimize, **parameters)
+        try:
+            return SceneSnapshot(cached).scene()
+        except (OSError, ValueError):
+            # Missing, unreadable, truncated and stale snapshots alike (`ValidationError` is a `ValueError`).
+            pass
+        scene = parse_xml(path, **parameters)
+        if optimize:
+            scene = intern(scene)
+        self._store(cached, scene)
+        # Snapshots store transforms and vectors in single precision; return what later hits will return.
+        return SceneSnapshot(cached).scene()
+
+    @staticmethod
+    def _store(path: Path, scene: Scene) -> None:
+        with atomic_write(path) as temporary:
+            write_snapshot(scene, temporary)
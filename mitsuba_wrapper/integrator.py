@@ -1,13 +1,87 @@
-from typing import Literal, final
+import builtins
+from collections.abc import Mapping
+from typing import Literal, Self, final
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_serializer, field_validator
 
+from mitsuba_wrapper.film import PixelFormatType
+
+type DirectType = Literal["direct"]
 type PathType = Literal["path"]
 type VolPathType = Literal["volpath"]
 type VolPathMisType = Literal["volpathmis"]
+type AOVType = Literal["aov"]
+type StokesType = Literal["stokes"]
+
+type IntegratorType = DirectType | PathType | VolPathType | VolPathMisType | AOVType | StokesType
+type Integrator = Direct | Path | VolPath | VolPathMis | AOV | Stokes
+
+type AOVKind = Literal[
+    "albedo",
+    "depth",
+    "position",
+    "uv",
+    "geo_normal",
+    "sh_normal",
+    "dp_du",
+    "dp_dv",
+    "duv_dx",
+    "duv_dy",
+    "prim_index",
+    "shape_index",
+]
 
-type IntegratorType = PathType | VolPathType | VolPathMisType
-type Integrator = Path | VolPath | VolPathMis
+# The names Mitsuba gives to the channels of each pixel format and of each kind of AOV (as suffixes of the AOV's name).
+_PIXEL_FORMAT_CHANNELS: Mapping[PixelFormatType, tuple[str, ...]] = {
+    "luminance": ("Y",),
+    "luminance_alpha": ("Y", "A"),
+    "rgb": ("R", "G", "B"),
+    "rgba": ("R", "G", "B", "A"),
+    "xyz": ("X", "Y", "Z"),
+    "xyza": ("X", "Y", "Z", "A"),
+}
+_AOV_CHANNELS: Mapping[AOVKind, tuple[str, ...]] = {
+    "albedo": ("R", "G", "B"),
+    "depth": ("T",),
+    "position": ("X", "Y", "Z"),
+    "uv": ("U", "V"),
+    "geo_normal": ("X", "Y", "Z"),
+    "sh_normal": ("X", "Y", "Z"),
+    "dp_du": ("X", "Y", "Z"),
+    "dp_dv": ("X", "Y", "Z"),
+    "duv_dx": ("U", "V"),
+    "duv_dy": ("U", "V"),
+    "prim_index": ("I",),
+    "shape_index": ("I",),
+}
+
+
+@final
+class Direct(BaseModel, frozen=True):
+    shading_samples: int = Field(
+        default=1,
+        description="""
+            This convenience parameter can be used to set both emitter_samples and bsdf_samples at the same time
+        """,
+    )
+    emitter_samples: None | int = Field(
+        default=None,
+        description="""
+            Optional more fine-grained parameter: specifies the number of samples that should be generated using the
+            direct illumination strategies implemented by the scene's emitters. (Default: set to the value of
+            shading_samples)
+        """,
+    )
+    bsdf_samples: None | int = Field(
+        default=None,
+        description="""
+            Optional more fine-grained parameter: specifies the number of samples that should be generated using the
+            BSDF sampling strategies implemented by the scene's surfaces. (Default: set to the value of
+            shading_samples)
+        """,
+    )
+    hide_emitters: bool = Field(default=False, description="Hide directly visible emitters")
+    type: DirectType = "direct"
 
 
 class PathBasedIntegrator(BaseModel, frozen=True):
@@ -44,3 +118,86 @@ class VolPath(PathBasedIntegrator, frozen=True):
 @final
 class VolPathMis(PathBasedIntegrator, frozen=True):
     type: VolPathMisType = "volpathmis"
+
+
+@final
+class AOV(BaseModel, frozen=True):
+    """
+    Renders arbitrary output variables (AOVs) alongside the image produced by another integrator, in a single pass.
+
+    The film stores the channels of its pixel format first, followed by the channels of every AOV in order.
+    """
+
+    aovs: dict[str, AOVKind] = Field(
+        description="""
+            Mapping from the name of each AOV to the kind of value it records. The name is used as the prefix of the
+            AOV's channels, and hence as the name of its layer in OpenEXR output
+        """,
+    )
+    integrator: Path | VolPath | VolPathMis = Field(
+        default_factory=Path,
+        description="Integrator rendering the image the AOVs are recorded alongside",
+    )
+    type: AOVType = "aov"
+
+    @field_serializer("aovs")
+    def aovs_serializer(self: Self, aovs: dict[str, AOVKind]) -> str:  # noqa: PLR6301
+        return ",".join(f"{name}:{kind}" for name, kind in aovs.items())
+
+    # NOTE: `type` is the field above within the class body, so the builtin is spelled out.
+    @field_validator("aovs", mode="before")
+    @classmethod
+    def aovs_validator(cls: builtins.type[Self], aovs: object) -> object:
+        # Accept the serialized form as well (which is also how Mitsuba's XML spells it), so that dumped scenes can be
+        # validated again.
+        if not isinstance(aovs, str):
+            return aovs
+        parsed: dict[str, str] = {}
+        for pair in aovs.split(","):
+            name, separator, kind = pair.partition(":")
+            if not separator:
+                raise ValueError(f"Expected an AOV of the form name:kind, got {pair!r}")
+            parsed[name.strip()] = kind.strip()
+        return parsed
+
+    def channel_names(self: Self, pixel_format: PixelFormatType) -> list[str]:
+        """
+        Returns the names of the channels of an image rendered with this integrator, in order.
+
+        Args:
+            pixel_format: The pixel format of the film.
+        """
+        return [
+            *_PIXEL_FORMAT_CHANNELS[pixel_format],
+            *(f"{name}.{channel}" for name, kind in self.aovs.items() for channel in _AOV_CHANNELS[kind]),
+        ]
+
+
+@final
+class Stokes(BaseModel, frozen=True):
+    """
+    Renders the full polarization state of light as a Stokes vector alongside the image produced by another integrator,
+    in a single pass. Requires a polarized variant.
+
+    The film stores the channels of its pixel format first, followed by the color channels of the four Stokes
+    components S0 (intensity), S1 (horizontal vs. vertical), S2 (diagonal) and S3 (circular polarization).
+    """
+
+    integrator: Path | VolPath | VolPathMis = Field(
+        default_factory=Path,
+        description="Integrator rendering the image and the Stokes vector",
+    )
+    type: StokesType = "stokes"
+
+    @staticmethod
+    def channel_names(pixel_format: PixelFormatType, variant: str) -> list[str]:
+        """
+        Returns the names of the channels of an image rendered with this integrator, in order.
+
+        Args:
+            pixel_format: The pixel format of the film.
+            variant: The variant the image is rendered with; monochromatic variants have one channel per component.
+        """
+        if "_mono" in variant:
+            return [*_PIXEL_FORMAT_CHANNELS[pixel_format], *(f"S{i}" for i in range(4))]
+        return [*_PIXEL_FORMAT_CHANNELS[pixel_format], *(f"S{i}.{c}" for i in range(4) for c in ("R", "G", "B"))]
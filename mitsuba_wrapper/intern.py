@@ -0,0 +1,176 @@
+from collections import Counter
+from collections.abc import Iterable, Iterator, Mapping
+
+from mitsuba_wrapper.bsdf import BSDF, Conductor, Dielectric, Diffuse, Null, Polarizer
+from mitsuba_wrapper.emitter import Area, Constant, Emitter, Envmap, Point
+from mitsuba_wrapper.ref import ID, Ref
+from mitsuba_wrapper.scene import Scene, SceneObject
+from mitsuba_wrapper.shape import SHAPE_TYPES, Primitive, Shape, iter_primitives, map_primitives
+from mitsuba_wrapper.spectrum import D65, RGB, SRGB, Irregular, Regular, Spectrum, Uniform
+from mitsuba_wrapper.texture import Bitmap, Checkerboard, Texture
+from mitsuba_wrapper.tracing import traced
+
+_BSDF_TYPES: tuple[type[BSDF], ...] = (Diffuse, Dielectric, Conductor, Null, Polarizer)
+_EMITTER_TYPES: tuple[type[Emitter], ...] = (Area, Point, Constant, Envmap)
+_TEXTURE_TYPES: tuple[type[Spectrum | Texture], ...] = (
+    RGB,
+    SRGB,
+    Uniform,
+    D65,
+    Regular,
+    Irregular,
+    Bitmap,
+    Checkerboard,
+)
+
+# Spectrum- and texture-valued fields which Mitsuba evaluates as reflectances (inline rgb expands to srgb) and as
+# emission (inline rgb expands to a d65 illuminant scaled by the color).
+_REFLECTANCE_FIELDS: Mapping[type[BSDF], tuple[str, ...]] = {
+    Diffuse: ("reflectance",),
+    Dielectric: ("specular_reflectance", "specular_transmittance"),
+    Conductor: ("specular_reflectance",),
+}
+_EMISSION_FIELDS: Mapping[type[Emitter], tuple[str, ...]] = {
+    Area: ("radiance",),
+    Point: ("intensity",),
+    Constant: ("radiance",),
+}
+
+
+def _promote(texture: Spectrum | Texture, emission: bool) -> Spectrum | Texture:
+    """
+    Returns the plugin an inline spectrum expands to. Inline rgb values are not plugins, so they cannot be referenced
+    from the top level of a scene; we replace them with the plugin Mitsuba would have created for them.
+    """
+    match texture:
+        case RGB(value=value):
+            return D65(color=value) if emission else SRGB(color=value)
+        case _:
+            return texture
+
+
+def _textures[M: BSDF | Emitter](
+    model: M,
+    fields: Mapping[type[M], tuple[str, ...]],
+) -> Iterator[tuple[str, Spectrum | Texture]]:
+    for field in fields.get(type(model), ()):
+        value = getattr(model, field)
+        if not isinstance(value, Ref):
+            yield (field, value)
+
+
+class _IDAllocator:
+    def __init__(self, taken: Iterable[str]) -> None:
+        super().__init__()
+        self.taken: set[str] = set(taken)
+        self.counters: Counter[str] = Counter()
+
+    def __call__(self, kind: str) -> ID:
+        while (id := f"interned_{kind}_{self.counters[kind]}") in self.taken:
+            self.counters[kind] += 1
+        self.taken.add(id)
+        return ID(id)
+
+
+@traced("intern")
+def intern(scene: Scene, min_uses: int = 2) -> Scene:
+    """
+    Deduplicates inline BSDFs, spectra and textures in a scene by promoting them to top-level definitions and replacing
+    their usages with references.
+
+    Inline BSDFs used by at least `min_uses` shapes are promoted first. Afterwards, spectra and textures used at least
+    `min_uses` times by BSDFs and emitters are promoted. Inline models which are equal to an existing top-level
+    definition are always replaced with a reference to it.
+
+    NOTE: Emitters themselves are never shared: Mitsuba attaches an area emitter to exactly one shape and refuses to
+    load a scene where an emitter is referenced by several shapes. Their spectra and textures are shared instead, which
+    is where the duplication (and the plugin count) lives.
+
+    Args:
+        scene: The scene to intern.
+        min_uses: Minimum number of usages of an inline model before it is promoted to a top-level definition.
+    """
+    extras: dict[str, SceneObject] = dict(scene.model_extra or {})
+    fresh_id = _IDAllocator([*extras, *Scene.model_fields])
+    shapes: dict[str, Shape] = {id: v for id, v in extras.items() if isinstance(v, SHAPE_TYPES)}
+
+    # Existing definitions take precedence over new ones.
+    bsdf_ids: dict[BSDF, ID] = {}
+    texture_ids: dict[Spectrum | Texture, ID] = {}
+    for id, value in extras.items():
+        if isinstance(value, _BSDF_TYPES) and value not in bsdf_ids:
+            bsdf_ids[value] = ID(id)
+        elif isinstance(value, _TEXTURE_TYPES) and value not in texture_ids:
+            texture_ids[value] = ID(id)
+
+    # Pass 1: BSDFs.
+    bsdf_uses = Counter(shape.bsdf for shape in iter_primitives(shapes) if isinstance(shape.bsdf, _BSDF_TYPES))
+    new_definitions: dict[str, SceneObject] = {}
+    for bsdf, uses in bsdf_uses.items():
+        if bsdf not in bsdf_ids and uses >= min_uses:
+            bsdf_ids[bsdf] = fresh_id("bsdf")
+            new_definitions[bsdf_ids[bsdf]] = bsdf
+
+    def intern_bsdf(shape: Primitive) -> Primitive:
+        if shape.bsdf is None or isinstance(shape.bsdf, Ref) or shape.bsdf not in bsdf_ids:
+            return shape
+        return shape.model_copy(update={"bsdf": Ref(id=bsdf_ids[shape.bsdf])})
+
+    shapes = map_primitives(shapes, intern_bsdf)
+    definitions: dict[str, SceneObject] = {
+        id: value for id, value in extras.items() if not isinstance(value, SHAPE_TYPES)
+    } | new_definitions
+
+    # Pass 2: spectra and textures, in BSDF definitions as well as inline BSDFs and emitters.
+    texture_uses: Counter[Spectrum | Texture] = Counter()
+    for value in definitions.values():
+        if isinstance(value, _BSDF_TYPES):
+            texture_uses.update(_promote(t, emission=False) for _, t in _textures(value, _REFLECTANCE_FIELDS))
+    for shape in iter_primitives(shapes):
+        if isinstance(shape.bsdf, _BSDF_TYPES):
+            texture_uses.update(_promote(t, emission=False) for _, t in _textures(shape.bsdf, _REFLECTANCE_FIELDS))
+        if isinstance(shape.emitter, _EMITTER_TYPES):
+            texture_uses.update(_promote(t, emission=True) for _, t in _textures(shape.emitter, _EMISSION_FIELDS))
+    for texture, uses in texture_uses.items():
+        if texture not in texture_ids and uses >= min_uses:
+            texture_ids[texture] = fresh_id("texture" if isinstance(texture, (Bitmap, Checkerboard)) else "spectrum")
+            definitions[texture_ids[texture]] = texture
+
+    def intern_textures[M: BSDF | Emitter](model: M, fields: Mapping[type[M], tuple[str, ...]], emission: bool) -> M:
+        update = {
+            field: Ref(id=texture_ids[promoted])
+            for field, texture in _textures(model, fields)
+            if (promoted := _promote(texture, emission)) in texture_ids
+        }
+        return model.model_copy(update=update) if update else model
+
+    def intern_shape_textures(shape: Primitive) -> Primitive:
+        update: dict[str, BSDF | Emitter] = {}
+        if (
+            isinstance(shape.bsdf, _BSDF_TYPES)
+            and (bsdf := intern_textures(shape.bsdf, _REFLECTANCE_FIELDS, emission=False)) is not shape.bsdf
+        ):
+            update["bsdf"] = bsdf
+        if (
+            isinstance(shape.emitter, _EMITTER_TYPES)
+            and (emitter := intern_textures(shape.emitter, _EMISSION_FIELDS, emission=True)) is not shape.emitter
+        ):
+            update["emitter"] = emitter
+        return shape.model_copy(update=update) if update else shape
+
+    shapes = map_primitives(shapes, intern_shape_textures)
+    definitions = {
+        id: intern_textures(value, _REFLECTANCE_FIELDS, emission=False) if isinstance(value, _BSDF_TYPES) else value
+        for id, value in definitions.items()
+    }
+
+    # NOTE: Mitsuba only resolves references to objects defined earlier in the scene, so spectra and textures have to
+    # come before the BSDFs using them, which in turn have to come before the shapes.
+    definitions = dict(sorted(definitions.items(), key=lambda item: isinstance(item[1], _BSDF_TYPES)))
+    return Scene.model_construct(
+        None,
+        integrator=scene.integrator,
+        sensor=scene.sensor,
+        **definitions,
+        **shapes,
+    )
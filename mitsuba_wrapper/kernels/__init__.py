@@ -0,0 +1,6 @@
+"""
+Management of the kernels Dr.Jit compiles for JIT variants: a per-project cache of them with a size limit, and warming
+it up ahead of time so that workers start rendering at full speed.
+
+Warm a cache up with `python -m mitsuba_wrapper.kernels`.
+"""
@@ -0,0 +1,46 @@
+if __name__ == "__main__":
+    import argparse
+    import importlib
+
+    import mitsuba as mi
+
+    parser = argparse.ArgumentParser(
+        prog="python -m mitsuba_wrapper.kernels",
+        description="Compiles the kernels rendering a scene needs into a per-project kernel cache.",
+    )
+    _ = parser.add_argument(
+        "scenes",
+        nargs="+",
+        metavar="SCENE",
+        help="Scenes to warm up: Mitsuba XML files, or models given as module:attribute",
+    )
+    _ = parser.add_argument("--variant", default="llvm_ad_rgb", help="JIT variant the scenes are rendered with")
+    _ = parser.add_argument("--spp", type=int, help="Samples per pixel the scenes are rendered with (default: theirs)")
+    _ = parser.add_argument("--cache-dir", default=".drjit_cache", help="Directory of the kernel cache")
+    _ = parser.add_argument("--max-size", type=float, help="Size limit of the kernel cache, in megabytes")
+    _ = parser.add_argument("--clear", action="store_true", help="Empty the kernel cache first")
+    args = parser.parse_args()
+
+    # We must set this before importing any other Mitsuba modules
+    mi.set_variant(args.variant)
+
+    from mitsuba_wrapper.importer import SceneImporter
+    from mitsuba_wrapper.kernels.cache import KernelCache, warm_up
+    from mitsuba_wrapper.scene import Scene
+
+    cache = KernelCache(args.cache_dir, None if args.max_size is None else int(args.max_size * 2**20))
+    if args.clear:
+        cache.clear()
+    for source in args.scenes:
+        if source.endswith(".xml"):
+            scene = SceneImporter().load(source)
+        else:
+            (module, _, attribute) = source.partition(":")
+            scene = getattr(importlib.import_module(module), attribute)
+            if not isinstance(scene, Scene):
+                parser.error(f"{source} is not a scene")
+        stats = warm_up(scene, cache, spp=args.spp)
+        hits = f"{stats.memory_hits + stats.disk_hits} hits ({stats.disk_hits} from disk)"
+        compiling = f"{stats.codegen_ms + stats.backend_ms:.1f} ms compiling"
+        print(f"{source}: {stats.launched} kernels, {hits}, {stats.misses} misses, {compiling}", flush=True)
+    print(f"{len(cache.files())} kernels in {cache.directory} ({cache.size() / 2**20:.1f} MB)")
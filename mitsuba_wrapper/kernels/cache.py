@@ -0,0 +1,212 @@
+import contextlib
+import os
+import shutil
+from collections.abc import Generator, Iterable, Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Self, final
+
+import drjit as dr
+import mitsuba as mi
+
+from mitsuba_wrapper.multiview import render_views
+from mitsuba_wrapper.scene import Scene
+from mitsuba_wrapper.tracing import trace
+from mitsuba_wrapper.utils import atomic_write
+
+
+def drjit_cache_dir() -> Path:
+    """
+    Returns the directory Dr.Jit caches compiled kernels in.
+
+    NOTE: Dr.Jit always uses `~/.drjit`, found through the `HOME` environment variable, and has no setting to move it.
+    Project caches are therefore kept apart, and copied into it before rendering (see `KernelCache.install`).
+    """
+    home = os.environ.get("HOME")
+    return (Path(home) if home else Path.home()) / ".drjit"
+
+
+def _backend() -> str:
+    variant = mi.variant()
+    if variant is None or not variant.startswith(("llvm_", "cuda_")):
+        raise ValueError(f"Kernels are only compiled by JIT variants, not by {variant}")
+    return variant.split("_")[0]
+
+
+@final
+@dataclass(slots=True)
+class KernelStats:
+    # Kernels launched, i.e. excluding the other operations (e.g. memory copies) Dr.Jit records.
+    launched: int = 0
+    # Kernels found among those compiled earlier by this process.
+    memory_hits: int = 0
+    # Kernels found in Dr.Jit's cache on disk, compiled by an earlier process.
+    disk_hits: int = 0
+    # Kernels compiled from scratch.
+    misses: int = 0
+    # Milliseconds spent generating and compiling kernels.
+    codegen_ms: float = 0.0
+    backend_ms: float = 0.0
+    # Hashes of the kernels launched, which name their files in Dr.Jit's cache.
+    hashes: set[str] = field(default_factory=set)
+
+    def add(self: Self, history: Iterable[Mapping[str, Any]]) -> None:
+        """
+        Counts the kernels of (an excerpt of) Dr.Jit's kernel history.
+        """
+        for kernel in history:
+            if kernel.get("type") != dr.KernelType.JIT:
+                continue
+            self.launched += 1
+            if kernel.get("cache_disk"):
+                self.disk_hits += 1
+            elif kernel.get("cache_hit"):
+                self.memory_hits += 1
+            else:
+                self.misses += 1
+            self.codegen_ms += kernel.get("codegen_time", 0.0)
+            self.backend_ms += kernel.get("backend_time", 0.0)
+            self.hashes.add(kernel["hash"])
+
+
+@contextlib.contextmanager
+def recording_kernels() -> Generator[KernelStats]:
+    """
+    Counts the kernels launched in the body of the `with` statement, into the statistics it yields.
+
+    NOTE: Dr.Jit clears its kernel history when it is read, so kernels counted here are missing from an active
+    `Tracer`, and the other way around.
+    """
+    stats = KernelStats()
+    enabled = dr.flag(dr.JitFlag.KernelHistory)
+    dr.set_flag(dr.JitFlag.KernelHistory, True)
+    # Drop kernels launched before.
+    _ = dr.kernel_history()
+    try:
+        yield stats
+    finally:
+        stats.add(dr.kernel_history())
+        dr.set_flag(dr.JitFlag.KernelHistory, enabled)
+
+
+@final
+class KernelCache:
+    """
+    A directory of kernels compiled by Dr.Jit for a project, limited in size, which workers copy into Dr.Jit's own
+    cache (see `drjit_cache_dir`) before they render so that they do not have to compile them again.
+
+    Kernels are evicted least recently used first, as far as this cache knows of their use: when they were added or
+    last warmed up.
+    """
+
+    def __init__(self, directory: str | Path, max_bytes: None | int = None) -> None:
+        """
+        Args:
+            directory: Directory holding the kernels, created if needed.
+            max_bytes: Size the cache is trimmed to, in bytes. Defaults to no limit.
+        """
+        self.directory: Path = Path(directory)
+        self.max_bytes: None | int = max_bytes
+
+    def files(self: Self) -> list[Path]:
+        """
+        Returns the kernel files of the cache, least recently used first.
+        """
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob("*.bin"), key=lambda path: path.stat().st_mtime)
+
+    def size(self: Self) -> int:
+        return sum(path.stat().st_size for path in self.files())
+
+    def install(self: Self) -> int:
+        """
+        Copies the kernels of the cache which Dr.Jit's cache lacks into it, returning their number.
+        """
+        target = drjit_cache_dir()
+        target.mkdir(parents=True, exist_ok=True)
+        installed = 0
+        for path in self.files():
+            if not (target / path.name).exists():
+                # NOTE: Written atomically, since Dr.Jit may read the cache concurrently.
+                with atomic_write(target / path.name) as temporary:
+                    _ = shutil.copyfile(path, temporary)
+                installed += 1
+        return installed
+
+    def add(self: Self, hashes: Iterable[str]) -> int:
+        """
+        Copies the kernels with the given hashes from Dr.Jit's cache into this one, marking those it already holds as
+        used, and trims it. Returns the number of kernels copied.
+
+        NOTE: Kernels missing from Dr.Jit's cache (e.g. those of the CUDA backend using OptiX, which keeps a cache of
+        its own) are skipped.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        suffix = f".{_backend()}.bin"
+        added = 0
+        for kernel_hash in hashes:
+            path = self.directory / f"{kernel_hash}{suffix}"
+            if path.exists():
+                path.touch()
+            elif (source := drjit_cache_dir() / path.name).exists():
+                _ = shutil.copyfile(source, path)
+                added += 1
+        _ = self.trim()
+        return added
+
+    def trim(self: Self) -> int:
+        """
+        Evicts the least recently used kernels until the cache fits its size limit, returning their number.
+        """
+        if self.max_bytes is None:
+            return 0
+        files = [(path, path.stat().st_size) for path in self.files()]
+        size = sum(file_size for _, file_size in files)
+        evicted = 0
+        for path, file_size in files:
+            if size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            size -= file_size
+            evicted += 1
+        return evicted
+
+    def clear(self: Self) -> None:
+        for path in self.files():
+            path.unlink(missing_ok=True)
+
+
+def warm_up(
+    scene: Scene,
+    cache: KernelCache,
+    ids: None | Iterable[str] = None,
+    *,
+    spp: None | int = None,
+    seed: int = 0,
+) -> KernelStats:
+    """
+    Compiles the kernels rendering a scene needs with the current (JIT) variant, by rendering it once, and adds them
+    to a cache. Returns the statistics of the kernels the render launched: on a warm cache, every one is a hit.
+
+    NOTE: Kernels depend on the film and on the number of samples per pixel, so the scene has to be warmed up with
+    the configuration it is rendered with later. Dr.Jit offers no way to compile kernels without launching them, so
+    this takes as long as rendering the scene does.
+
+    Args:
+        scene: The scene.
+        cache: The cache to add the kernels to; its kernels are installed first.
+        ids: The IDs of the sensors to warm up (see `scene_sensors`). Defaults to every sensor.
+        spp: Samples per pixel, overriding the samplers of the sensors, as given when rendering the scene later.
+        seed: Seed; it does not affect the kernels.
+
+    Raises:
+        ValueError: If the current variant is not a JIT variant.
+    """
+    _ = _backend()
+    _ = cache.install()
+    with trace("warm_up"), recording_kernels() as stats:
+        for _ in render_views(scene, ids=ids, spp=spp, seed=seed):
+            pass
+    _ = cache.add(stats.hashes)
+    return stats
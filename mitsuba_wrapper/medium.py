@@ -0,0 +1,57 @@
+from typing import Literal, final
+
+from pydantic import BaseModel, Field
+
+from mitsuba_wrapper.phase import Isotropic, PhaseFunction
+from mitsuba_wrapper.spectrum import Spectrum
+from mitsuba_wrapper.volume import Volume
+
+type HomogeneousType = Literal["homogeneous"]
+type HeterogeneousType = Literal["heterogeneous"]
+
+type MediumType = HomogeneousType | HeterogeneousType
+type Medium = Homogeneous | Heterogeneous
+
+
+class MediumLike(BaseModel, frozen=True):
+    scale: float = Field(
+        default=1.0,
+        description="""
+            Optional scale factor that will be applied to the extinction parameter. It is provided for convenience
+            when accommodating data based on different units, or to simply tweak the density of the medium
+        """,
+    )
+    sample_emitters: bool = Field(
+        default=True,
+        description="Flag to specify whether shadow rays should be cast from inside the volume",
+    )
+    phase: PhaseFunction = Field(
+        default_factory=Isotropic,
+        description="Specifies the phase function of the medium",
+    )
+
+
+@final
+class Homogeneous(MediumLike, frozen=True):
+    albedo: float | Spectrum | Volume = Field(
+        default=0.75,
+        description="Single-scattering albedo of the medium",
+    )
+    sigma_t: float | Spectrum | Volume = Field(
+        default=1.0,
+        description="Extinction coefficient in inverse scene units",
+    )
+    type: HomogeneousType = "homogeneous"
+
+
+@final
+class Heterogeneous(MediumLike, frozen=True):
+    albedo: float | Volume = Field(
+        default=0.75,
+        description="Single-scattering albedo of the medium",
+    )
+    sigma_t: float | Volume = Field(
+        default=1.0,
+        description="Extinction coefficient in inverse scene units",
+    )
+    type: HeterogeneousType = "heterogeneous"
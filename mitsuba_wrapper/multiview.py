@@ -0,0 +1,153 @@
+import contextlib
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, final
+
+import mitsuba as mi
+import numpy as np
+import numpy.typing as npt
+
+from mitsuba_wrapper.film import Film
+from mitsuba_wrapper.output import ImageWriter, output_settings
+from mitsuba_wrapper.scene import Scene
+from mitsuba_wrapper.sensor import SENSOR_TYPES, Batch, Camera, Sensor
+from mitsuba_wrapper.tracing import load_scene, render_synced, trace
+from mitsuba_wrapper.utils import Transform4f
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class View:
+    # The ID of the camera: that of its sensor, or for the cameras of a batch sensor, its ID within the batch.
+    id: str
+    # The ID of the sensor which rendered the view.
+    sensor: str
+    film: Film
+    image: npt.NDArray[np.float32]
+
+
+def scene_sensors(scene: Scene) -> dict[str, Sensor]:
+    """
+    Returns every sensor of a scene by ID, starting with its `sensor`.
+    """
+    extras = scene.model_extra or {}
+    return {"sensor": scene.sensor} | {id: value for id, value in extras.items() if isinstance(value, SENSOR_TYPES)}
+
+
+def set_crop_window(
+    params: mi.SceneParameters,
+    window: tuple[int, int, int, int],
+    sensor: str = "sensor",
+) -> None:
+    """
+    Makes a loaded sensor render only a region of its film, given as (x, y, width, height), without loading the scene
+    again. The rendered image has the size of the region.
+
+    Args:
+        params: The parameters of the loaded scene (see `mi.traverse`).
+        window: The region of the film to render.
+        sensor: The ID of the sensor.
+    """
+    (x, y, width, height) = window
+    (offset_key, size_key) = (f"{sensor}.film.crop_offset", f"{sensor}.film.crop_size")
+    offset: Any = params[offset_key]
+    size: Any = params[size_key]
+    # Keep the (variant-specific) types of the parameters.
+    params[offset_key] = type(offset)(x, y)
+    params[size_key] = type(size)(width, height)
+    _ = params.update()
+
+
+def orbit(
+    camera: Camera,
+    count: int,
+    center: tuple[float, float, float] = (0.0, 0.0, 0.0),
+    axis: tuple[float, float, float] = (0.0, 1.0, 0.0),
+    prefix: str = "view",
+) -> dict[str, Camera]:
+    """
+    Returns `count` copies of a camera, rotated around an axis through `center` in equal steps, e.g. for a turntable.
+
+    The copies are named `<prefix>_<index>`, and can be added to a scene with `scene.model_copy(update=...)`.
+    """
+    to_world = mi.ScalarTransform4f() if camera.to_world is None else camera.to_world.model_dump(mode="python")
+    digits = len(str(count - 1))
+    cameras: dict[str, Camera] = {}
+    for index in range(count):
+        rotation = (
+            mi.ScalarTransform4f.translate(center).rotate(axis, 360.0 * index / count).translate([-c for c in center])
+        )
+        matrix = Transform4f.to_transform4f((rotation @ to_world).matrix)
+        cameras[f"{prefix}_{index:0{digits}}"] = camera.model_copy(update={"to_world": matrix})
+    return cameras
+
+
+def render_views(
+    scene: Scene,
+    mi_scene: None | mi.Scene = None,
+    ids: None | Iterable[str] = None,
+    *,
+    spp: None | int = None,
+    seed: int = 0,
+) -> Iterator[View]:
+    """
+    Renders the sensors of a scene one after another, from a single loaded copy of the scene, yielding the view of
+    every camera as it is rendered. Batch sensors render all of their cameras at once, and yield one view per camera.
+
+    Args:
+        scene: The scene.
+        mi_scene: The scene, as loaded by Mitsuba. Loaded from `scene` if not given.
+        ids: The IDs of the sensors to render (see `scene_sensors`). Defaults to every sensor.
+        spp: Samples per pixel, overriding the samplers of the sensors.
+        seed: Seed used for every sensor.
+    """
+    sensors = scene_sensors(scene)
+    if mi_scene is None:
+        mi_scene = load_scene(scene)
+    # NOTE: Mitsuba orders the sensors of a scene by ID rather than in the order they are declared, so their indices
+    # are looked up by ID.
+    indices = {sensor.id(): index for index, sensor in enumerate(mi_scene.sensors())}
+    for id in sensors if ids is None else ids:
+        sensor = sensors[id]
+        with trace("render", sensor=id):
+            image = np.array(render_synced(mi_scene, sensor=indices[id], spp=spp or 0, seed=seed), dtype=np.float32)
+        if isinstance(sensor, Batch):
+            width = image.shape[1] // len(sensor.cameras)
+            for index, camera in enumerate(sensor.cameras):
+                yield View(camera, id, sensor.film, image[:, index * width : (index + 1) * width])
+        else:
+            yield View(id, id, sensor.film, image)
+
+
+def write_views(
+    scene: Scene,
+    directory: str | Path,
+    mi_scene: None | mi.Scene = None,
+    ids: None | Iterable[str] = None,
+    *,
+    spp: None | int = None,
+    seed: int = 0,
+) -> list[Path]:
+    """
+    Renders the sensors of a scene (see `render_views`) and writes the view of every camera to `directory`, named
+    after its ID and in the format of its sensor's film. The views of a batch sensor are written to a subdirectory named
+    after the sensor. Returns the paths of the images.
+
+    Sensors whose films are written with the same settings share a writer (see `output_settings`), so that scenes with
+    many sensors do not queue images for each of them.
+    """
+    directory = Path(directory)
+    paths: list[Path] = []
+    with contextlib.ExitStack() as stack:
+        writers: dict[tuple[object, ...], ImageWriter] = {}
+        for view in render_views(scene, mi_scene, ids, spp=spp, seed=seed):
+            settings = output_settings(view.film)
+            if settings not in writers:
+                writers[settings] = stack.enter_context(ImageWriter(view.film))
+            writer = writers[settings]
+            path = writer.path(directory / view.id if view.id == view.sensor else directory / view.sensor / view.id)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            writer.submit(view.image, path)
+            paths.append(path)
+    return paths
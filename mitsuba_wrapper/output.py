@@ -0,0 +1,231 @@
+import atexit
+import contextlib
+import contextvars
+import queue
+import threading
+from collections.abc import Callable, Mapping, Sequence
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Literal, Self, final
+
+import mitsuba as mi
+import numpy as np
+import numpy.typing as npt
+
+from mitsuba_wrapper.film import ComponentFormatType, FileFormatType, Film, HDRFilm, PixelFormatType, SpecFilm
+from mitsuba_wrapper.tracing import trace
+from mitsuba_wrapper.utils import thread_environment
+
+type ExrCompression = Literal["piz", "dwab"]
+
+_FILE_FORMATS: Mapping[FileFormatType, mi.Bitmap.FileFormat] = {
+    "openexr": mi.Bitmap.FileFormat.OpenEXR,
+    "rgbe": mi.Bitmap.FileFormat.RGBE,
+    "pfm": mi.Bitmap.FileFormat.PFM,
+}
+_EXTENSIONS: Mapping[FileFormatType, str] = {
+    "openexr": ".exr",
+    "rgbe": ".hdr",
+    "pfm": ".pfm",
+}
+_PIXEL_FORMATS: Mapping[PixelFormatType, mi.Bitmap.PixelFormat] = {
+    "luminance": mi.Bitmap.PixelFormat.Y,
+    "luminance_alpha": mi.Bitmap.PixelFormat.YA,
+    "rgb": mi.Bitmap.PixelFormat.RGB,
+    "rgba": mi.Bitmap.PixelFormat.RGBA,
+    "xyz": mi.Bitmap.PixelFormat.XYZ,
+    "xyza": mi.Bitmap.PixelFormat.XYZA,
+}
+_COMPONENT_FORMATS: Mapping[ComponentFormatType, mi.Struct.Type] = {
+    "float16": mi.Struct.Type.Float16,
+    "float32": mi.Struct.Type.Float32,
+    "uint32": mi.Struct.Type.UInt32,
+}
+_UINT32_MAX = np.iinfo(np.uint32).max
+
+
+def output_settings(film: Film) -> tuple[object, ...]:
+    """
+    Returns the settings an `ImageWriter` writes the images of a film with. Films with the same settings, e.g. films
+    which only differ by their size, can share a writer.
+    """
+    match film:
+        case HDRFilm():
+            return (film.file_format, film.pixel_format, film.component_format)
+        case SpecFilm():
+            return ("openexr", film.component_format, tuple(film.channel_names()))
+
+
+@final
+class ImageWriter:
+    """
+    Converts and writes rendered images on a background thread, so that rendering can continue while the previous
+    image is being encoded and written to disk.
+
+    Images are converted to the pixel and component format of the film and written in its file format. At most
+    `max_pending` images wait to be written at any time; `submit` blocks once that many are queued, which keeps memory
+    usage flat when rendering outpaces the disk. All queued images are written before the interpreter exits, and errors
+    raised while writing are re-raised by the next call to `submit`, `flush` or `close`, or when leaving a `with`
+    statement whose body did not raise itself.
+
+    Images with additional channels, such as those rendered by an AOV integrator, are written as a single OpenEXR file
+    with one layer per channel name prefix (e.g. channels "nn.X", "nn.Y" and "nn.Z" make up the layer "nn"). Images
+    rendered with a spectral film are written the same way, with one channel per band.
+
+    NOTE: Only OpenEXR supports half-precision and integer components; like the film itself, RGBE and PFM images are
+    always written as float32 (and RGBE images as RGB).
+    """
+
+    def __init__(
+        self,
+        film: Film,
+        max_pending: int = 2,
+        compression: ExrCompression = "piz",
+        dwab_level: int = 45,
+    ) -> None:
+        """
+        Args:
+            film: The film whose output settings are used for every image.
+            max_pending: Maximum number of images waiting to be written.
+            compression: Compression used for OpenEXR images: lossless PIZ or lossy DWAB.
+            dwab_level: Quality level of the DWAB compressor, where higher values mean lower quality.
+        """
+        self.film: Film = film
+        self.file_format: FileFormatType = film.file_format if isinstance(film, HDRFilm) else "openexr"
+        self.quality: int = dwab_level if compression == "dwab" else -1
+        self._queue: queue.Queue[None | tuple[Path, npt.NDArray[np.float32], None | list[str]]] = queue.Queue(
+            maxsize=max_pending
+        )
+        self._errors: list[BaseException] = []
+        # Mitsuba keeps the variant, logger and file resolver in thread-local state, which the writer thread has to
+        # inherit.
+        self._environment: Callable[[], contextlib.AbstractContextManager[None]] = thread_environment()
+        # The thread also runs in a copy of the current context, so that writes are traced along with the job.
+        context = contextvars.copy_context()
+        self._thread: threading.Thread = threading.Thread(
+            target=context.run, args=(self._run,), name="ImageWriter", daemon=True
+        )
+        self._thread.start()
+        _ = atexit.register(self.close)
+
+    def path(self, path: str | Path) -> Path:
+        """
+        Returns the path an image submitted as `path` is written to: the extension of the film's file format is added if
+        `path` has none.
+        """
+        path = Path(path)
+        return path if path.suffix else path.with_suffix(_EXTENSIONS[self.file_format])
+
+    def submit(self, image: Any, path: str | Path, channel_names: None | Sequence[str] = None) -> None:
+        """
+        Queues a rendered image (as returned by `mi.render`) to be written to `path`, blocking while the queue is full.
+
+        Args:
+            image: The rendered image.
+            path: Where to write the image.
+            channel_names: Names of the channels of a layered image, e.g. as returned by `AOV.channel_names`. The
+                channels are written as they are, without converting them to the film's pixel format. Defaults to the
+                bands of a spectral film.
+        """
+        self._raise_errors()
+        # Copying the pixels into host memory is the only work done on the calling thread; it also makes sure the
+        # renderer is free to reuse its buffers.
+        pixels = np.array(image, dtype=np.float32)
+        if channel_names is None and isinstance(self.film, SpecFilm):
+            channel_names = self.film.channel_names()
+        if channel_names is not None:
+            if self.file_format != "openexr":
+                raise ValueError(f"Layered images can only be written as OpenEXR, not {self.file_format}")
+            if len(channel_names) != pixels.shape[-1]:
+                raise ValueError(
+                    f"Got {len(channel_names)} channel names for an image with {pixels.shape[-1]} channels"
+                )
+            channel_names = list(channel_names)
+        self._queue.put((self.path(path), pixels, channel_names))
+
+    def flush(self) -> None:
+        """
+        Blocks until every queued image has been written.
+        """
+        self._queue.join()
+        self._raise_errors()
+
+    def close(self) -> None:
+        """
+        Writes every queued image and stops the writer thread. Further calls have no effect.
+        """
+        self._stop()
+        self._raise_errors()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: None | type[BaseException],
+        exc_value: None | BaseException,
+        traceback: None | TracebackType,
+    ) -> None:
+        self._stop()
+        # Errors raised while writing must not hide the one which ended the body of the `with` statement.
+        if exc_type is None:
+            self._raise_errors()
+
+    def _stop(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+            atexit.unregister(self.close)
+
+    def _run(self) -> None:
+        with contextlib.ExitStack() as stack:
+            try:
+                stack.enter_context(self._environment())
+                failure = None
+            except BaseException as e:
+                # Keep taking images off the queue, failing every one of them, so that `submit` and `flush` do not block
+                # forever.
+                failure = e
+            while (item := self._queue.get()) is not None:
+                try:
+                    if failure is not None:
+                        raise RuntimeError(f"Cannot write {item[0]}: the writer thread failed to start") from failure
+                    with trace("write", path=str(item[0])):
+                        self._write(*item)
+                except BaseException as e:
+                    self._errors.append(e)
+                finally:
+                    self._queue.task_done()
+            self._queue.task_done()
+
+    def _write(self, path: Path, pixels: npt.NDArray[np.float32], channel_names: None | list[str]) -> None:
+        file_format = self.file_format
+        if channel_names is None:
+            assert isinstance(self.film, HDRFilm), "Images rendered with a spectral film always have channel names"
+            pixel_format = "rgb" if file_format == "rgbe" else self.film.pixel_format
+            component_format = self.film.component_format if file_format == "openexr" else "float32"
+            # NOTE: Without a pixel format, Bitmap infers one from the number of channels, taking XYZ images for RGB.
+            bitmap = mi.Bitmap(pixels, _PIXEL_FORMATS[self.film.pixel_format]).convert(
+                _PIXEL_FORMATS[pixel_format], _COMPONENT_FORMATS[component_format], srgb_gamma=False
+            )
+        else:
+            # NOTE: Bitmap.convert cannot convert multi-channel bitmaps without losing their channel names, so the
+            # components are converted here instead, the way Mitsuba would.
+            match self.film.component_format:
+                case "float16":
+                    # Values beyond the range of half-precision (e.g. the depth of rays which escape the scene) become
+                    # infinite.
+                    with np.errstate(over="ignore"):
+                        components = pixels.astype(np.float16)
+                case "float32":
+                    components = pixels
+                case "uint32":
+                    # Scaled in double precision, in which (unlike in single precision) the largest value is exact.
+                    unit = np.clip(pixels.astype(np.float64), 0.0, 1.0)
+                    components = np.rint(unit * _UINT32_MAX).astype(np.uint32)
+            bitmap = mi.Bitmap(components, mi.Bitmap.PixelFormat.MultiChannel, channel_names)
+        bitmap.write(str(path), _FILE_FORMATS[file_format], self.quality)
+
+    def _raise_errors(self) -> None:
+        if self._errors:
+            raise self._errors.pop(0)
@@ -0,0 +1,36 @@
+from typing import Literal, final
+
+from pydantic import BaseModel, Field
+
+type IsotropicType = Literal["isotropic"]
+type HGType = Literal["hg"]
+type RayleighType = Literal["rayleigh"]
+
+type PhaseFunctionType = IsotropicType | HGType | RayleighType
+type PhaseFunction = Isotropic | HG | Rayleigh
+
+
+@final
+class Isotropic(BaseModel, frozen=True):
+    type: IsotropicType = "isotropic"
+
+
+@final
+class HG(BaseModel, frozen=True):
+    g: float = Field(
+        default=0.8,
+        ge=-1,
+        le=1,
+        description="""
+            This parameter must be somewhere in the range -1 to 1 (but not equal to -1 or 1). It denotes the mean
+            cosine of scattering interactions. A value greater than zero indicates that medium interactions
+            predominantly scatter incident light into a similar direction (i.e. the medium is forward-scattering),
+            whereas values smaller than zero cause the medium to scatter more light in the opposite direction
+        """,
+    )
+    type: HGType = "hg"
+
+
+@final
+class Rayleigh(BaseModel, frozen=True):
+    type: RayleighType = "rayleigh"
@@ -0,0 +1,224 @@
+import atexit
+import contextlib
+import contextvars
+import math
+import threading
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from types import TracebackType
+from typing import Self, final
+
+import numpy as np
+import numpy.typing as npt
+
+from mitsuba_wrapper.diff import LiveScene
+from mitsuba_wrapper.scene import Scene
+from mitsuba_wrapper.sensor import Batch
+from mitsuba_wrapper.tracing import render_synced, trace
+from mitsuba_wrapper.utils import thread_environment
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class Level:
+    # Factor the width and height of the film are divided by.
+    factor: int
+    spp: int
+
+
+# Coarse levels come first, so that something shows up right away.
+DEFAULT_LADDER: tuple[Level, ...] = (Level(8, 1), Level(4, 2), Level(2, 4), Level(1, 16))
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class PreviewImage:
+    scene: Scene
+    # Index of the level in the ladder.
+    index: int
+    level: Level
+    # The rendered image, upsampled to the size of the crop window of the scene's film.
+    image: npt.NDArray[np.float32]
+    # Seconds spent rendering the level, including loading or updating the scene.
+    seconds: float
+
+
+def preview_scene(scene: Scene, level: Level) -> Scene:
+    """
+    Returns a copy of a scene whose main sensor renders at a level of a preview ladder: with a film downscaled by the
+    level's factor, without error compensation, and with the level's samples per pixel. The scene is left untouched.
+    """
+    sensor = scene.sensor
+    film = sensor.film
+    # Batch sensors lay their cameras side by side, so each camera is downscaled on its own.
+    cameras = len(sensor.cameras) if isinstance(sensor, Batch) else 1
+    width = math.ceil(film.width // cameras / level.factor) * cameras
+    height = math.ceil(film.height / level.factor)
+    size = {"width": width, "height": height, "compensate": False}
+    # The crop fields are always written, since fields set to the whole original film no longer fit the downscaled one.
+    crop: dict[str, None | int] = dict.fromkeys(("crop_offset_x", "crop_offset_y", "crop_width", "crop_height"))
+    if film.crop_window != (0, 0, film.width, film.height):
+        # The window is widened to whole pixels of the downscaled film, so that it still covers the original one.
+        (x, y, crop_width, crop_height) = film.crop_window
+        (left, top) = (x // level.factor, y // level.factor)
+        crop = {
+            "crop_offset_x": left,
+            "crop_offset_y": top,
+            "crop_width": min(math.ceil((x + crop_width) / level.factor), width) - left,
+            "crop_height": min(math.ceil((y + crop_height) / level.factor), height) - top,
+        }
+    sampler = sensor.sampler.with_sample_count(level.spp)
+    preview_sensor = sensor.model_copy(
+        update={"film": film.model_validate({**dict(film), **size, **crop}), "sampler": sampler}
+    )
+    return scene.model_copy(update={"sensor": preview_sensor})
+
+
+def upsample(
+    image: npt.NDArray[np.float32],
+    factor: int,
+    window: tuple[int, int, int, int],
+) -> npt.NDArray[np.float32]:
+    """
+    Scales an image rendered by a film downscaled by an integer factor (see `preview_scene`) up, repeating its pixels,
+    and crops it to the crop window of the original film, given as (x, y, width, height).
+    """
+    (x, y, width, height) = window
+    # The downscaled crop window starts at the pixel of the downscaled film holding (x, y), which may be up to
+    # `factor - 1` pixels before it.
+    (left, top) = (x % factor, y % factor)
+    return np.repeat(np.repeat(image, factor, axis=0), factor, axis=1)[top : top + height, left : left + width]
+
+
+@final
+class Previewer:
+    """
+    Renders previews of a scene on a background thread, climbing a ladder of levels from coarse to fine and handing
+    every level to a callback (e.g. to display it, or submit it to an `ImageWriter`) as soon as it is rendered.
+
+    Showing another scene cancels the ladder of the previous one: its remaining levels are skipped, and the level being
+    rendered is discarded once it finishes (Mitsuba cannot interrupt a render).
+
+    Every level keeps its own copy of the scene loaded (see `LiveScene`), so that edits which only change parameters
+    (e.g. colors or transforms) are applied in place rather than by loading the scene again. Errors raised while
+    rendering are re-raised by the next call to `show`, `wait` or `close`.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[PreviewImage], None],
+        ladder: Sequence[Level] = DEFAULT_LADDER,
+        seed: int = 0,
+    ) -> None:
+        """
+        Args:
+            callback: Called with every level rendered, on the preview thread.
+            ladder: The levels to render, in order.
+            seed: Seed used for every level.
+        """
+        self.callback: Callable[[PreviewImage], None] = callback
+        self.ladder: tuple[Level, ...] = tuple(ladder)
+        self.seed: int = seed
+        self._condition: threading.Condition = threading.Condition()
+        self._scene: None | Scene = None
+        # Incremented whenever a scene is shown, which cancels the ladder of the scene shown before.
+        self._generation: int = 0
+        self._busy: bool = False
+        self._closed: bool = False
+        self._errors: list[BaseException] = []
+        self._live: dict[Level, LiveScene] = {}
+        # Mitsuba keeps the variant, logger and file resolver in thread-local state, which the preview thread has to
+        # inherit.
+        self._environment: Callable[[], contextlib.AbstractContextManager[None]] = thread_environment()
+        context = contextvars.copy_context()
+        self._thread: threading.Thread = threading.Thread(
+            target=context.run, args=(self._run,), name="Previewer", daemon=True
+        )
+        self._thread.start()
+        _ = atexit.register(self.close)
+
+    def show(self, scene: Scene) -> None:
+        """
+        Starts previewing `scene`, cancelling the preview of the scene shown before.
+        """
+        self._raise_errors()
+        with self._condition:
+            self._scene = scene
+            self._generation += 1
+            self._condition.notify_all()
+
+    def wait(self) -> None:
+        """
+        Blocks until the last scene shown has been rendered at every level.
+        """
+        with self._condition:
+            _ = self._condition.wait_for(lambda: self._scene is None and not self._busy)
+        self._raise_errors()
+
+    def close(self) -> None:
+        """
+        Cancels the preview and stops the preview thread. Further calls have no effect.
+        """
+        if self._thread.is_alive():
+            with self._condition:
+                self._closed = True
+                self._generation += 1
+                self._condition.notify_all()
+            self._thread.join()
+            atexit.unregister(self.close)
+        self._raise_errors()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: None | type[BaseException],
+        exc_value: None | BaseException,
+        traceback: None | TracebackType,
+    ) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        with self._environment():
+            while True:
+                with self._condition:
+                    _ = self._condition.wait_for(lambda: self._scene is not None or self._closed)
+                    if self._closed:
+                        return
+                    (scene, generation) = (self._scene, self._generation)
+                    assert scene is not None
+                    self._scene = None
+                    self._busy = True
+                try:
+                    self._climb(scene, generation)
+                except BaseException as e:
+                    self._errors.append(e)
+                finally:
+                    with self._condition:
+                        self._busy = False
+                        self._condition.notify_all()
+
+    def _climb(self, scene: Scene, generation: int) -> None:
+        window = scene.sensor.film.crop_window
+        for index, level in enumerate(self.ladder):
+            if generation != self._generation:
+                return
+            start = time.perf_counter()
+            with trace("preview", level=index, factor=level.factor, spp=level.spp):
+                level_scene = preview_scene(scene, level)
+                if (live := self._live.get(level)) is None:
+                    live = self._live[level] = LiveScene(level_scene)
+                else:
+                    _ = live.update(level_scene)
+                image = np.array(render_synced(live.mi_scene, seed=self.seed), dtype=np.float32)
+            # The scene changed while the level was rendered.
+            if generation != self._generation:
+                return
+            seconds = time.perf_counter() - start
+            self.callback(PreviewImage(scene, index, level, upsample(image, level.factor, window), seconds))
+
+    def _raise_errors(self) -> None:
+        if self._errors:
+            raise self._errors.pop(0)
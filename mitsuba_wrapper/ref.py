@@ -1,3 +1,4 @@
+from collections.abc import Iterator
 from typing import Literal, NewType, final
 
 from pydantic import BaseModel
@@ -11,3 +12,17 @@ type RefType = Literal["ref"]
 class Ref(BaseModel, frozen=True):
     id: ID
     type: RefType = "ref"
+
+
+def iter_refs(model: BaseModel) -> Iterator[Ref]:
+    """
+    Yields every reference held by a model, at any depth.
+    """
+    for _, value in model:
+        match value:
+            case Ref():
+                yield value
+            case BaseModel():
+                yield from iter_refs(value)
+            case _:
+                pass
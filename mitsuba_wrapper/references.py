@@ -0,0 +1,170 @@
+import functools
+import types
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass, field
+from typing import Literal, Self, TypeAliasType, final, get_args, get_origin
+
+from pydantic import BaseModel, RootModel
+
+from mitsuba_wrapper.emitter import Area, Constant, Envmap, Point
+from mitsuba_wrapper.ref import Ref
+from mitsuba_wrapper.scene import Scene, SceneObject
+from mitsuba_wrapper.sensor import SENSOR_TYPES
+from mitsuba_wrapper.shape import SHAPE_TYPES, Instance, ShapeGroup
+from mitsuba_wrapper.tracing import traced
+
+type IssueKind = Literal["dangling", "wrong_kind", "cycle", "unused"]
+
+# Unions of classes are `types.UnionType`s, but those of other type forms (literals, type aliases) are `typing.Union`s.
+_UNION_TYPES = frozenset({types.UnionType, get_origin(None | Literal[0])})
+
+# Objects which are part of the scene by themselves, as opposed to definitions which only matter when referenced.
+_SELF_STANDING: frozenset[type[SceneObject]] = frozenset({
+    *SHAPE_TYPES,
+    *SENSOR_TYPES,
+    Area,
+    Point,
+    Constant,
+    Envmap,
+}) - {ShapeGroup}
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class Issue:
+    kind: IssueKind
+    # Where the issue was found, as a dotted path of IDs and field names, e.g. "the_room.floor.bsdf".
+    path: str
+    message: str
+
+
+@final
+@dataclass(slots=True)
+class ReferenceReport:
+    """
+    The outcome of `check_references`. Errors make Mitsuba refuse to load the scene; warnings do not.
+    """
+
+    errors: list[Issue] = field(default_factory=list)
+    warnings: list[Issue] = field(default_factory=list)
+
+    def raise_for_errors(self: Self) -> None:
+        """
+        Raises:
+            ValueError: Listing every error, if there are any.
+        """
+        if self.errors:
+            raise ValueError("\n".join(["Invalid references:", *(f"  {e.path}: {e.message}" for e in self.errors)]))
+
+
+def _model_types(annotation: object) -> Iterator[type[BaseModel]]:
+    """
+    Yields the models a field annotation admits, looking through unions and type aliases.
+    """
+    if isinstance(annotation, TypeAliasType):
+        yield from _model_types(annotation.__value__)
+    elif get_origin(annotation) in _UNION_TYPES:
+        for arg in get_args(annotation):
+            yield from _model_types(arg)
+    elif isinstance(annotation, type) and issubclass(annotation, BaseModel) and not issubclass(annotation, RootModel):
+        yield annotation
+
+
+@functools.cache
+def _model_fields(cls: type[BaseModel]) -> tuple[tuple[str, tuple[type[BaseModel], ...]], ...]:
+    """
+    Returns the fields of a model which can hold other models (and so references), with the models a reference held
+    by the field may resolve to.
+
+    NOTE: Vectors, colors and transforms are root models which cannot hold references, so they are skipped.
+    """
+    return tuple(
+        (name, tuple(kind for kind in kinds if kind is not Ref))
+        for name, info in cls.model_fields.items()
+        if (kinds := tuple(_model_types(info.annotation)))
+    )
+
+
+class _Checker:
+    def __init__(self, objects: Mapping[str, SceneObject]) -> None:
+        super().__init__()
+        self.objects: Mapping[str, SceneObject] = objects
+        self.report: ReferenceReport = ReferenceReport()
+        self.referenced: set[str] = set()
+        # The shape groups instanced by each shape group.
+        self.instanced: dict[str, set[str]] = {}
+        # Inline models are often shared by many shapes; each one only has to be checked once (per shape group, since
+        # the instances it holds are attributed to the group).
+        self.visited: set[tuple[int, None | str]] = set()
+
+    # NOTE: This runs for every shape of the scene, so it avoids pattern matching and only formats paths when it
+    # reports an issue.
+    def visit(self, model: BaseModel, path: str, group: None | str) -> None:
+        for name, kinds in _model_fields(type(model)):
+            value = getattr(model, name)
+            if value is None:
+                continue
+            if type(value) is Ref:
+                self.resolve(value.id, kinds, path, name, group if type(model) is Instance else None)
+            elif (key := (id(value), group)) not in self.visited:
+                self.visited.add(key)
+                self.visit(value, f"{path}.{name}", group)
+        for name, child in (model.model_extra or {}).items():
+            if isinstance(child, BaseModel):
+                self.visit(child, f"{path}.{name}", group)
+
+    def resolve(self, target: str, kinds: tuple[type[BaseModel], ...], path: str, name: str, group: None | str) -> None:
+        self.referenced.add(target)
+        value = self.objects.get(target)
+        if value is None:
+            self.report.errors.append(Issue("dangling", f"{path}.{name}", f"Reference to undefined ID {target!r}"))
+        elif kinds and not isinstance(value, kinds):
+            expected = " or ".join(kind.__name__ for kind in kinds)
+            message = f"Reference to {target!r}, a {type(value).__name__}, where a {expected} is expected"
+            self.report.errors.append(Issue("wrong_kind", f"{path}.{name}", message))
+        elif group is not None and type(value) is ShapeGroup:
+            self.instanced.setdefault(group, set()).add(target)
+
+    def check_cycles(self) -> None:
+        done: set[str] = set()
+        for root in self.instanced:
+            if root in done:
+                continue
+            # Depth-first search with an explicit stack, which holds the path from the root.
+            path = [root]
+            stack = [iter(self.instanced.get(root, ()))]
+            while stack:
+                for group in stack[-1]:
+                    if group in path:
+                        cycle = " -> ".join([*path[path.index(group) :], group])
+                        self.report.errors.append(Issue("cycle", group, f"Shape groups instance each other: {cycle}"))
+                    elif group not in done:
+                        path.append(group)
+                        stack.append(iter(self.instanced.get(group, ())))
+                        break
+                else:
+                    _ = stack.pop()
+                    done.add(path.pop())
+
+
+@traced("check_references")
+def check_references(scene: Scene) -> ReferenceReport:
+    """
+    Checks every reference in a scene in a single pass, without loading anything.
+
+    Errors are references to undefined IDs, references to objects of the wrong kind (e.g. a BSDF where an emitter or
+    shape group is expected), and shape groups which (indirectly) instance themselves. Warnings are definitions which
+    nothing refers to, i.e. BSDFs, spectra, textures, media and shape groups which have no effect on the scene.
+    """
+    objects = scene.model_extra or {}
+    checker = _Checker(objects)
+    checker.visit(scene.integrator, "integrator", None)
+    checker.visit(scene.sensor, "sensor", None)
+    # NOTE: Every model is final, so comparing types is enough (and much faster than isinstance with a million shapes).
+    for id, value in objects.items():
+        checker.visit(value, id, id if type(value) is ShapeGroup else None)
+    checker.check_cycles()
+    for id, value in objects.items():
+        if id not in checker.referenced and type(value) not in _SELF_STANDING:
+            checker.report.warnings.append(Issue("unused", id, f"{type(value).__name__} {id!r} is never referenced"))
+    return checker.report
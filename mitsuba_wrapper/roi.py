@@ -0,0 +1,200 @@
+import itertools
+import math
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import cast, final
+
+import drjit as dr
+import mitsuba as mi
+import numpy as np
+import numpy.typing as npt
+
+from mitsuba_wrapper.film import Film
+from mitsuba_wrapper.multiview import set_crop_window
+from mitsuba_wrapper.reconstruction_filter import (
+    BoxFilter,
+    CatmullRomFilter,
+    GaussianFilter,
+    ReconstructionFilter,
+    TentFilter,
+)
+from mitsuba_wrapper.scene import Scene
+from mitsuba_wrapper.sensor import Batch, Camera, Perspective
+from mitsuba_wrapper.tracing import load_scene, render_synced, trace
+
+# A world-space box, as its minimum and maximum corners.
+type Box = tuple[tuple[float, float, float], tuple[float, float, float]]
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class RegionImage:
+    image: npt.NDArray[np.float32]
+    # The region of the film the image covers, as (x, y, width, height).
+    window: tuple[int, int, int, int]
+    # The region of the film which was rendered: the image's region widened by the radius of the reconstruction filter.
+    rendered: tuple[int, int, int, int]
+
+
+def filter_radius(rfilter: ReconstructionFilter) -> float:
+    """
+    Returns the radius of a reconstruction filter in pixels, as Mitsuba defines it.
+    """
+    match rfilter:
+        case BoxFilter():
+            return 0.5
+        case TentFilter(radius=radius):
+            return radius
+        case GaussianFilter(stddev=stddev):
+            return 4 * stddev
+        case CatmullRomFilter():
+            return 2.0
+
+
+def _clip(corners: tuple[int, int, int, int], window: tuple[int, int, int, int]) -> tuple[int, int, int, int]:
+    """
+    Clips a region given by its corners, as (x0, y0, x1, y1), to a window, and returns it as (x, y, width, height).
+    """
+    (left, top, width, height) = window
+    (x0, y0, x1, y1) = corners
+    (x0, x1) = (min(max(x0, left), left + width), min(max(x1, left), left + width))
+    (y0, y1) = (min(max(y0, top), top + height), min(max(y1, top), top + height))
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+def widen_by_filter(film: Film, window: tuple[int, int, int, int]) -> tuple[int, int, int, int]:
+    """
+    Returns a region of a film, as (x, y, width, height), widened by the radius of its reconstruction filter and clipped
+    to its crop window.
+
+    Rendering the widened region gives every pixel of the original one the samples it would get in a render of the
+    whole film, including those splatted onto it from neighbouring pixels, so once the margin is cut off the pixels
+    converge to the same values as in a full render.
+    """
+    (x, y, width, height) = window
+    margin = math.ceil(filter_radius(film.rfilter))
+    return _clip((x - margin, y - margin, x + width + margin, y + height + margin), film.crop_window)
+
+
+def shape_bounds(mi_scene: mi.Scene, ids: Iterable[str]) -> Box:
+    """
+    Returns the world-space box bounding the shapes of a loaded scene with the given IDs (including instances of shape
+    groups, but not the shapes within groups).
+
+    Raises:
+        ValueError: If the scene has no shape with one of the IDs.
+    """
+    bounds = {shape.id(): shape.bbox() for shape in mi_scene.shapes()}
+    ids = list(ids)
+    if missing := [id for id in ids if id not in bounds]:
+        raise ValueError(f"The scene has no shapes with the IDs {', '.join(missing)}")
+    if not ids:
+        raise ValueError("No shapes were given")
+    lower = np.min([np.array(bounds[id].min) for id in ids], axis=0)
+    upper = np.max([np.array(bounds[id].max) for id in ids], axis=0)
+    return ((float(lower[0]), float(lower[1]), float(lower[2])), (float(upper[0]), float(upper[1]), float(upper[2])))
+
+
+def _project_corners(sensor: Camera, params: mi.SceneParameters, box: Box) -> None | npt.NDArray[np.float64]:
+    """
+    Returns the positions of the corners of a world-space box on the film of a sensor, in pixels, or None if part of
+    the box lies behind the near clipping plane.
+    """
+    film = sensor.film
+    to_world = np.eye(4) if sensor.to_world is None else np.array(sensor.to_world.model_dump(mode="python").matrix)
+    x_fov = float(np.asarray(params["sensor.x_fov"]).reshape(-1)[0])
+    size = mi.ScalarVector2i(film.width, film.height)
+    # NOTE: Mitsuba's stubs describe its JIT variants, which take the angle and clipping planes as JIT floats, but every
+    # variant takes Python floats.
+    (fov, near_clip, far_clip) = (
+        cast("dr.auto.ad.Float", value) for value in (x_fov, sensor.near_clip, sensor.far_clip)
+    )
+    projection = mi.perspective_projection(size, size, mi.ScalarVector2i(0, 0), fov, near_clip, far_clip)
+    # JIT variants return a JIT matrix, whose entries are arrays of one element.
+    to_sample = np.array(projection.matrix).reshape(4, 4)
+    corners = np.array([[*corner, 1.0] for corner in itertools.product(*zip(*box, strict=True))])
+    camera = corners @ np.linalg.inv(to_world).T
+    if np.any(camera[:, 2] <= sensor.near_clip):
+        return None
+    projected = camera @ to_sample.T
+    samples = projected[:, :2] / projected[:, 3:]
+    if isinstance(sensor, Perspective):
+        # NOTE: Mitsuba shifts the sample positions of rays by the principal point offset before unprojecting them.
+        samples -= (sensor.principal_point_offset_x, sensor.principal_point_offset_y)
+    return samples * (film.width, film.height)
+
+
+def project_box(scene: Scene, params: mi.SceneParameters, box: Box) -> tuple[int, int, int, int]:
+    """
+    Returns the region of the film of a scene's main sensor which a world-space box covers, as (x, y, width, height),
+    clipped to the crop window of the film. The whole crop window is returned if part of the box lies behind the near
+    clipping plane, where it cannot be projected.
+
+    Args:
+        scene: The scene.
+        params: The parameters of the scene, as loaded by Mitsuba; the field of view of the sensor is taken from them,
+            since Mitsuba derives it from several fields (`fov`, `fov_axis`, `focal_length` and the film's size).
+        box: The box.
+
+    Raises:
+        ValueError: If the main sensor is a batch sensor.
+    """
+    sensor = scene.sensor
+    if isinstance(sensor, Batch):
+        raise ValueError("Regions of interest cannot be rendered with batch sensors")
+    window = sensor.film.crop_window
+    pixels = _project_corners(sensor, params, box)
+    if pixels is None:
+        return window
+    corners = (
+        math.floor(pixels[:, 0].min()),
+        math.floor(pixels[:, 1].min()),
+        math.ceil(pixels[:, 0].max()),
+        math.ceil(pixels[:, 1].max()),
+    )
+    return _clip(corners, window)
+
+
+def render_region(
+    scene: Scene,
+    ids: None | Iterable[str] = None,
+    box: None | Box = None,
+    *,
+    spp: None | int = None,
+    seed: int = 0,
+) -> RegionImage:
+    """
+    Renders only the region of the film of a scene's main sensor which some shapes, or a world-space box, cover.
+
+    The film is cropped to the region widened by the radius of the reconstruction filter, so that every pixel of the
+    region gets the samples it would get in a render of the whole film, and the margin is cut off afterwards. The
+    pixels of the region therefore converge to the same values as in a full render, though their noise differs.
+
+    Args:
+        scene: The scene.
+        ids: The IDs of the shapes whose bounds make up the region.
+        box: A world-space box making up the region, instead of shapes.
+        spp: Samples per pixel, overriding the sampler of the sensor.
+        seed: Seed of the render.
+
+    Raises:
+        ValueError: If neither or both of `ids` and `box` are given, the region is outside the film, or the main sensor
+            is a batch sensor.
+    """
+    if (ids is None) == (box is None):
+        raise ValueError("A region of interest is given by either shape IDs or a box")
+    mi_scene = load_scene(scene)
+    params = mi.traverse(mi_scene)
+    if box is None:
+        assert ids is not None
+        box = shape_bounds(mi_scene, ids)
+    window = project_box(scene, params, box)
+    (x, y, width, height) = window
+    if width == 0 or height == 0:
+        raise ValueError(f"The region of interest {box} is outside the film")
+    rendered = widen_by_filter(scene.sensor.film, window)
+    set_crop_window(params, rendered)
+    with trace("render", window=window):
+        image = np.array(render_synced(mi_scene, spp=spp or 0, seed=seed), dtype=np.float32)
+    (x0, y0, _, _) = rendered
+    return RegionImage(image[y - y0 : y - y0 + height, x - x0 : x - x0 + width], window, rendered)
@@ -1,28 +1,146 @@
-from typing import Literal, final
+import math
+from typing import Literal, Self, final, override
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 type IndependentType = Literal["independent"]
+type StratifiedType = Literal["stratified"]
+type MultiJitterType = Literal["multijitter"]
 type OrthogonalType = Literal["orthogonal"]
+type LDSamplerType = Literal["ldsampler"]
 
-type SamplerType = IndependentType | OrthogonalType
-type Sampler = Independent | Orthogonal
+type SamplerType = IndependentType | StratifiedType | MultiJitterType | OrthogonalType | LDSamplerType
+type Sampler = Independent | Stratified | MultiJitter | Orthogonal | LDSampler
 
 
-@final
-class Independent(BaseModel, frozen=True):
-    sample_count: int = Field(default=4, description="Number of samples per pixel")
+def _is_prime(n: int) -> bool:
+    return n > 1 and all(n % divisor for divisor in range(2, math.isqrt(n) + 1))
+
+
+class SamplerLike(BaseModel, frozen=True):
+    """
+    Most samplers only support some numbers of samples per pixel, which `valid_sample_count` gives. Mitsuba rounds
+    other counts up with a warning, so the models reject them instead, and `with_sample_count` rounds them the way
+    Mitsuba would.
+    """
+
+    sample_count: int = Field(default=4, ge=1, description="Number of samples per pixel")
     seed: int = Field(default=0, description="Seed offset")
+
+    @model_validator(mode="after")
+    def check_sample_count(self: Self) -> Self:
+        if (above := self.valid_sample_count(self.sample_count)) != self.sample_count:
+            below = self.valid_sample_count(self.sample_count, round_up=False)
+            closest = f"{above}" if below >= above else f"{below} or {above}"
+            name = type(self).__name__
+            raise ValueError(
+                f"The {name} sampler cannot take {self.sample_count} samples per pixel, but can take {closest}"
+            )
+        # Counts the sampler takes are kept as they are whichever way they are rounded.
+        assert self.valid_sample_count(self.sample_count, round_up=False) == self.sample_count
+        return self
+
+    def valid_sample_count(self: Self, count: int, round_up: bool = True) -> int:  # noqa: PLR6301
+        """
+        Returns the closest number of samples per pixel to `count` which the sampler supports, at least `count` if
+        `round_up` (as Mitsuba does), and otherwise at most `count` where possible.
+        """
+        return max(count, 1)
+
+    def with_sample_count(self: Self, count: int, round_up: bool = True) -> Self:
+        """
+        Returns a copy of the sampler taking the closest number of samples per pixel to `count` it supports (see
+        `valid_sample_count`).
+        """
+        return self.model_validate({**dict(self), "sample_count": self.valid_sample_count(count, round_up)})
+
+
+@final
+class Independent(SamplerLike, frozen=True):
     type: IndependentType = "independent"
 
 
 @final
-class Orthogonal(BaseModel, frozen=True):
+class Stratified(SamplerLike, frozen=True):
     sample_count: int = Field(
         default=4,
-        description="Number of samples per pixel. This value has to be the square of a prime number",
+        ge=1,
+        description="Number of samples per pixel. This value has to be a perfect square",
     )
-    strength: int = Field(default=2, description="Orthogonal array's strength")
-    seed: int = Field(default=0, description="Seed offset")
+    jitter: bool = Field(default=True, description="Adds additional random jitter withing the stratum")
+    type: StratifiedType = "stratified"
+
+    @override
+    def valid_sample_count(self: Self, count: int, round_up: bool = True) -> int:
+        root = math.isqrt(max(count, 1))
+        return (root + 1) ** 2 if round_up and root * root < count else root * root
+
+
+@final
+class MultiJitter(SamplerLike, frozen=True):
+    sample_count: int = Field(
+        default=4,
+        ge=1,
+        description="""
+            Number of samples per pixel. This value has to be the product of the two sides of a stratification grid
+            whose shorter side is the integer square root of the count, i.e. n * n, n * (n + 1) or n * (n + 2)
+        """,
+    )
+    jitter: bool = Field(default=True, description="Adds additional random jitter withing the substratum")
+    type: MultiJitterType = "multijitter"
+
+    @override
+    def valid_sample_count(self: Self, count: int, round_up: bool = True) -> int:
+        count = max(count, 1)
+        # NOTE: Mitsuba takes the integer square root of the count as the number of rows of the stratification grid,
+        # and as many columns as it takes to reach the count; (rows + 1) ** 2 would have more rows.
+        rows = math.isqrt(count)
+        counts = [rows * columns for columns in (rows, rows + 1, rows + 2)]
+        if round_up:
+            return min(valid for valid in counts if valid >= count)
+        return max(valid for valid in counts if valid <= count)
+
+
+@final
+class Orthogonal(SamplerLike, frozen=True):
+    sample_count: int = Field(
+        default=4,
+        ge=1,
+        description="""
+            Number of samples per pixel. This value has to be a prime number raised to the strength of the orthogonal
+            array, e.g. the square of a prime number
+        """,
+    )
+    strength: int = Field(default=2, ge=2, description="Orthogonal array's strength")
     jitter: bool = Field(default=True, description="Adds additional random jitter withing the substratum")
     type: OrthogonalType = "orthogonal"
+
+    @override
+    def valid_sample_count(self: Self, count: int, round_up: bool = True) -> int:
+        # The smallest prime whose power reaches the count, and the prime before it.
+        prime = 2
+        while prime**self.strength < count:
+            prime += 1
+            while not _is_prime(prime):
+                prime += 1
+        if round_up or prime**self.strength == count:
+            return prime**self.strength
+        return max((p for p in range(2, prime) if _is_prime(p)), default=2) ** self.strength
+
+
+@final
+class LDSampler(SamplerLike, frozen=True):
+    sample_count: int = Field(
+        default=4,
+        ge=1,
+        description="Number of samples per pixel. This value has to be a power of four (at least four)",
+    )
+    type: LDSamplerType = "ldsampler"
+
+    @override
+    def valid_sample_count(self: Self, count: int, round_up: bool = True) -> int:
+        # NOTE: Mitsuba documents powers of two, but stratifies both dimensions of the pixel equally.
+        lower = 4
+        while lower * 4 <= count:
+            lower *= 4
+        return lower * 4 if round_up and lower < count else lower
@@ -3,16 +3,23 @@ from typing import Literal, final
 from pydantic import BaseModel
 
 from mitsuba_wrapper.bsdf import BSDF
+from mitsuba_wrapper.emitter import Emitter
 from mitsuba_wrapper.integrator import Integrator
+from mitsuba_wrapper.medium import Medium
 from mitsuba_wrapper.sensor import Sensor
 from mitsuba_wrapper.shape import Shape
+from mitsuba_wrapper.spectrum import Spectrum
+from mitsuba_wrapper.texture import Texture
 
 type SceneType = Literal["scene"]
+# Objects which can be declared at the top level of a scene and referenced by their ID. Sensors declared besides the
+# `sensor` field are additional viewpoints, which can be rendered from the same loaded scene.
+type SceneObject = BSDF | Emitter | Shape | Spectrum | Texture | Medium | Sensor
 
 
 @final
 class Scene(BaseModel, extra="allow", frozen=True):
-    __pydantic_extra__: dict[str, BSDF | Shape]  # pyright: ignore[reportIncompatibleVariableOverride]
+    __pydantic_extra__: dict[str, SceneObject]  # pyright: ignore[reportIncompatibleVariableOverride]
 
     integrator: Integrator
     sensor: Sensor
@@ -15,11 +15,18 @@ class VirtualDisplay(BaseModel, frozen=False, extra="forbid"):
     A virtual display rendered in 3D.
     """
 
-    height_resolution: int = Field(30, gt=0, description="Height of the screen in pixels")
-    width_resolution: int = Field(40, gt=0, description="Width of the screen in pixels")
+    height_resolution: int = Field(default=30, gt=0, description="Height of the screen in pixels")
+    width_resolution: int = Field(default=40, gt=0, description="Width of the screen in pixels")
 
-    height_length: float = Field(3, gt=0, description="Height of the screen")
-    width_length: float = Field(4, gt=0, description="Width of the screen")
+    height_length: float = Field(default=3, gt=0, description="Height of the screen")
+    width_length: float = Field(default=4, gt=0, description="Width of the screen")
+
+    inter_pixel_spacing: float = Field(
+        default=0.005,
+        ge=0,
+        description="Spacing between adjacent pixels, and between the pixels and the edges of the screen",
+    )
+    intra_pixel_spacing: float = Field(default=0.001, ge=0, description="Spacing between adjacent subpixels of a pixel")
 
     def to_shapes(self, origin: tuple[float, float, float] = (0, 0, 0)) -> Mapping[ID, Shape]:
         (X, Y, Z) = origin
@@ -33,7 +40,7 @@ class VirtualDisplay(BaseModel, frozen=False, extra="forbid"):
         #    width_resolution * (pixel_width + inter_pixel_spacing) + inter_pixel_spacing = width_length
         #
         # NOTE: This formulation has `inter_pixel_spacing` between each pixel and at the edges.
-        inter_pixel_spacing: float = 0.005
+        inter_pixel_spacing: float = self.inter_pixel_spacing
         pixel_height: float = (self.height_length - inter_pixel_spacing) / self.height_resolution - inter_pixel_spacing
         pixel_width: float = (self.width_length - inter_pixel_spacing) / self.width_resolution - inter_pixel_spacing
 
@@ -42,8 +49,10 @@ class VirtualDisplay(BaseModel, frozen=False, extra="forbid"):
         #    3 * subpixel_width + 2 * intra_pixel_spacing = pixel_width
         #
         # NOTE: The depth and height of the subpixel are the same as the pixel.
-        intra_pixel_spacing: float = 0.001
+        intra_pixel_spacing: float = self.intra_pixel_spacing
         subpixel_width: float = (pixel_width - 2 * intra_pixel_spacing) / 3
+        if pixel_height <= 0 or subpixel_width <= 0:
+            raise ValueError("The spacing between (sub)pixels leaves no room for the (sub)pixels themselves")
 
         subpixels: Mapping[Literal["red", "green", "blue"], tuple[float, float, float]] = {
             "red": (10.387, 0.9873, 0.75357),
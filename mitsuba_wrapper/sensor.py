@@ -1,17 +1,22 @@
-from typing import Literal, final
+from typing import Literal, Self, final
 
-from pydantic import Field
+from pydantic import BaseModel, Field, model_validator
 
-from mitsuba_wrapper.film import HDRFilm
+from mitsuba_wrapper.film import Film, HDRFilm
+from mitsuba_wrapper.medium import Medium
+from mitsuba_wrapper.ref import Ref
 from mitsuba_wrapper.sampler import Independent, Sampler
 from mitsuba_wrapper.spectrum import Spectrum
 from mitsuba_wrapper.utils import Placeable
 
 type PerspectiveType = Literal["perspective"]
 type ThinLensType = Literal["thinlens"]
+type BatchType = Literal["batch"]
 
-type SensorType = PerspectiveType | ThinLensType
-type Sensor = Perspective | ThinLens
+type SensorType = PerspectiveType | ThinLensType | BatchType
+# Sensors which render a single view, as opposed to a batch of them.
+type Camera = Perspective | ThinLens
+type Sensor = Perspective | ThinLens | Batch
 
 
 class PerspectiveLike(Placeable, frozen=True):
@@ -38,8 +43,9 @@ class PerspectiveLike(Placeable, frozen=True):
         description="Denotes the world-space distance from the camera's aperture to the focal plane",
     )
     # TODO: RuntimeError: ​[xml_v.cpp:467] Unreferenced property "fov_axis" in plugin of type "thinlens"!
-    fov_axis: Literal["x", "y", "diagonal", "smaller", "larger"] = Field(
-        default="x",
+    fov_axis: None | Literal["x", "y", "diagonal", "smaller", "larger"] = Field(
+        # NOTE: Left unset by default, since Mitsuba rejects the parameter when the field of view is not given by fov.
+        default=None,
         description="""
             When the parameter fov is given (and only then), this parameter further specifies the image axis, to which
             it applies.
@@ -61,10 +67,14 @@ class PerspectiveLike(Placeable, frozen=True):
         default_factory=Independent,
         description="Specifies the sampler to use for generating camera rays",
     )
-    film: HDRFilm = Field(
+    film: Film = Field(
         default_factory=HDRFilm,
         description="Specifies the film to use for storing the rendered image",
     )
+    medium: None | Medium | Ref = Field(
+        default=None,
+        description="Specifies the medium the sensor is located in",
+    )
 
 
 @final
@@ -91,3 +101,48 @@ class ThinLens(PerspectiveLike, frozen=True):
         description="Denotes the radius of the camera's aperture in scene units",
     )
     type: ThinLensType = "thinlens"
+
+
+@final
+class Batch(BaseModel, extra="allow", frozen=True):
+    """
+    Renders several cameras at once into a single film, which is split into equally wide, adjacent slices: one per
+    camera, from left to right in the order they are declared. The films and samplers of the cameras are ignored.
+    """
+
+    __pydantic_extra__: dict[str, Camera]  # type: ignore
+    srf: None | Spectrum = Field(
+        default=None,
+        description="Sensor Response Function that defines the spectral sensitivity of the sensor",
+    )
+    sampler: Sampler = Field(
+        default_factory=Independent,
+        description="Specifies the sampler to use for generating camera rays",
+    )
+    film: Film = Field(
+        default_factory=HDRFilm,
+        description="Specifies the film to use for storing the rendered image, whose width is shared by the cameras",
+    )
+    type: BatchType = "batch"
+
+    @model_validator(mode="after")
+    def check_cameras(self: Self) -> Self:
+        cameras = len(self.model_extra or {})
+        if cameras == 0:
+            raise ValueError("A batch sensor needs at least one camera")
+        if self.film.width % cameras != 0:
+            raise ValueError(
+                f"The film's width ({self.film.width}) is not divisible by the number of cameras ({cameras})"
+            )
+        return self
+
+    @property
+    def cameras(self: Self) -> dict[str, Camera]:
+        """
+        The cameras of the batch, in the order they appear on the film.
+        """
+        return dict(self.model_extra or {})
+
+
+# Every sensor model, for use with isinstance.
+SENSOR_TYPES: tuple[type[Sensor], ...] = (Perspective, ThinLens, Batch)
@@ -1,23 +1,28 @@
+from collections.abc import Callable, Iterator, Mapping
 from typing import Literal, final
 
 from pydantic import BaseModel, Field
 
 from mitsuba_wrapper.bsdf import BSDF
 from mitsuba_wrapper.emitter import Emitter
+from mitsuba_wrapper.medium import Medium
 from mitsuba_wrapper.ref import Ref
 from mitsuba_wrapper.utils import Point3f, Transform4f
 
 type ObjType = Literal["obj"]
+type PlyType = Literal["ply"]
 type SphereType = Literal["sphere"]
 type RectangleType = Literal["rectangle"]
 type CubeType = Literal["cube"]
 type GroupType = Literal["shapegroup"]
 type InstanceType = Literal["instance"]
 
-type ShapeType = ObjType | SphereType | RectangleType | CubeType | GroupType | InstanceType
+type ShapeType = ObjType | PlyType | SphereType | RectangleType | CubeType | GroupType | InstanceType
 # Need to force Shape to be lazily evaluated since it is the value type parameter of the mapping
 # in ShapeGroup.
-type Shape = "Obj | Sphere | Rectangle | Cube | ShapeGroup | Instance"
+type Shape = "Obj | Ply | Sphere | Rectangle | Cube | ShapeGroup | Instance"
+# Shapes which carry geometry (and so a BSDF or emitter) themselves, as opposed to grouping or instancing other shapes.
+type Primitive = Obj | Ply | Sphere | Rectangle | Cube
 
 
 class ShapeLike(BaseModel, frozen=True):
@@ -30,6 +35,8 @@ class ShapeLike(BaseModel, frozen=True):
     )
     bsdf: None | BSDF | Ref = Field(default=None, description="Specifies the object's BSDF")
     emitter: None | Emitter | Ref = Field(default=None, description="Specifies the object's emitter")
+    interior: None | Medium | Ref = Field(default=None, description="Specifies the medium inside of the object")
+    exterior: None | Medium | Ref = Field(default=None, description="Specifies the medium outside of the object")
 
 
 class PrimitiveLike(ShapeLike, frozen=True):
@@ -62,6 +69,27 @@ class Obj(ShapeLike, frozen=True):
     type: ObjType = "obj"
 
 
+@final
+class Ply(ShapeLike, frozen=True):
+    filename: str = Field(description="Filename of the PLY file that should be loaded")
+    face_normals: bool = Field(
+        default=False,
+        description="""
+            When set to true, any existing or computed vertex normals are discarded and face normals will instead be
+            used during rendering. This gives the rendered object a faceted appearance
+        """,
+    )
+    flip_tex_coords: bool = Field(
+        default=False,
+        description="Treat the vertical component of the texture as inverted?",
+    )
+    flip_normals: bool = Field(
+        default=False,
+        description="Is the mesh inverted, i.e. should the normal vectors be flipped?",
+    )
+    type: PlyType = "ply"
+
+
 @final
 class Sphere(PrimitiveLike, frozen=True):
     center: Point3f = Field(
@@ -106,3 +134,57 @@ class Instance(BaseModel, frozen=True):
     )
     shapegroup: ShapeGroup | Ref = Field(description="A reference to a shape group that should be instantiated")
     type: InstanceType = "instance"
+
+
+# Every shape model, for use with isinstance.
+SHAPE_TYPES: tuple[type[Shape], ...] = (Obj, Ply, Sphere, Rectangle, Cube, ShapeGroup, Instance)
+
+
+def iter_primitives(shapes: Mapping[str, Shape]) -> Iterator[Primitive]:
+    """
+    Yields every shape which can carry a BSDF or emitter, descending into shape groups and inline instances.
+    """
+    for shape in shapes.values():
+        match shape:
+            case ShapeGroup():
+                yield from iter_primitives(shape.model_extra or {})
+            case Instance(shapegroup=ShapeGroup() as group):
+                yield from iter_primitives(group.model_extra or {})
+            case Instance():
+                pass
+            case _:
+                yield shape
+
+
+def map_primitives(
+    shapes: Mapping[str, Shape],
+    fn: Callable[[Primitive], Primitive],
+) -> dict[str, Shape]:
+    """
+    Rebuilds `shapes` with `fn` applied to every primitive, descending into shape groups and inline instances.
+
+    Shapes are only copied when `fn` changes them (or one of their children), so unchanged subtrees are shared with the
+    input.
+    """
+    mapped: dict[str, Shape] = {}
+    for id, shape in shapes.items():
+        match shape:
+            case ShapeGroup():
+                mapped[id] = _map_group(shape, fn)
+            case Instance(shapegroup=ShapeGroup() as group):
+                new_group = _map_group(group, fn)
+                mapped[id] = shape if new_group is group else shape.model_copy(update={"shapegroup": new_group})
+            case Instance():
+                mapped[id] = shape
+            case _:
+                mapped[id] = fn(shape)
+    return mapped
+
+
+def _map_group(group: ShapeGroup, fn: Callable[[Primitive], Primitive]) -> ShapeGroup:
+    children = group.model_extra or {}
+    new_children = map_primitives(children, fn)
+    if all(new_children[id] is child for id, child in children.items()):
+        return group
+    # NOTE: The children have already been validated, so we can skip validation when rebuilding the group.
+    return ShapeGroup.model_construct(None, **new_children)
@@ -0,0 +1,192 @@
+import json
+import struct
+from collections.abc import Iterator, Mapping, Sequence
+from functools import cached_property
+from pathlib import Path
+from typing import Any, final
+
+import numpy as np
+import numpy.typing as npt
+from pydantic import BaseModel, TypeAdapter
+
+from mitsuba_wrapper.scene import Scene, SceneObject
+from mitsuba_wrapper.utils import Color3f, Point3f, Transform4f, Vector3f
+
+# Layout of the start of a snapshot: the magic bytes, the format version and the length of the JSON header which
+# follows. The arrays follow the header, each aligned to _ALIGNMENT bytes.
+_PREAMBLE = struct.Struct("<8sIQ")
+_MAGIC = b"MWSCENE\0"
+_VERSION = 1
+_ALIGNMENT = 64
+
+_OBJECT_ROW = np.dtype([("template", "<u4"), ("transforms", "<u4"), ("vectors", "<u4")])
+_SCENE_OBJECT: TypeAdapter[SceneObject] = TypeAdapter(SceneObject)
+
+
+def _aligned(size: int) -> int:
+    return -(-size // _ALIGNMENT) * _ALIGNMENT
+
+
+def _pack(value: Any, dumped: Any, transforms: list[Any], vectors: list[Any]) -> Any:
+    """
+    Returns the JSON form of `value` with every transform and 3-vector replaced by the index of its slot, appending the
+    values themselves to `transforms` and `vectors`.
+    """
+    match value:
+        case Transform4f():
+            transforms.append(dumped)
+            return {"$transform": len(transforms) - 1}
+        case Color3f() | Point3f() | Vector3f():
+            vectors.append(dumped)
+            return {"$vector": len(vectors) - 1}
+        case BaseModel():
+            return {key: _pack(field, dumped[key], transforms, vectors) for key, field in value if key in dumped}
+        case _:
+            return dumped
+
+
+def _unpack(
+    template: Any,
+    transforms: npt.NDArray[np.float32],
+    vectors: npt.NDArray[np.float32],
+) -> Any:
+    match template:
+        case {"$transform": int(index)}:
+            return transforms[index].tolist()
+        case {"$vector": int(index)}:
+            return vectors[index].tolist()
+        case dict():
+            return {key: _unpack(value, transforms, vectors) for key, value in template.items()}
+        case _:
+            return template
+
+
+def write_snapshot(scene: Scene, path: str | Path) -> None:
+    """
+    Writes a scene as a binary snapshot, which `SceneSnapshot` reads.
+
+    Every top-level object is split into a template (its JSON form, minus transforms and vectors) and the transforms
+    and vectors (colors, points and directions) it contains. Identical templates are stored once, and the transforms
+    and vectors of all objects are packed into two contiguous float32 arrays, so a scene of many shapes differing only
+    in their placement and color is stored as little more than those arrays.
+
+    NOTE: Transforms and vectors are stored in single precision, which is what Mitsuba renders with, so objects read
+    back from a snapshot may differ from the originals in the last digits.
+    """
+    templates: dict[str, int] = {}
+    rows: list[tuple[int, int, int]] = []
+    transforms: list[Any] = []
+    vectors: list[Any] = []
+    extras = scene.model_extra or {}
+    for value in extras.values():
+        # Slots are numbered per object, so objects which differ only in their transforms and vectors share a template.
+        (own_transforms, own_vectors) = ([], [])
+        text = json.dumps(_pack(value, value.model_dump(mode="json", exclude_none=True), own_transforms, own_vectors))
+        rows.append((templates.setdefault(text, len(templates)), len(transforms), len(vectors)))
+        transforms.extend(own_transforms)
+        vectors.extend(own_vectors)
+    arrays: Mapping[str, npt.NDArray[Any]] = {
+        "objects": np.array(rows, dtype=_OBJECT_ROW),
+        "transforms": np.array(transforms, dtype="<f4").reshape(-1, 4, 4),
+        "vectors": np.array(vectors, dtype="<f4").reshape(-1, 3),
+    }
+    header: dict[str, Any] = {
+        "integrator": scene.integrator.model_dump(mode="json", exclude_none=True),
+        "sensor": scene.sensor.model_dump(mode="json", exclude_none=True),
+        "templates": [json.loads(text) for text in templates],
+        "ids": list(extras),
+        "arrays": {},
+    }
+    # Offsets are relative to the end of the header, so they do not depend on its length.
+    offset = 0
+    for name, array in arrays.items():
+        header["arrays"][name] = {"offset": offset, "shape": list(array.shape)}
+        offset += _aligned(array.nbytes)
+    encoded = json.dumps(header).encode()
+    start = _aligned(_PREAMBLE.size + len(encoded))
+    with Path(path).open("wb") as f:
+        _ = f.write(_PREAMBLE.pack(_MAGIC, _VERSION, len(encoded)))
+        _ = f.write(encoded)
+        for name, array in arrays.items():
+            _ = f.seek(start + header["arrays"][name]["offset"])
+            _ = f.write(array.tobytes())
+        # Pad the file to its full length, so the last array can be mapped even when it is empty.
+        _ = f.truncate(start + offset)
+
+
+@final
+class SceneSnapshot:
+    """
+    A scene stored by `write_snapshot`, memory-mapped read-only.
+
+    Opening a snapshot only reads its header. Single objects can be read by ID without deserializing the rest of the
+    scene, touching only the pages holding their transforms and vectors.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path: Path = Path(path)
+        with self.path.open("rb") as f:
+            preamble = f.read(_PREAMBLE.size)
+            if len(preamble) != _PREAMBLE.size:
+                raise ValueError(f"{self.path} is truncated")
+            (magic, version, length) = _PREAMBLE.unpack(preamble)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f"{self.path} is not a version {_VERSION} scene snapshot")
+            header = json.loads(f.read(length))
+        start = _aligned(_PREAMBLE.size + length)
+        data = np.memmap(self.path, dtype=np.uint8, mode="r")
+        self._header: dict[str, Any] = header
+        self.templates: list[Any] = header["templates"]
+        self.ids: list[str] = header["ids"]
+        try:
+            (self.objects, self.transforms, self.vectors) = (
+                np.ndarray(
+                    tuple(header["arrays"][name]["shape"]),
+                    dtype=dtype,
+                    buffer=data,
+                    offset=start + header["arrays"][name]["offset"],
+                )
+                for (name, dtype) in (("objects", _OBJECT_ROW), ("transforms", "<f4"), ("vectors", "<f4"))
+            )
+        except TypeError as e:
+            # NumPy reports arrays which do not fit in the buffer as a TypeError.
+            raise ValueError(f"{self.path} is truncated") from e
+
+    @cached_property
+    def rows(self) -> dict[str, int]:
+        """
+        The row of every object in `objects`, by ID.
+        """
+        return {id: row for row, id in enumerate(self.ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, id: object) -> bool:
+        return id in self.rows
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.ids)
+
+    def object_dict(self, id: str) -> Any:
+        """
+        Returns the JSON form of the object with the given ID.
+        """
+        (template, transforms, vectors) = self.objects[self.rows[id]].tolist()
+        return _unpack(self.templates[template], self.transforms[transforms:], self.vectors[vectors:])
+
+    def object(self, id: str) -> SceneObject:
+        """
+        Returns the object with the given ID.
+        """
+        return _SCENE_OBJECT.validate_python(self.object_dict(id))
+
+    def scene(self, ids: None | Sequence[str] = None) -> Scene:
+        """
+        Returns the scene, or the part of it made up of the objects with the given IDs.
+        """
+        return Scene.model_validate({
+            "integrator": self._header["integrator"],
+            "sensor": self._header["sensor"],
+            **{id: self.object_dict(id) for id in (self.ids if ids is None else ids)},
+        })
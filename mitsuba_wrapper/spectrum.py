@@ -1,15 +1,31 @@
-from typing import Literal, final
+import builtins
+from collections.abc import Iterable
+from itertools import pairwise
+from typing import Literal, Self, final
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_serializer, field_validator, model_validator
 
 from mitsuba_wrapper.utils import Color3f
 
 type RGBType = Literal["rgb"]
 type SRGBType = Literal["srgb"]
 type UniformType = Literal["uniform"]
+type D65Type = Literal["d65"]
+type RegularType = Literal["regular"]
+type IrregularType = Literal["irregular"]
 
-type SpectrumType = RGBType | SRGBType | UniformType
-type Spectrum = RGB | SRGB | Uniform
+type SpectrumType = RGBType | SRGBType | UniformType | D65Type | RegularType | IrregularType
+type Spectrum = RGB | SRGB | Uniform | D65 | Regular | Irregular
+
+
+def _format_values(values: Iterable[float]) -> str:
+    # Mitsuba reads tabulated spectra from comma-separated strings, both in XML and in scene dictionaries.
+    return ", ".join(map(repr, values))
+
+
+def _parse_values(values: object) -> object:
+    # Accept the serialized form as well, so that dumped scenes can be validated again.
+    return tuple(float(value) for value in values.split(",")) if isinstance(values, str) else values
 
 
 @final
@@ -40,3 +56,79 @@ class SRGB(BaseModel, frozen=True):
         description="Spectral upsampling model coefficients of the srgb color value",
     )
     type: SRGBType = "srgb"
+
+
+@final
+class D65(BaseModel, frozen=True):
+    color: None | Color3f = Field(
+        default=None,
+        description="""
+            Optional color the illuminant spectrum is multiplied with. This is what an inline rgb value expands to
+            when it is used as the radiance or intensity of an emitter
+        """,
+    )
+    type: D65Type = "d65"
+
+
+@final
+class Regular(BaseModel, frozen=True):
+    wavelength_min: float = Field(description="Minimum wavelength of the spectral range in nanometers")
+    wavelength_max: float = Field(description="Maximum wavelength of the spectral range in nanometers")
+    values: tuple[float, ...] = Field(
+        min_length=2,
+        description="Values of the spectral function at equidistant wavelengths spanning the spectral range",
+    )
+    type: RegularType = "regular"
+
+    @field_serializer("values")
+    def values_serializer(self: Self, values: tuple[float, ...]) -> str:  # noqa: PLR6301
+        return _format_values(values)
+
+    # NOTE: Annotations of methods are evaluated in the class body, where `type` is the field above, not the builtin.
+    @field_validator("values", mode="before")
+    @classmethod
+    def values_validator(cls: builtins.type[Self], values: object) -> object:
+        return _parse_values(values)
+
+    @model_validator(mode="after")
+    def check_range(self: Self) -> Self:
+        if self.wavelength_min >= self.wavelength_max:
+            raise ValueError("wavelength_min must be smaller than wavelength_max")
+        return self
+
+    @classmethod
+    def box(cls: builtins.type[Self], wavelength_min: float, wavelength_max: float, value: float = 1.0) -> Self:
+        """
+        Returns the spectrum which is `value` within the given range and zero outside of it.
+        """
+        return cls(wavelength_min=wavelength_min, wavelength_max=wavelength_max, values=(value, value))
+
+
+@final
+class Irregular(BaseModel, frozen=True):
+    wavelengths: tuple[float, ...] = Field(
+        min_length=2,
+        description="Wavelengths in nanometers at which the spectral function is specified, in increasing order",
+    )
+    values: tuple[float, ...] = Field(
+        min_length=2,
+        description="Values of the spectral function at the specified wavelengths",
+    )
+    type: IrregularType = "irregular"
+
+    @field_serializer("wavelengths", "values")
+    def values_serializer(self: Self, values: tuple[float, ...]) -> str:  # noqa: PLR6301
+        return _format_values(values)
+
+    @field_validator("wavelengths", "values", mode="before")
+    @classmethod
+    def values_validator(cls: builtins.type[Self], values: object) -> object:
+        return _parse_values(values)
+
+    @model_validator(mode="after")
+    def check_samples(self: Self) -> Self:
+        if len(self.wavelengths) != len(self.values):
+            raise ValueError(f"Got {len(self.wavelengths)} wavelengths but {len(self.values)} values")
+        if any(a >= b for a, b in pairwise(self.wavelengths)):
+            raise ValueError("Wavelengths must be strictly increasing")
+        return self
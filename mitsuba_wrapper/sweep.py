@@ -0,0 +1,237 @@
+import functools
+import inspect
+import itertools
+import json
+import math
+import multiprocessing
+import os
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Self, final
+
+import mitsuba as mi
+import numpy as np
+import numpy.typing as npt
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_jsonable_python
+
+from mitsuba_wrapper.diff import LiveScene, diff_scenes
+from mitsuba_wrapper.scene import Scene, SceneObject
+from mitsuba_wrapper.tracing import render_synced, trace
+from mitsuba_wrapper.utils import atomic_write
+from mitsuba_wrapper.variant import default_variant
+
+type Point = Mapping[str, Any]
+
+_SCENE_OBJECT: TypeAdapter[SceneObject] = TypeAdapter(SceneObject)
+_INDEX = "index.json"
+_IMAGES = "images.bin"
+
+
+def grid(axes: Mapping[str, Sequence[Any]]) -> list[dict[str, Any]]:
+    """
+    Returns every combination of the given values, e.g. `grid({"glass.int_ior": [1.3, 1.5], "sensor.fov": [30, 45]})`
+    gives four points.
+    """
+    return [dict(zip(axes, values, strict=True)) for values in itertools.product(*axes.values())]
+
+
+@functools.cache
+def _field_adapter(cls: type[BaseModel], name: str) -> TypeAdapter[Any]:
+    return TypeAdapter(cls.model_fields[name].rebuild_annotation())
+
+
+def _override(model: BaseModel, names: Sequence[str], value: Any) -> BaseModel:
+    (name, *rest) = names
+    children = model.model_extra or {}
+    if name not in type(model).model_fields and name not in children:
+        raise ValueError(f"{type(model).__name__} has no field or object {name!r}")
+    if rest:
+        child = getattr(model, name) if name in type(model).model_fields else children[name]
+        if not isinstance(child, BaseModel):
+            raise ValueError(f"Field {name!r} of {type(model).__name__} holds no model to override {'.'.join(rest)!r}")
+        value = _override(child, rest, value)
+    if isinstance(model, Scene):
+        # NOTE: Scenes may hold millions of objects, so only the replaced one is validated.
+        adapter = _field_adapter(Scene, name) if name in Scene.model_fields else _SCENE_OBJECT
+        return model.model_copy(update={name: adapter.validate_python(value)})
+    return type(model).model_validate({**dict(model), name: value})
+
+
+def apply_overrides(scene: Scene, overrides: Point) -> Scene:
+    """
+    Returns a scene with the given fields replaced, validating the new values.
+
+    Args:
+        scene: The scene to change.
+        overrides: New values by field path, i.e. the names of the fields (or IDs of objects) leading to the value,
+            separated by dots, e.g. "sensor.fov", "integrator.max_depth" or "glass.int_ior".
+
+    Raises:
+        ValueError: If a path does not exist.
+        pydantic.ValidationError: If a value is invalid.
+    """
+    for path, value in overrides.items():
+        scene = _override(scene, path.split("."), value)  # type: ignore
+    return scene
+
+
+def _render_chunk(
+    variant: str,
+    points: Sequence[tuple[int, Scene]],
+    spp: None | int,
+    seed: int,
+) -> list[tuple[int, npt.NDArray[np.float32]]]:
+    """
+    Renders the points of one group in order, loading the scene once and updating it in place between points where
+    possible.
+    """
+    mi.set_variant(variant)
+    live: None | LiveScene = None
+    images: list[tuple[int, npt.NDArray[np.float32]]] = []
+    for index, scene in points:
+        if live is None:
+            live = LiveScene(scene)
+        else:
+            _ = live.update(scene)
+        with trace("render", point=index):
+            images.append((index, np.array(render_synced(live.mi_scene, spp=spp or 0, seed=seed), dtype=np.float32)))
+    return images
+
+
+@final
+class SweepResults:
+    """
+    The images of a sweep, memory-mapped read-only, along with the overrides each was rendered with.
+
+    A result set is a directory holding an index (JSON) and every image, concatenated, in a single binary file.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path: Path = Path(path)
+        index = json.loads((self.path / _INDEX).read_text())
+        self.points: list[dict[str, Any]] = [entry["overrides"] for entry in index["points"]]
+        self._layout: list[tuple[int, tuple[int, ...]]] = [
+            (entry["offset"], tuple(entry["shape"])) for entry in index["points"]
+        ]
+        images = self.path / _IMAGES
+        self._data: npt.NDArray[np.float32] = (
+            np.memmap(images, dtype="<f4", mode="r") if images.stat().st_size else np.empty(0, dtype="<f4")
+        )
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def image(self, index: int) -> npt.NDArray[np.float32]:
+        """
+        Returns the image rendered for point `index`.
+        """
+        (offset, shape) = self._layout[index]
+        return self._data[offset : offset + math.prod(shape)].reshape(shape)
+
+    def where(self, overrides: Point) -> list[int]:
+        """
+        Returns the indices of the points with the given overrides (and any others).
+        """
+        wanted = to_jsonable_python(overrides)
+        return [i for i, point in enumerate(self.points) if all(point.get(k) == v for k, v in wanted.items())]
+
+    @classmethod
+    def write(
+        cls: type[Self],
+        path: str | Path,
+        points: Sequence[Point],
+        images: Iterator[tuple[int, npt.NDArray[np.float32]]],
+    ) -> Self:
+        """
+        Writes a result set from images arriving in any order, appending each to the image file as it arrives.
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        layout: dict[int, dict[str, Any]] = {}
+        offset = 0
+        with (path / _IMAGES).open("wb") as f:
+            for index, image in images:
+                _ = f.write(np.ascontiguousarray(image, dtype="<f4").tobytes())
+                layout[index] = {"offset": offset, "shape": list(image.shape)}
+                offset += image.size
+        index = {"points": [{"overrides": to_jsonable_python(point), **layout[i]} for i, point in enumerate(points)]}
+        # Write the index last, and atomically, so an interrupted sweep never looks complete.
+        with atomic_write(path / _INDEX) as temporary:
+            _ = temporary.write_text(json.dumps(index), encoding="utf-8")
+        return cls(path)
+
+
+def sweep(
+    base: Scene | Callable[..., Scene],
+    points: Sequence[Point],
+    path: str | Path,
+    *,
+    spp: None | int = None,
+    seed: int = 0,
+    workers: None | int = None,
+) -> SweepResults:
+    """
+    Renders a scene once for every point of a sweep, and writes the images as a single result set.
+
+    Points are grouped by the overrides which change the structure of the scene (and so require loading it again).
+    Each group is rendered by a single worker, which loads the scene once and applies the remaining overrides in
+    place (see `LiveScene`), so sweeping colors, transforms or other parameters costs one load per group rather than
+    one per point.
+
+    Args:
+        base: The scene to sweep, or a function building it. Overrides named after parameters of the function (e.g.
+            the spacing of a `VirtualDisplay`) are passed to it, and the rest are applied to the scene it returns.
+        points: The overrides of every point, by field path (see `apply_overrides`); `grid` builds these.
+        path: The directory to write the result set to.
+        spp: Samples per pixel, overriding the sensor's sampler.
+        seed: Seed used for every point, so that differences between points are not masked by noise.
+        workers: Number of worker processes, or zero to render in this process. Defaults to the number of CPUs.
+
+    NOTE: Worker processes are started with the "spawn" method, since Mitsuba does not survive forking, so scripts
+    calling this must guard their entry point with `if __name__ == "__main__":`.
+    """
+    parameters = set(inspect.signature(base).parameters) if callable(base) else set()
+    # Factories are called once for every distinct combination of their arguments.
+    built: dict[str, Scene] = {}
+    groups: dict[str, list[tuple[int, Scene]]] = {}
+    structural: dict[str, bool] = {}
+    for index, point in enumerate(points):
+        arguments = {name: value for name, value in point.items() if name in parameters}
+        key = json.dumps(to_jsonable_python(arguments), sort_keys=True)
+        if key not in built:
+            built[key] = base(**arguments) if callable(base) else base
+        scene = built[key]
+        overrides = {name: value for name, value in point.items() if name not in parameters}
+        # Group by the overrides which change the structure of the scene, checking each distinct override once.
+        for name, value in overrides.items():
+            override = json.dumps([name, to_jsonable_python(value)])
+            if override not in structural:
+                structural[override] = diff_scenes(scene, apply_overrides(scene, {name: value})).structural
+            if structural[override]:
+                key += f"\0{override}"
+        groups.setdefault(key, []).append((index, apply_overrides(scene, overrides)))
+
+    variant = mi.variant()
+    assert variant is not None, "A variant must be set before sweeping"
+    worker_count = (os.cpu_count() or 1) if workers is None else workers
+    # Split large groups so that every worker has something to do, at the cost of loading their scene again.
+    chunk_size = max(1, math.ceil(len(points) / max(worker_count, 1)))
+    chunks = [group[i : i + chunk_size] for group in groups.values() for i in range(0, len(group), chunk_size)]
+
+    def images() -> Iterator[tuple[int, npt.NDArray[np.float32]]]:
+        if worker_count == 0:
+            for chunk in chunks:
+                yield from _render_chunk(variant, chunk, spp, seed)
+            return
+        executor: Executor = ProcessPoolExecutor(
+            max_workers=min(worker_count, len(chunks)) or 1, mp_context=multiprocessing.get_context("spawn")
+        )
+        with executor:
+            with default_variant(variant):
+                futures = [executor.submit(_render_chunk, variant, chunk, spp, seed) for chunk in chunks]
+            for future in as_completed(futures):
+                yield from future.result()
+
+    return SweepResults.write(path, points, images())
@@ -0,0 +1,55 @@
+from typing import Literal, final
+
+from pydantic import BaseModel, Field
+
+from mitsuba_wrapper.ref import Ref
+from mitsuba_wrapper.spectrum import Spectrum, Uniform
+from mitsuba_wrapper.utils import Transform4f
+
+type BitmapType = Literal["bitmap"]
+type CheckerboardType = Literal["checkerboard"]
+
+type TextureType = BitmapType | CheckerboardType
+type Texture = Bitmap | Checkerboard
+
+
+@final
+class Bitmap(BaseModel, frozen=True):
+    filename: str = Field(description="Filename of the bitmap to be loaded")
+    filter_type: Literal["bilinear", "nearest"] = Field(
+        default="bilinear",
+        description="Specifies how pixel values are interpolated and filtered when queried over larger UV regions",
+    )
+    wrap_mode: Literal["repeat", "mirror", "clamp"] = Field(
+        default="repeat",
+        description="Controls the behavior of texture evaluations that fall outside of the [0, 1] range",
+    )
+    raw: bool = Field(
+        default=False,
+        description="""
+            Should the transformation to the stored color data (e.g. sRGB to linear, spectral upsampling) be disabled?
+            You will want to enable this when working with bitmaps storing normal maps that use a linear encoding
+        """,
+    )
+    to_uv: None | Transform4f = Field(
+        default=None,
+        description="Specifies an optional 3x3 transformation matrix that will be applied to UV values",
+    )
+    type: BitmapType = "bitmap"
+
+
+@final
+class Checkerboard(BaseModel, frozen=True):
+    color0: Spectrum | Ref = Field(
+        default_factory=lambda: Uniform(value=0.4),
+        description="Color value of the first checker",
+    )
+    color1: Spectrum | Ref = Field(
+        default_factory=lambda: Uniform(value=0.2),
+        description="Color value of the second checker",
+    )
+    to_uv: None | Transform4f = Field(
+        default=None,
+        description="Specifies an optional 3x3 UV transformation matrix",
+    )
+    type: CheckerboardType = "checkerboard"
@@ -0,0 +1,96 @@
+import hashlib
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, final
+
+import mitsuba as mi
+import numpy as np
+import numpy.typing as npt
+
+from mitsuba_wrapper.texture import Bitmap
+from mitsuba_wrapper.utils import atomic_write
+from mitsuba_wrapper.utils import cache_dir as default_cache_dir
+
+
+@final
+class TextureManager:
+    """
+    Decodes every bitmap once and shares the decoded pixels between all materials and processes that use it.
+
+    Decoded textures are stored as linear float32 `.npy` files in a cache directory shared by all workers on a host,
+    keyed by the source file (path, size and modification time) and the `raw` flag. They are memory-mapped read-only
+    when loaded, so their pages live in the OS page cache and are shared between processes instead of being decoded
+    into private memory by each of them. Within a process, each file is mapped once.
+
+    NOTE: Mitsuba copies the pixels into the plugin's own storage (and performs spectral upsampling there), so a loaded
+    scene still holds one copy per bitmap plugin. Run scenes through `intern` first so that each file backs exactly one
+    plugin.
+    """
+
+    def __init__(self, cache_dir: Path | None = None) -> None:
+        self.cache_dir: Path = cache_dir if cache_dir is not None else default_cache_dir("textures")
+        self._arrays: dict[Path, npt.NDArray[np.float32]] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def cache_path(self, filename: str | Path, raw: bool = False) -> Path:
+        """
+        Returns the path of the cache file holding the decoded contents of `filename`.
+        """
+        source = Path(filename).resolve()
+        stat = source.stat()
+        key = f"{source}\0{stat.st_size}\0{stat.st_mtime_ns}\0{raw}"
+        return self.cache_dir / f"{hashlib.sha256(key.encode()).hexdigest()[:32]}.npy"
+
+    def load(self, texture: Bitmap) -> npt.NDArray[np.float32]:
+        """
+        Returns the decoded pixels of a bitmap texture as a read-only, memory-mapped array of shape (height, width,
+        channels), decoding the file and populating the cache on a miss.
+        """
+        path = self.cache_path(texture.filename, texture.raw)
+        with self._lock:
+            if (array := self._arrays.get(path)) is not None:
+                return array
+            if not path.exists():
+                self._store(path, _decode(texture.filename, texture.raw))
+            array = np.load(path, mmap_mode="r")
+            self._arrays[path] = array
+            return array
+
+    @staticmethod
+    def _store(path: Path, array: npt.NDArray[np.float32]) -> None:
+        with atomic_write(path) as temporary, temporary.open("wb") as f:
+            np.save(f, array)
+
+    def bind(self, scene_dict: Mapping[str, Any]) -> dict[str, Any]:
+        """
+        Returns a copy of a scene dictionary (as produced by `Scene.model_dump(mode="python")`) in which every bitmap
+        texture loaded from a file is replaced with one backed by the shared decoded pixels.
+        """
+        bitmaps: dict[Path, mi.Bitmap] = {}
+
+        def visit(node: Mapping[str, Any]) -> dict[str, Any]:
+            result: dict[str, Any] = {
+                key: visit(value) if isinstance(value, Mapping) else value for key, value in node.items()
+            }
+            if result.get("type") == "bitmap" and "filename" in result:
+                texture = Bitmap(filename=result.pop("filename"), raw=result.get("raw", False))
+                path = self.cache_path(texture.filename, texture.raw)
+                if path not in bitmaps:
+                    bitmaps[path] = mi.Bitmap(self.load(texture))
+                result["bitmap"] = bitmaps[path]
+            return result
+
+        return visit(scene_dict)
+
+
+def _decode(filename: str, raw: bool) -> npt.NDArray[np.float32]:
+    """
+    Decodes an image into float32 luminance or RGB pixels, dropping any alpha or additional channels.
+    """
+    bitmap = mi.Bitmap(filename)
+    luminance = bitmap.pixel_format() in {mi.Bitmap.PixelFormat.Y, mi.Bitmap.PixelFormat.YA}
+    pixel_format = mi.Bitmap.PixelFormat.Y if luminance else mi.Bitmap.PixelFormat.RGB
+    # Raw textures keep their stored encoding; everything else is linearized, as the plugin would do when loading.
+    srgb_gamma = bitmap.srgb_gamma() if raw else False
+    return np.array(bitmap.convert(pixel_format, mi.Struct.Type.Float32, srgb_gamma=srgb_gamma), dtype=np.float32)
@@ -0,0 +1,383 @@
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections.abc import Callable, Generator
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Literal, Self, cast, final, override
+
+import drjit as dr
+import mitsuba as mi
+
+from mitsuba_wrapper.scene import Scene
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+type SpanEvent = Literal["start", "end"]
+
+# Returned by `trace` while tracing is disabled, so that disabled spans cost a single context variable lookup.
+_DISABLED: contextlib.nullcontext[None] = contextlib.nullcontext()
+_STATM = Path("/proc/self/statm")
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 0
+# `ru_maxrss` is in kilobytes on Linux, but in bytes on macOS.
+_MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def _resident_memory() -> None | int:
+    """
+    Returns the resident memory of this process in bytes, where the platform makes it available cheaply.
+    """
+    try:
+        return int(_STATM.read_bytes().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return None
+
+
+def _peak_memory() -> None | int:
+    """
+    Returns the most resident memory this process has used so far, in bytes.
+    """
+    return None if resource is None else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_UNIT
+
+
+@final
+@dataclass(slots=True)
+class Span:
+    name: str
+    # Seconds since the tracer was created.
+    start: float
+    thread: int
+    # The index of the enclosing span on the same thread, if any.
+    parent: None | int
+    attributes: dict[str, Any] = field(default_factory=dict)
+    end: None | float = None
+    # Resident memory in bytes when the span started and ended.
+    memory_start: None | int = None
+    memory_end: None | int = None
+    # The peak resident memory in bytes while the span was open. The platform only tracks the peak of the whole
+    # process, so when the span did not raise it, this is the larger of `memory_start` and `memory_end` (a lower bound).
+    memory_peak: None | int = None
+
+    @property
+    def duration(self: Self) -> float:
+        return 0.0 if self.end is None else self.end - self.start
+
+
+type Subscriber = Callable[[SpanEvent, Span], None]
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class LogEvent:
+    # Seconds since the tracer was created.
+    time: float
+    thread: int
+    level: str
+    message: str
+
+
+@final
+class Tracer:
+    """
+    Records the stages of a job as nested spans, with their duration, memory usage and (for JIT variants) the kernels
+    Dr.Jit compiled and launched while they were open.
+
+    A tracer only records spans while it is active (see `tracing`). Stages of the pipeline are instrumented with
+    `trace` and `traced`, which do next to nothing while no tracer is active. Subscribers are called whenever a span
+    starts or ends, e.g. to report progress or export spans to another system.
+
+    NOTE: The active tracer is held by a context variable, which new threads do not inherit: threads doing work on
+    behalf of a job have to be started in a copy of its context (see `contextvars.copy_context`), as `ImageWriter`
+    does. Worker processes are not traced.
+    """
+
+    def __init__(self, capture_log: bool = True, kernel_stats: bool = True) -> None:
+        """
+        Args:
+            capture_log: Whether to record Mitsuba's log messages while the tracer is active, which show what loading
+                and rendering the scene spends its time on (e.g. parsing meshes and building acceleration structures).
+                This lowers Mitsuba's log level to `Info` while the tracer is active.
+            kernel_stats: Whether to record the kernels Dr.Jit compiles and launches (JIT variants only).
+        """
+        self.capture_log: bool = capture_log
+        self.kernel_stats: bool = kernel_stats
+        self.origin: float = time.perf_counter()
+        self.spans: list[Span] = []
+        self.log_events: list[LogEvent] = []
+        self.kernels: list[dict[str, Any]] = []
+        self._subscribers: list[Subscriber] = []
+        self._stacks: dict[int, list[int]] = {}
+        self._lock: threading.Lock = threading.Lock()
+        # Whether this tracer turned on Dr.Jit's kernel history, which it turns off again once it is no longer active.
+        self._history: bool = False
+
+    def subscribe(self, subscriber: Subscriber) -> Callable[[], None]:
+        """
+        Calls `subscriber` whenever a span starts or ends, on the thread of the span. Returns a function which
+        unsubscribes it.
+        """
+        self._subscribers.append(subscriber)
+        return lambda: self._subscribers.remove(subscriber)
+
+    def now(self) -> float:
+        return time.perf_counter() - self.origin
+
+    def log(self, level: str, message: str) -> None:
+        event = LogEvent(self.now(), threading.get_ident(), level, message)
+        with self._lock:
+            self.log_events.append(event)
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes: Any) -> Generator[Span]:
+        """
+        Records a span around the body of the `with` statement, yielding it so that attributes can be added.
+        """
+        thread = threading.get_ident()
+        memory = _resident_memory()
+        peak = _peak_memory()
+        with self._lock:
+            stack = self._stacks.setdefault(thread, [])
+            span = Span(name, self.now(), thread, stack[-1] if stack else None, attributes, memory_start=memory)
+            stack.append(len(self.spans))
+            self.spans.append(span)
+            kernels = self._collect_kernels()
+        self._notify("start", span)
+        try:
+            yield span
+        finally:
+            span.end = self.now()
+            span.memory_end = _resident_memory()
+            new_peak = _peak_memory()
+            readings = [value for value in (span.memory_start, span.memory_end) if value is not None]
+            if new_peak is not None and peak is not None and new_peak > peak:
+                readings.append(new_peak)
+            span.memory_peak = max(readings, default=None)
+            with self._lock:
+                _ = stack.pop()
+                if self.kernel_stats and _is_jit():
+                    span.attributes["kernels"] = _summarize(self.kernels[kernels : self._collect_kernels()])
+            self._notify("end", span)
+
+    def to_json(self: Self) -> dict[str, Any]:
+        return {
+            "spans": [asdict(span) for span in self.spans],
+            "log": [asdict(event) for event in self.log_events],
+            "kernels": self.kernels,
+        }
+
+    def to_chrome_trace(self: Self) -> dict[str, Any]:
+        """
+        Returns the trace in the Chrome trace event format, which `chrome://tracing` and Perfetto can display.
+        """
+        pid = os.getpid()
+        events: list[dict[str, Any]] = []
+        for span in self.spans:
+            arguments = {
+                **span.attributes,
+                **{
+                    key: value
+                    for key, value in (
+                        ("memory_start", span.memory_start),
+                        ("memory_end", span.memory_end),
+                        ("memory_peak", span.memory_peak),
+                    )
+                    if value is not None
+                },
+            }
+            events.append({
+                "name": span.name,
+                "ph": "X",
+                "ts": span.start * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": pid,
+                "tid": span.thread,
+                "args": arguments,
+            })
+            if span.memory_end is not None:
+                events.append({
+                    "name": "memory",
+                    "ph": "C",
+                    "ts": (span.end or span.start) * 1e6,
+                    "pid": pid,
+                    "args": {"resident": span.memory_end},
+                })
+        for event in self.log_events:
+            events.append({
+                "name": event.message,
+                "ph": "i",
+                "s": "t",
+                "ts": event.time * 1e6,
+                "pid": pid,
+                "tid": event.thread,
+                "args": {"level": event.level},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self: Self, path: str | Path, format: Literal["json", "chrome"] = "chrome") -> None:
+        """
+        Writes the trace as JSON, either in its own structure or in the Chrome trace event format.
+        """
+        data = self.to_chrome_trace() if format == "chrome" else self.to_json()
+        _ = Path(path).write_text(json.dumps(data, default=str), encoding="utf-8")
+
+    def _notify(self, event: SpanEvent, span: Span) -> None:
+        for subscriber in self._subscribers:
+            subscriber(event, span)
+
+    def _collect_kernels(self) -> int:
+        """
+        Moves the kernels launched since the last call from Dr.Jit's history into `kernels`, returning their count.
+
+        NOTE: Dr.Jit clears its history when it is read, so it is read in one place, and spans refer to ranges of
+        `kernels` instead.
+        """
+        if self.kernel_stats and _is_jit():
+            # NOTE: The variant may change while the tracer is active (e.g. to the one `select_variant` picks), so the
+            # history is turned on by the first span opened or closed in a JIT variant, not when tracing starts.
+            if not dr.flag(dr.JitFlag.KernelHistory):
+                dr.set_flag(dr.JitFlag.KernelHistory, True)
+                self._history = True
+            now = self.now()
+            # The IR of every kernel is dropped; it is large and seldom of interest.
+            self.kernels.extend(
+                {**{key: value for key, value in kernel.items() if key != "ir"}, "time": now}
+                for kernel in dr.kernel_history()
+            )
+        return len(self.kernels)
+
+    def release_history(self) -> None:
+        """
+        Turns Dr.Jit's kernel history back off, if the tracer turned it on.
+        """
+        if self._history:
+            dr.set_flag(dr.JitFlag.KernelHistory, False)
+            self._history = False
+
+
+class _LogCapture(mi.Appender):
+    def __init__(self, tracer: Tracer) -> None:
+        super().__init__()
+        self.tracer: Tracer = tracer
+
+    @override
+    def append(self, level: mi.LogLevel, text: str) -> None:
+        self.tracer.log(level.name, text)
+
+    @override
+    def log_progress(self, progress: float, name: str, formatted: str, eta: str, ptr: Any = None) -> None:
+        pass
+
+
+_ACTIVE: contextvars.ContextVar[None | Tracer] = contextvars.ContextVar("tracer", default=None)
+
+
+def _is_jit() -> bool:
+    variant = mi.variant()
+    return variant is not None and variant.startswith(("llvm_", "cuda_"))
+
+
+def _summarize(kernels: list[dict[str, Any]]) -> dict[str, Any]:
+    launched = [kernel for kernel in kernels if kernel.get("type") == dr.KernelType.JIT]
+    return {
+        "launched": len(launched),
+        "cache_hits": sum(1 for kernel in launched if kernel.get("cache_hit")),
+        "codegen_ms": sum(kernel.get("codegen_time", 0.0) for kernel in launched),
+        "backend_ms": sum(kernel.get("backend_time", 0.0) for kernel in launched),
+        "execution_ms": sum(kernel.get("execution_time", 0.0) for kernel in launched),
+    }
+
+
+@contextlib.contextmanager
+def tracing(tracer: Tracer) -> Generator[Tracer]:
+    """
+    Makes `tracer` the active tracer for the body of the `with` statement.
+    """
+    token = _ACTIVE.set(tracer)
+    logger = mi.Thread.thread().logger() if tracer.capture_log else None
+    capture = _LogCapture(tracer)
+    level = None if logger is None else logger.log_level()
+    try:
+        if logger is not None:
+            if level is not None and int(level) > int(mi.LogLevel.Info):
+                logger.set_log_level(mi.LogLevel.Info)
+            logger.add_appender(capture)
+        with tracer.span("job"):
+            yield tracer
+    finally:
+        tracer.release_history()
+        if logger is not None:
+            logger.remove_appender(capture)
+            if level is not None:
+                logger.set_log_level(level)
+        _ACTIVE.reset(token)
+
+
+def current_tracer() -> None | Tracer:
+    return _ACTIVE.get()
+
+
+def trace(name: str, **attributes: Any) -> contextlib.AbstractContextManager[None | Span]:
+    """
+    Records a span around the body of a `with` statement if a tracer is active, and does nothing otherwise.
+    """
+    tracer = _ACTIVE.get()
+    return _DISABLED if tracer is None else tracer.span(name, **attributes)
+
+
+def load_scene(scene: Scene) -> mi.Scene:
+    """
+    Loads a scene with Mitsuba, tracing the dump of its model (`dump`) and its loading (`load`) separately.
+    """
+    with trace("dump"):
+        scene_dict = scene.model_dump(mode="python", exclude_none=True)
+    with trace("load"):
+        mi_scene = mi.load_dict(scene_dict)
+    assert isinstance(mi_scene, mi.Scene)
+    return mi_scene
+
+
+def render_synced(
+    mi_scene: mi.Scene,
+    integrator: None | mi.Integrator = None,
+    *,
+    sensor: int = 0,
+    spp: int = 0,
+    seed: int = 0,
+) -> mi.TensorXf:
+    """
+    Renders a loaded scene (see `mi.render`) and waits for the render to finish, so that it can be timed: JIT variants
+    only record the rendering until its result is evaluated.
+    """
+    integrator = mi_scene.integrator() if integrator is None else integrator
+    # NOTE: Since Mitsuba 3.6, seeds are `mi.UInt32`s, so that JIT variants can take opaque ones which change
+    # without compiling new kernels, but ints are still converted to them; earlier versions only take ints.
+    image = mi.render(mi_scene, sensor=sensor, integrator=integrator, spp=spp, seed=cast(mi.UInt32, seed))
+    _ = dr.eval(image)
+    _ = dr.sync_thread()
+    return image
+
+
+def traced[**P, R](name: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """
+    Decorates a function so that every call to it is recorded as a span (see `trace`).
+    """
+
+    def decorator(fn: Callable[P, R]) -> Callable[P, R]:
+        @functools.wraps(fn)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if (tracer := _ACTIVE.get()) is None:
+                return fn(*args, **kwargs)
+            with tracer.span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
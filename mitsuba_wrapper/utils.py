@@ -1,4 +1,8 @@
-from collections.abc import Callable, Iterable, Sequence
+import contextlib
+import os
+import tempfile
+from collections.abc import Callable, Generator, Iterable, Sequence
+from pathlib import Path
 from typing import Self, cast, final
 
 import mitsuba as mi
@@ -13,6 +17,55 @@ _ScalarVector4fTy: type = getattr(mi, "ScalarVector4f")
 _ScalarTransform4f: Callable[[list[mi.Vector4f]], mi.Transform4f] = getattr(mi, "ScalarTransform4f")
 
 
+def cache_dir(name: str) -> Path:
+    """
+    Returns the per-user cache directory for `name`, honoring `XDG_CACHE_HOME`. The directory is not created.
+    """
+    return Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "mitsuba_wrapper" / name
+
+
+@contextlib.contextmanager
+def atomic_write(path: Path) -> Generator[Path]:
+    """
+    Yields a temporary path in the directory of `path` (which is created if needed) to write a file to, and renames it
+    to `path` once the body of the `with` statement completes, so that concurrent readers never observe a partial file.
+    The temporary file is removed if the body raises.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    (fd, name) = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    os.close(fd)
+    temporary = Path(name)
+    try:
+        yield temporary
+        _ = temporary.replace(path)
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
+
+
+def thread_environment() -> Callable[[], contextlib.AbstractContextManager[None]]:
+    """
+    Captures the variant of the calling thread and the state Mitsuba keeps per thread (its logger and file resolver),
+    and returns a function making another thread use them for the duration of a `with` statement.
+
+    NOTE: Mitsuba 3.6 made that state global and removed `ThreadEnvironment`, so only the variant is set with it.
+    """
+    variant = mi.variant()
+    environment = getattr(mi, "ThreadEnvironment", lambda: None)()
+
+    @contextlib.contextmanager
+    def inherit() -> Generator[None]:
+        if variant is not None:
+            mi.set_variant(variant)
+        if environment is None:
+            yield
+        else:
+            with getattr(mi, "ScopedSetThreadEnvironment")(environment):
+                yield
+
+    return inherit
+
+
 # NOTE: If we add a return type to the model serializer, Pydantic will error because it cannot generate a schema for
 # the mitsuba types.
 
@@ -33,7 +86,7 @@ def _serializer_helper[A, B](
 
 
 @final
-class Color3f(RootModel[tuple[float, float, float]]):
+class Color3f(RootModel[tuple[float, float, float]], frozen=True):
     root: tuple[float, float, float] = Field(description="A color in 3D space")
 
     @model_serializer
@@ -42,7 +95,7 @@ class Color3f(RootModel[tuple[float, float, float]]):
 
 
 @final
-class Point3f(RootModel[tuple[float, float, float]]):
+class Point3f(RootModel[tuple[float, float, float]], frozen=True):
     root: tuple[float, float, float] = Field(description="A point in 3D space")
 
     @model_serializer
@@ -51,7 +104,7 @@ class Point3f(RootModel[tuple[float, float, float]]):
 
 
 @final
-class Vector3f(RootModel[tuple[float, float, float]]):
+class Vector3f(RootModel[tuple[float, float, float]], frozen=True):
     root: tuple[float, float, float] = Field(description="A vector in 3D space")
 
     @model_serializer
@@ -60,7 +113,7 @@ class Vector3f(RootModel[tuple[float, float, float]]):
 
 
 @final
-class Vector4f(RootModel[tuple[float, float, float, float]]):
+class Vector4f(RootModel[tuple[float, float, float, float]], frozen=True):
     root: tuple[float, float, float, float] = Field(description="A vector in 4D space")
 
     @model_serializer
@@ -69,7 +122,7 @@ class Vector4f(RootModel[tuple[float, float, float, float]]):
 
 
 @final
-class Transform4f(RootModel[tuple[Vector4f, Vector4f, Vector4f, Vector4f]]):
+class Transform4f(RootModel[tuple[Vector4f, Vector4f, Vector4f, Vector4f]], frozen=True):
     root: tuple[Vector4f, Vector4f, Vector4f, Vector4f] = Field(description="A matrix in 4D space")
 
     @model_serializer
@@ -130,7 +183,8 @@ class Transform4f(RootModel[tuple[Vector4f, Vector4f, Vector4f, Vector4f]]):
             translate = translate.root
 
         return cls.to_transform4f(
-            mi.ScalarTransform4f.translate(translate)  # type: ignore
+            mi.ScalarTransform4f
+            .translate(translate)  # type: ignore
             .rotate(rotate_axis, rotate_degrees)
             .scale(scale)
             .matrix
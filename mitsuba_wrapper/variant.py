@@ -0,0 +1,457 @@
+import contextlib
+import multiprocessing
+import os
+import platform
+import time
+import warnings
+from collections.abc import Generator, Iterable, Mapping
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Literal, Self, TypedDict, final
+
+import mitsuba as mi
+from pydantic import TypeAdapter
+
+from mitsuba_wrapper.bsdf import Dielectric, Diffuse, Polarizer
+from mitsuba_wrapper.emitter import Area
+from mitsuba_wrapper.estimate import estimate, iter_plugins
+from mitsuba_wrapper.film import HDRFilm, SpecFilm
+from mitsuba_wrapper.integrator import Path as PathTracer
+from mitsuba_wrapper.integrator import Stokes
+from mitsuba_wrapper.multiview import scene_sensors
+from mitsuba_wrapper.sampler import Independent
+from mitsuba_wrapper.scene import Scene
+from mitsuba_wrapper.sensor import Perspective
+from mitsuba_wrapper.shape import SHAPE_TYPES, Rectangle, Sphere, iter_primitives
+from mitsuba_wrapper.spectrum import D65, RGB, Irregular, Regular
+from mitsuba_wrapper.tracing import load_scene, render_synced
+from mitsuba_wrapper.utils import Color3f, Point3f, Transform4f, atomic_write, cache_dir
+
+type Backend = Literal["scalar", "llvm", "cuda"]
+type ColorMode = Literal["mono", "rgb", "spectral"]
+
+_CALIBRATION_VERSION = 1
+# Samples per pixel of the calibration renders: the first render of each is timed cold (loading the scene and, in JIT
+# variants, compiling kernels), and the rest warm, to tell the fixed cost of a render from its cost per sample.
+_CALIBRATION_SPP = (4, 32)
+_CALIBRATION_RESOLUTION = 64
+_COLOR_NAMES: Mapping[ColorMode, str] = {"mono": "luminance", "rgb": "RGB colors", "spectral": "spectra"}
+
+
+def requires_polarization(scene: Scene) -> bool:
+    """
+    Returns whether a scene has to be rendered with a polarized variant, i.e. whether it uses the Stokes integrator or
+    contains a polarizer.
+    """
+    if isinstance(scene.integrator, Stokes):
+        return True
+    extras = scene.model_extra or {}
+    shapes = {id: value for id, value in extras.items() if isinstance(value, SHAPE_TYPES)}
+    return any(isinstance(value, Polarizer) for value in extras.values()) or any(
+        isinstance(shape.bsdf, Polarizer) for shape in iter_primitives(shapes)
+    )
+
+
+def polarized_variant(variant: str) -> str:
+    """
+    Returns the polarized counterpart of a variant, e.g. `scalar_spectral_polarized` for `scalar_spectral`.
+
+    NOTE: Mitsuba only supports polarization in monochromatic and spectral variants, so RGB variants map to their
+    spectral counterpart, e.g. `llvm_ad_rgb` to `llvm_ad_spectral_polarized`.
+
+    Raises:
+        ValueError: If the polarized variant was not compiled into this build of Mitsuba.
+    """
+    if variant.endswith("_polarized"):
+        return variant
+    polarized = f"{variant.replace('_rgb', '_spectral')}_polarized"
+    if polarized not in mi.variants():
+        missing = f"Rendering polarization requires the {polarized} variant, which is not available"
+        raise ValueError(f"{missing}; available variants are {', '.join(mi.variants())}")
+    return polarized
+
+
+@contextlib.contextmanager
+def default_variant(variant: str) -> Generator[None]:
+    """
+    Makes `variant` the variant processes started in the body of the `with` statement set when they import Mitsuba.
+
+    NOTE: Modules of this package can only be imported once a variant is set, which worker processes have to do
+    before they can receive any work, so they are told which one through the environment they inherit.
+    """
+    previous = os.environ.get("MI_DEFAULT_VARIANT")
+    os.environ["MI_DEFAULT_VARIANT"] = variant
+    try:
+        yield
+    finally:
+        if previous is None:
+            del os.environ["MI_DEFAULT_VARIANT"]
+        else:
+            os.environ["MI_DEFAULT_VARIANT"] = previous
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class VariantTraits:
+    backend: Backend
+    color: ColorMode
+    polarized: bool
+    double: bool
+
+    @classmethod
+    def of(cls: type[Self], variant: str) -> Self:
+        """
+        Returns the traits of a variant from its name, e.g. `llvm_ad_spectral_polarized`.
+        """
+        parts = variant.split("_")
+        color = next((part for part in parts if part in {"mono", "rgb", "spectral"}), None)
+        if parts[0] not in {"scalar", "llvm", "cuda"} or color is None:
+            raise ValueError(f"Unknown variant: {variant}")
+        return cls(parts[0], color, "polarized" in parts, "double" in parts)  # type: ignore
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class SceneFeatures:
+    # Whether the scene has to be rendered with a polarized variant (see `requires_polarization`).
+    polarized: bool
+    # Whether a film records spectral bands, which only spectral variants can.
+    spectral_film: bool
+    # Whether the scene holds spectra which RGB variants can only approximate, e.g. measured spectra.
+    spectral_data: bool
+    # Whether every film only records luminance, so that monochromatic variants can render the scene.
+    luminance: bool
+    # Number of pixels rendered, over every sensor.
+    pixels: int
+    # Largest number of samples per pixel of a sensor.
+    spp: int
+    emitters: int
+    # Rough relative cost of rendering the scene (see `Estimate.cost`).
+    cost: float
+
+
+def scene_features(scene: Scene) -> SceneFeatures:
+    """
+    Returns the features of a scene which decide the variants able to render it, and how fast they are.
+    """
+    result = estimate(scene)
+    sensors = scene_sensors(scene).values()
+    films = [sensor.film for sensor in sensors]
+    return SceneFeatures(
+        polarized=requires_polarization(scene),
+        spectral_film=any(isinstance(film, SpecFilm) for film in films),
+        spectral_data=any(isinstance(plugin, (D65, Regular, Irregular)) for plugin in iter_plugins(scene)),
+        luminance=all(
+            isinstance(film, HDRFilm) and film.pixel_format in {"luminance", "luminance_alpha"} for film in films
+        ),
+        pixels=sum(sensor.film.crop_window[2] * sensor.film.crop_window[3] for sensor in sensors),
+        spp=max(sensor.sampler.sample_count for sensor in sensors),
+        emitters=result.plugins.get("emitter", 0),
+        cost=result.cost,
+    )
+
+
+def can_represent(variant: str, features: SceneFeatures) -> bool:
+    """
+    Returns whether a variant can render a scene with the given features.
+
+    NOTE: Polarized variants are only considered for scenes which require polarization: they render other scenes the
+    same way as their unpolarized counterparts, only slower.
+    """
+    traits = VariantTraits.of(variant)
+    return (
+        traits.polarized == features.polarized
+        and (traits.color == "spectral" or not features.spectral_film)
+        and (traits.color != "mono" or features.luminance)
+    )
+
+
+def output_changes(variant: str, features: SceneFeatures, reference: None | str = None) -> list[str]:
+    """
+    Returns how an image of a scene rendered with `variant` differs from one rendered with `reference`, or from what
+    the scene describes if no reference is given.
+
+    NOTE: Images rendered with different backends (scalar, LLVM or CUDA) differ in their noise, since their samples
+    do, but not in the values they converge to, which is not counted as a change.
+    """
+    traits = VariantTraits.of(variant)
+    changes: list[str] = []
+    if traits.color == "rgb" and features.spectral_data:
+        changes.append(f"{variant} approximates the spectra of the scene in RGB")
+    if reference is not None:
+        reference_traits = VariantTraits.of(reference)
+        if traits.color != reference_traits.color:
+            colors = (_COLOR_NAMES[traits.color], _COLOR_NAMES[reference_traits.color])
+            changes.append(
+                f"{variant} renders {colors[0]} rather than {colors[1]} like {reference}, which shifts colors"
+            )
+        if traits.double != reference_traits.double:
+            precisions = ("double" if traits.double else "single", "double" if reference_traits.double else "single")
+            changes.append(
+                f"{variant} renders in {precisions[0]} precision rather than {precisions[1]} like {reference}"
+            )
+    return changes
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class Calibration:
+    # Seconds a render takes besides rendering samples: loading the scene and, in JIT variants, compiling kernels.
+    overhead: float
+    # Cost rendered per second (see `Estimate.cost`).
+    throughput: float
+
+    def predict(self: Self, cost: float) -> float:
+        """
+        Returns the predicted number of seconds to render a scene of the given cost.
+        """
+        return self.overhead + cost / self.throughput
+
+
+class _CalibrationRecord(TypedDict):
+    overhead: float
+    throughput: float
+
+
+class _CalibrationFile(TypedDict):
+    version: int
+    # Calibrations by machine (see `_machine`), then by variant.
+    machines: dict[str, dict[str, None | _CalibrationRecord]]
+
+
+_CALIBRATION_FILE = TypeAdapter(_CalibrationFile)
+
+
+def calibration_path() -> Path:
+    """
+    Returns the file calibrations are cached in: `mitsuba_wrapper/calibration.json` in the user's cache directory.
+    """
+    return cache_dir("calibration.json")
+
+
+def _machine() -> str:
+    # NOTE: Cache directories may be shared between machines (e.g. home directories on network storage), so
+    # calibrations are kept per machine, and per version of Mitsuba.
+    return f"{platform.node()}/{platform.machine()}/mitsuba-{mi.__version__}"
+
+
+def _calibration_scene() -> Scene:
+    """
+    Returns a small scene with diffuse and glass spheres lit by an area light, needing no files.
+    """
+    white = Diffuse(reflectance=RGB(value=Color3f(root=(0.8, 0.8, 0.8))))
+    return Scene.model_validate({
+        "integrator": PathTracer(max_depth=6),
+        "sensor": Perspective(
+            fov=45,
+            to_world=Transform4f.look_at(origin=(0, 1, 4), target=(0, 0, 0), up=(0, 1, 0)),
+            sampler=Independent(sample_count=_CALIBRATION_SPP[0]),
+            film=HDRFilm(width=_CALIBRATION_RESOLUTION, height=_CALIBRATION_RESOLUTION),
+        ),
+        "floor": Rectangle(
+            to_world=Transform4f.scale_rotate_translate(
+                scale=(4, 4, 4), rotate_axis=(1, 0, 0), rotate_degrees=-90, translate=(0, -1, 0)
+            ),
+            bsdf=white,
+        ),
+        "light": Rectangle(
+            to_world=Transform4f.scale_rotate_translate(rotate_axis=(1, 0, 0), rotate_degrees=90, translate=(0, 3, 0)),
+            emitter=Area(radiance=RGB(value=Color3f(root=(10, 10, 10)))),
+        ),
+        "diffuse": Sphere(center=Point3f(root=(-1, 0, 0)), bsdf=white),
+        "glass": Sphere(center=Point3f(root=(1, 0, 0)), bsdf=Dielectric()),
+    })
+
+
+def _time_calibration() -> list[float]:
+    """
+    Renders the calibration scene with the current variant, cold and then warm at every sample count of
+    `_CALIBRATION_SPP`, returning the seconds each render took (the first including loading the scene).
+    """
+    start = time.perf_counter()
+    mi_scene = load_scene(_calibration_scene())
+    seconds: list[float] = []
+    for spp in (_CALIBRATION_SPP[0], *_CALIBRATION_SPP):
+        _ = render_synced(mi_scene, spp=spp)
+        end = time.perf_counter()
+        seconds.append(end - start)
+        start = end
+    return seconds
+
+
+def _fit(seconds: list[float]) -> Calibration:
+    (cold, warm_low, warm_high) = seconds
+    base = estimate(_calibration_scene()).cost / _CALIBRATION_SPP[0]
+    (low, high) = (base * spp for spp in _CALIBRATION_SPP)
+    # The warm renders only differ in their number of samples, which gives the throughput; the cold render also pays
+    # for loading the scene and compiling kernels.
+    throughput = (high - low) / (warm_high - warm_low) if warm_high > warm_low else high / warm_high
+    return Calibration(overhead=max(0.0, cold - low / throughput), throughput=throughput)
+
+
+def _read_calibrations(path: Path) -> _CalibrationFile:
+    """
+    Returns the contents of a calibration cache, or an empty one if it is missing, invalid or of another version.
+    """
+    try:
+        data = _CALIBRATION_FILE.validate_json(path.read_bytes())
+    except (OSError, ValueError):
+        data = None
+    if data is None or data["version"] != _CALIBRATION_VERSION:
+        return {"version": _CALIBRATION_VERSION, "machines": {}}
+    return data
+
+
+def load_calibration(path: None | str | Path = None) -> dict[str, None | Calibration]:
+    """
+    Returns the calibrations of this machine cached in `path` (see `calibration_path`) by variant. Variants which
+    could not render the calibration scene map to `None`.
+    """
+    path = Path(path) if path is not None else calibration_path()
+    variants = _read_calibrations(path)["machines"].get(_machine(), {})
+    return {variant: None if value is None else Calibration(**value) for variant, value in variants.items()}
+
+
+def calibrate(
+    variants: None | Iterable[str] = None,
+    path: None | str | Path = None,
+    *,
+    force: bool = False,
+) -> dict[str, None | Calibration]:
+    """
+    Returns the calibrations of the given variants on this machine, timing short renders of a small scene with those
+    which are not cached in `path` yet (see `calibration_path`), and caching the results.
+
+    Every variant is timed in a process of its own, so that a variant which crashes (e.g. for lack of a GPU) is only
+    recorded as unable to render, as `None`.
+
+    Args:
+        variants: The variants to calibrate. Defaults to every variant of this build of Mitsuba.
+        path: The file calibrations are cached in.
+        force: Whether to time variants again even if their calibration is cached.
+
+    NOTE: Calibrating starts processes with the "spawn" method, so scripts calling this must guard their entry point
+    with `if __name__ == "__main__":`.
+    """
+    path = Path(path) if path is not None else calibration_path()
+    variants = list(mi.variants() if variants is None else variants)
+    calibrations = load_calibration(path)
+    missing = [variant for variant in variants if force or variant not in calibrations]
+    for variant in missing:
+        with (
+            ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor,
+            default_variant(variant),
+        ):
+            future = executor.submit(_time_calibration)
+        try:
+            calibrations[variant] = _fit(future.result())
+        except (BrokenProcessPool, RuntimeError):
+            calibrations[variant] = None
+    if missing:
+        data = _read_calibrations(path)
+        data["machines"][_machine()] = {
+            variant: None
+            if calibration is None
+            else _CalibrationRecord(overhead=calibration.overhead, throughput=calibration.throughput)
+            for variant, calibration in calibrations.items()
+        }
+        # Written atomically, so that processes calibrating at the same time never read a partial file.
+        with atomic_write(path) as temporary:
+            _ = temporary.write_bytes(_CALIBRATION_FILE.dump_json(data, indent=2))
+    return {variant: calibrations[variant] for variant in variants}
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class VariantPlan:
+    variant: str
+    features: SceneFeatures
+    # Predicted seconds to render the scene with every calibrated variant able to render it.
+    predictions: dict[str, float]
+    # How images rendered with the variant differ from those rendered with the reference variant (see
+    # `output_changes`).
+    changes: list[str]
+
+
+def plan_variant(
+    scene: Scene,
+    reference: None | str = None,
+    *,
+    variants: None | Iterable[str] = None,
+    path: None | str | Path = None,
+) -> VariantPlan:
+    """
+    Chooses the variant predicted to render a scene the fastest among those able to render it, from the features of
+    the scene and the calibrations of this machine (see `calibrate`), calibrating variants as needed.
+
+    Args:
+        scene: The scene.
+        reference: The variant the scene was made for, which changes of the output are reported against. Defaults to
+            the current variant.
+        variants: The variants to choose from. Defaults to every variant of this build of Mitsuba.
+        path: The file calibrations are cached in (see `calibration_path`).
+
+    Raises:
+        ValueError: If none of the variants can render the scene.
+    """
+    features = scene_features(scene)
+    available = list(mi.variants() if variants is None else variants)
+    candidates = [variant for variant in available if can_represent(variant, features)]
+    calibrations = calibrate(candidates, path)
+    predictions = {
+        variant: calibration.predict(features.cost)
+        for variant, calibration in calibrations.items()
+        if calibration is not None
+    }
+    if not predictions:
+        representable = ", ".join(candidates) or "none"
+        raise ValueError(
+            f"None of the variants {', '.join(available)} can render the scene; {representable} could represent it"
+        )
+    variant = min(predictions, key=predictions.__getitem__)
+    return VariantPlan(variant, features, predictions, output_changes(variant, features, reference or mi.variant()))
+
+
+def _shares_scalar_types() -> bool:
+    """
+    Returns whether the models dump to the scalar types of the current variant, which Mitsuba requires to load them.
+    """
+    probes = (
+        (Color3f(root=(0, 0, 0)), mi.ScalarColor3f),
+        (Point3f(root=(0, 0, 0)), mi.ScalarPoint3f),
+        (Transform4f.scale_rotate_translate(), mi.ScalarTransform4f),
+    )
+    return all(type(model.model_dump(mode="python")) is scalar_type for (model, scalar_type) in probes)
+
+
+def select_variant(
+    scene: Scene,
+    reference: None | str = None,
+    *,
+    variants: None | Iterable[str] = None,
+    path: None | str | Path = None,
+) -> str:
+    """
+    Switches to the variant chosen by `plan_variant` for a scene, warning about every way it changes the output, and
+    returns it.
+
+    NOTE: The models bind Mitsuba's scalar types when they are imported, so scenes built before switching remain
+    valid only if the new variant shares them, which Mitsuba does for every variant, including JIT ones. This is
+    checked after switching.
+
+    Raises:
+        ValueError: If none of the variants can render the scene.
+        RuntimeError: If the chosen variant does not share the scalar types of the previous one.
+    """
+    plan = plan_variant(scene, reference, variants=variants, path=path)
+    for change in plan.changes:
+        warnings.warn(change, stacklevel=2)
+    previous = mi.variant()
+    mi.set_variant(plan.variant)
+    if not _shares_scalar_types():
+        if previous is not None:
+            mi.set_variant(previous)
+        raise RuntimeError(f"{plan.variant} does not share the scalar types of {previous}, which the models hold")
+    return plan.variant
@@ -0,0 +1,42 @@
+from typing import Literal, final
+
+from pydantic import Field
+
+from mitsuba_wrapper.spectrum import Spectrum
+from mitsuba_wrapper.utils import Placeable
+
+type ConstVolumeType = Literal["constvolume"]
+type GridVolumeType = Literal["gridvolume"]
+
+type VolumeType = ConstVolumeType | GridVolumeType
+type Volume = ConstVolume | GridVolume
+
+
+@final
+class ConstVolume(Placeable, frozen=True):
+    value: float | Spectrum = Field(default=1.0, description="Specifies the value of the constant volume")
+    type: ConstVolumeType = "constvolume"
+
+
+@final
+class GridVolume(Placeable, frozen=True):
+    filename: str = Field(description="Filename of the volume to be loaded, in Mitsuba's .vol format")
+    filter_type: Literal["trilinear", "nearest"] = Field(
+        default="trilinear",
+        description="Specifies how voxel values are interpolated",
+    )
+    use_grid_bbox: bool = Field(
+        default=False,
+        description="If set to true, the bounding box information contained in the .vol file will be used",
+    )
+    wrap_mode: Literal["repeat", "mirror", "clamp"] = Field(
+        default="clamp",
+        description="Controls the behavior of volume evaluations that fall outside of the [0, 1] range",
+    )
+    raw: bool = Field(
+        default=False,
+        description="""
+            Should the transformation to the stored color data (e.g. sRGB to linear, spectral upsampling) be disabled?
+        """,
+    )
+    type: GridVolumeType = "gridvolume"
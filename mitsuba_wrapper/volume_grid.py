@@ -0,0 +1,152 @@
+import hashlib
+import struct
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Literal, Self, final
+
+import numpy as np
+import numpy.typing as npt
+
+from mitsuba_wrapper.utils import atomic_write
+from mitsuba_wrapper.utils import cache_dir as default_cache_dir
+
+type Quality = Literal["preview", "final"]
+
+# Layout of the header of a Mitsuba .vol file: the bytes "VOL", the format version, the encoding (1 for float32), the
+# resolution along x, y and z, the number of channels, and the bounding box as (xmin, ymin, zmin, xmax, ymax, zmax).
+_HEADER = struct.Struct("<3sBiiiii6f")
+_VERSION = 3
+_FLOAT32_ENCODING = 1
+
+
+@final
+class VolFile:
+    """
+    A grid volume stored in Mitsuba's .vol format, memory-mapped read-only.
+
+    Only the header is read when the file is opened; voxels are paged in by the OS as they are accessed.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path: Path = Path(path)
+        with self.path.open("rb") as f:
+            header = f.read(_HEADER.size)
+        (magic, version, encoding, x, y, z, channels, *bbox) = _HEADER.unpack(header)
+        if magic != b"VOL" or version != _VERSION:
+            raise ValueError(f"{self.path} is not a version {_VERSION} .vol file")
+        if encoding != _FLOAT32_ENCODING:
+            raise ValueError(f"{self.path} uses encoding {encoding}; only float32 grids are supported")
+        self.bbox: tuple[float, float, float, float, float, float] = tuple(bbox)
+        # Voxels are stored with x varying fastest, so the natural array layout is (z, y, x, channels).
+        self.data: npt.NDArray[np.float32] = np.memmap(
+            self.path, dtype="<f4", mode="r", offset=_HEADER.size, shape=(z, y, x, channels)
+        )
+
+    @property
+    def resolution(self) -> tuple[int, int, int]:
+        """
+        The resolution of the grid along x, y and z.
+        """
+        (z, y, x, _) = self.data.shape
+        return (x, y, z)
+
+    def downsample(self, factor: int) -> npt.NDArray[np.float32]:
+        """
+        Returns the grid box-filtered down by `factor` along every axis. Voxels at the far edges average over however
+        many voxels remain when the resolution is not a multiple of `factor`.
+
+        The grid is streamed through `factor` slices at a time, so the full-resolution grid is never held in memory.
+        """
+        if factor < 1:
+            raise ValueError(f"Downsampling factor must be positive, got {factor}")
+        (z, y, x, channels) = self.data.shape
+        y_starts = np.arange(0, y, factor)
+        x_starts = np.arange(0, x, factor)
+        y_counts = np.diff(np.append(y_starts, y))
+        x_counts = np.diff(np.append(x_starts, x))
+        slices: list[npt.NDArray[np.float32]] = []
+        for z_start in range(0, z, factor):
+            slab = np.asarray(self.data[z_start : z_start + factor], dtype=np.float64)
+            summed = np.add.reduceat(np.add.reduceat(slab.sum(axis=0), y_starts, axis=0), x_starts, axis=1)
+            counts = slab.shape[0] * y_counts[:, None, None] * x_counts[None, :, None]
+            slices.append((summed / counts).astype(np.float32))
+        return np.stack(slices).reshape(-1, len(y_starts), len(x_starts), channels)
+
+    @classmethod
+    def write(
+        cls: type[Self],
+        path: str | Path,
+        data: npt.NDArray[np.float32],
+        bbox: tuple[float, float, float, float, float, float],
+    ) -> Self:
+        """
+        Writes a grid of shape (z, y, x, channels) to `path` in the .vol format and returns it memory-mapped.
+        """
+        (z, y, x, channels) = data.shape
+        with Path(path).open("wb") as f:
+            _ = f.write(_HEADER.pack(b"VOL", _VERSION, _FLOAT32_ENCODING, x, y, z, channels, *bbox))
+            _ = f.write(np.ascontiguousarray(data, dtype="<f4").tobytes())
+        return cls(path)
+
+
+@final
+class GridLoader:
+    """
+    Provides grid volumes at the resolution a render needs.
+
+    Final-quality renders use the original file, which Mitsuba loads at full resolution. Preview renders use
+    level-of-detail versions, where level `n` is box-filtered down by a factor of 2**n along every axis. They are
+    computed once from the memory-mapped original, stored as .vol files in a cache directory shared by all workers on a
+    host (keyed by path, size and modification time), and reused afterwards without touching the original again.
+    """
+
+    def __init__(self, cache_dir: Path | None = None) -> None:
+        self.cache_dir: Path = cache_dir if cache_dir is not None else default_cache_dir("volumes")
+        self._lock: threading.Lock = threading.Lock()
+
+    def lod_path(self, filename: str | Path, level: int) -> Path:
+        """
+        Returns the path of the .vol file holding level `level` of `filename`. Level zero is the original file.
+        """
+        source = Path(filename).resolve()
+        if level == 0:
+            return source
+        stat = source.stat()
+        key = f"{source}\0{stat.st_size}\0{stat.st_mtime_ns}"
+        return self.cache_dir / f"{hashlib.sha256(key.encode()).hexdigest()[:32]}-lod{level}.vol"
+
+    def load(self, filename: str | Path, level: int = 0) -> VolFile:
+        """
+        Returns level `level` of a grid, memory-mapped, computing and caching it on a miss.
+        """
+        path = self.lod_path(filename, level)
+        with self._lock:
+            if not path.exists():
+                source = VolFile(filename)
+                with atomic_write(path) as temporary:
+                    _ = VolFile.write(temporary, source.downsample(2**level), source.bbox)
+            return VolFile(path)
+
+    def bind(self, scene_dict: Mapping[str, Any], quality: Quality = "final", preview_level: int = 2) -> dict[str, Any]:
+        """
+        Returns a copy of a scene dictionary (as produced by `Scene.model_dump(mode="python")`) in which every grid
+        volume refers to the level of detail suitable for `quality`.
+
+        Args:
+            scene_dict: The scene dictionary to rewrite.
+            quality: Final-quality renders keep the original grids; previews use downsampled ones.
+            preview_level: The level of detail used for previews.
+        """
+        if quality == "final":
+            return dict(scene_dict)
+
+        def visit(node: Mapping[str, Any]) -> dict[str, Any]:
+            result: dict[str, Any] = {
+                key: visit(value) if isinstance(value, Mapping) else value for key, value in node.items()
+            }
+            if result.get("type") == "gridvolume" and "filename" in result:
+                result["filename"] = str(self.load(result["filename"], preview_level).path)
+            return result
+
+        return visit(scene_dict)
@@ -0,0 +1,4 @@
+import mitsuba as mi
+
+# Modules of this package can only be imported once a variant is set (see `variant.default_variant`).
+mi.set_variant("scalar_rgb")
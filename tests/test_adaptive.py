@@ -0,0 +1,78 @@
+# pyright: reportPrivateUsage=false
+
+import numpy as np
+import pytest
+
+from mitsuba_wrapper.adaptive import _Accumulator, _extra_spp, _split
+
+
+def test_mean_is_weighted_by_sample_counts() -> None:
+    accumulator = _Accumulator(2, 2, 3)
+    accumulator.add(0, 0, np.full((2, 2, 3), 1.0, dtype=np.float32), 4)
+    accumulator.add(1, 0, np.full((2, 1, 3), 4.0, dtype=np.float32), 12)
+    mean = accumulator.mean()
+    np.testing.assert_allclose(mean[:, 0], 1.0)
+    np.testing.assert_allclose(mean[:, 1], (4 * 1.0 + 12 * 4.0) / 16)
+    np.testing.assert_array_equal(accumulator.samples, [[4, 16], [4, 16]])
+    np.testing.assert_array_equal(accumulator.batches, [[1, 2], [1, 2]])
+
+
+def test_relative_error_of_two_batches() -> None:
+    # With two batches of n samples of means a and b, the variance of the mean is estimated as (a - b)**2 / 4.
+    accumulator = _Accumulator(1, 1, 3)
+    accumulator.add(0, 0, np.full((1, 1, 3), 1.0, dtype=np.float32), 8)
+    accumulator.add(0, 0, np.full((1, 1, 3), 3.0, dtype=np.float32), 8)
+    np.testing.assert_allclose(accumulator.relative_error(0.0), [[(3.0 - 1.0) / 2 / 2.0]])
+
+
+def test_relative_error_ignores_channels_past_the_color() -> None:
+    accumulator = _Accumulator(1, 1, 4)
+    accumulator.add(0, 0, np.array([[[1.0, 1.0, 1.0, 0.0]]], dtype=np.float32), 8)
+    accumulator.add(0, 0, np.array([[[1.0, 1.0, 1.0, 9.0]]], dtype=np.float32), 8)
+    np.testing.assert_allclose(accumulator.relative_error(0.0), [[0.0]])
+
+
+def test_relative_error_of_a_single_batch_and_of_black_pixels_is_finite() -> None:
+    accumulator = _Accumulator(1, 2, 3)
+    accumulator.add(0, 0, np.zeros((1, 2, 3), dtype=np.float32), 8)
+    np.testing.assert_allclose(accumulator.relative_error(1e-3), [[0.0, 0.0]])
+
+
+@pytest.mark.parametrize("batch_spp", [(4, 4), (4, 12), (2, 6, 24)])
+def test_variance_estimate_is_unbiased(batch_spp: tuple[int, ...]) -> None:
+    # Batch means of n samples of standard deviation sigma have a standard deviation of sigma / sqrt(n).
+    (mu, sigma, pixels) = (10.0, 2.0, 256)
+    rng = np.random.default_rng(0)
+    accumulator = _Accumulator(pixels, pixels, 3)
+    for spp in batch_spp:
+        means = rng.normal(mu, sigma / np.sqrt(spp), size=(pixels, pixels, 1)).repeat(3, axis=2)
+        accumulator.add(0, 0, means.astype(np.float32), spp)
+    variance = np.square(accumulator.relative_error(0.0) * np.abs(accumulator.mean()[..., 0]))
+    assert np.mean(variance) == pytest.approx(sigma**2 / sum(batch_spp), rel=0.03)
+
+
+def test_split_covers_the_window() -> None:
+    tiles = _split((3, 5, 70, 40), 32)
+    assert tiles == [
+        (3, 5, 32, 32),
+        (35, 5, 32, 32),
+        (67, 5, 6, 32),
+        (3, 37, 32, 8),
+        (35, 37, 32, 8),
+        (67, 37, 6, 8),
+    ]
+
+
+@pytest.mark.parametrize(
+    ("error", "target", "taken", "max_spp", "extra"),
+    [
+        # Four times the samples halve the error; a round adds at most as many as were taken.
+        (0.04, 0.02, 16, 1024, 16),
+        # Slightly above the target: the fewest samples needed, rounded up to a power of two.
+        (0.021, 0.02, 16, 1024, 2),
+        # Never beyond the most samples a tile may take.
+        (0.04, 0.02, 16, 20, 4),
+    ],
+)
+def test_extra_spp(error: float, target: float, taken: int, max_spp: int, extra: int) -> None:
+    assert _extra_spp(error, target, taken, max_spp) == extra
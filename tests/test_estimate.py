@@ -0,0 +1,75 @@
+import itertools
+import math
+
+import pytest
+
+from mitsuba_wrapper.estimate import estimate, film_bytes, plan_tiles
+from mitsuba_wrapper.film import HDRFilm
+from mitsuba_wrapper.integrator import Path
+from mitsuba_wrapper.reconstruction_filter import BoxFilter, GaussianFilter, ReconstructionFilter, TentFilter
+from mitsuba_wrapper.roi import filter_radius, widen_by_filter
+from mitsuba_wrapper.sampler import Independent
+from mitsuba_wrapper.scene import Scene
+from mitsuba_wrapper.sensor import Perspective
+from mitsuba_wrapper.shape import Sphere
+
+VARIANT = "scalar_rgb"
+
+
+def make_scene(film: HDRFilm) -> Scene:
+    return Scene.model_validate({
+        "integrator": Path(),
+        "sensor": Perspective(film=film, sampler=Independent(sample_count=16)),
+        "ball": Sphere(),
+    })
+
+
+def fixed_bytes(scene: Scene) -> int:
+    result = estimate(scene, VARIANT)
+    return result.geometry_bytes + result.plugin_bytes
+
+
+def row_bytes(scene: Scene) -> int:
+    film = scene.sensor.film
+    (x, y, width, _) = film.crop_window
+    return film_bytes(film.cropped(x, y, width, 1), scene.integrator, scene.sensor.sampler.sample_count, VARIANT)
+
+
+def test_scene_which_fits_is_not_tiled() -> None:
+    scene = make_scene(HDRFilm(width=64, height=48))
+    assert plan_tiles(scene, fixed_bytes(scene) + 48 * row_bytes(scene), VARIANT) == [(0, 0, 64, 48)]
+
+
+@pytest.mark.parametrize("rfilter", [BoxFilter(), TentFilter(), GaussianFilter()], ids=lambda rfilter: rfilter.type)
+@pytest.mark.parametrize(
+    "film",
+    [HDRFilm(width=64, height=48), HDRFilm(width=64, height=48, crop_offset_x=8, crop_offset_y=5, crop_height=30)],
+    ids=["full", "cropped"],
+)
+def test_bands_cover_the_crop_window_and_fit_with_their_margin(film: HDRFilm, rfilter: ReconstructionFilter) -> None:
+    film = film.model_copy(update={"rfilter": rfilter})
+    scene = make_scene(film)
+    budget = fixed_bytes(scene) + 10 * row_bytes(scene)
+    tiles = plan_tiles(scene, budget, VARIANT)
+    (x, y, width, height) = film.crop_window
+    assert len(tiles) > 1
+    # Bands of whole rows, in order, without gaps or overlaps.
+    assert all((tile_x, tile_width) == (x, width) for (tile_x, _, tile_width, _) in tiles)
+    heights = [tile_height for (_, _, _, tile_height) in tiles]
+    assert [top for (_, top, _, _) in tiles] == list(itertools.accumulate(heights[:-1], initial=y))
+    assert sum(heights) == height
+    # Every band fits the budget once widened by the radius of the filter, as it is rendered.
+    margin = math.ceil(filter_radius(rfilter))
+    assert max(heights) == 10 - 2 * margin
+    for tile in tiles:
+        rendered = film.cropped(*widen_by_filter(film, tile))
+        spp = scene.sensor.sampler.sample_count
+        assert fixed_bytes(scene) + film_bytes(rendered, scene.integrator, spp, VARIANT) <= budget
+
+
+def test_scene_which_does_not_fit_one_row_at_a_time_is_rejected() -> None:
+    scene = make_scene(HDRFilm(width=64, height=48, rfilter=TentFilter()))
+    # A single row takes one more row above and below for the filter.
+    with pytest.raises(ValueError, match="one row at a time"):
+        _ = plan_tiles(scene, fixed_bytes(scene) + 2 * row_bytes(scene), VARIANT)
+    assert plan_tiles(scene, fixed_bytes(scene) + 3 * row_bytes(scene), VARIANT)[0] == (0, 0, 64, 1)
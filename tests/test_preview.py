@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from mitsuba_wrapper.film import HDRFilm
+from mitsuba_wrapper.integrator import Path
+from mitsuba_wrapper.preview import Level, preview_scene, upsample
+from mitsuba_wrapper.sampler import Independent
+from mitsuba_wrapper.scene import Scene
+from mitsuba_wrapper.sensor import Perspective
+from mitsuba_wrapper.shape import Sphere
+
+FILMS = [
+    HDRFilm(width=64, height=48),
+    HDRFilm(width=63, height=47),
+    HDRFilm(width=64, height=48).cropped(0, 0, 64, 48),
+    HDRFilm(width=64, height=48).cropped(3, 5, 37, 21),
+    HDRFilm(width=63, height=47).cropped(33, 29, 30, 18),
+]
+
+
+def make_scene(film: HDRFilm) -> Scene:
+    return Scene.model_validate({
+        "integrator": Path(),
+        "sensor": Perspective(film=film, sampler=Independent(sample_count=16)),
+        "ball": Sphere(),
+    })
+
+
+def test_upsample_repeats_pixels() -> None:
+    image = np.arange(6, dtype=np.float32).reshape(2, 3, 1)
+    expected = np.array([[0, 0, 1, 1, 2, 2], [0, 0, 1, 1, 2, 2], [3, 3, 4, 4, 5, 5], [3, 3, 4, 4, 5, 5]])
+    np.testing.assert_array_equal(upsample(image, 2, (0, 0, 6, 4))[..., 0], expected)
+
+
+@pytest.mark.parametrize("factor", [1, 2, 4, 8])
+@pytest.mark.parametrize("film", FILMS)
+def test_preview_covers_the_crop_window(film: HDRFilm, factor: int) -> None:
+    preview = preview_scene(make_scene(film), Level(factor, 1)).sensor.film
+    (x, y, width, height) = preview.crop_window
+    assert 0 <= x and x + width <= preview.width
+    assert 0 <= y and y + height <= preview.height
+    # Every pixel of the downscaled film is labelled with its index, and rendered through its crop window.
+    labels = np.arange(preview.width * preview.height, dtype=np.float32).reshape(preview.height, preview.width, 1)
+    image = upsample(labels[y : y + height, x : x + width], factor, film.crop_window)
+    # Each pixel of the original crop window shows the pixel of the downscaled film which covers it.
+    (x, y, width, height) = film.crop_window
+    (rows, columns) = np.mgrid[y : y + height, x : x + width]
+    np.testing.assert_array_equal(image[..., 0], labels[rows // factor, columns // factor, 0])
+
+
+@pytest.mark.parametrize("film", FILMS[:3])
+def test_preview_of_the_whole_film_is_not_cropped(film: HDRFilm) -> None:
+    preview = preview_scene(make_scene(film), Level(4, 1)).sensor.film
+    assert preview.crop_window == (0, 0, preview.width, preview.height)
+    assert (preview.crop_offset_x, preview.crop_offset_y, preview.crop_width, preview.crop_height) == (None,) * 4
+
+
+def test_preview_takes_the_samples_of_the_level() -> None:
+    level = Level(2, 4)
+    preview = preview_scene(make_scene(FILMS[0]), level)
+    assert preview.sensor.sampler.sample_count == level.spp
+    assert (preview.sensor.film.width, preview.sensor.film.height, preview.sensor.film.compensate) == (32, 24, False)
@@ -0,0 +1,57 @@
+import pytest
+
+from mitsuba_wrapper.sampler import Independent, LDSampler, MultiJitter, Orthogonal, Sampler, Stratified
+
+# The counts below were checked against the counts Mitsuba's samplers take (and the warnings they log when rounding).
+SAMPLERS: list[Sampler] = [Independent(), Stratified(), MultiJitter(), Orthogonal(), LDSampler()]
+
+
+@pytest.mark.parametrize(
+    ("sampler", "valid"),
+    [
+        (Independent(), [1, 2, 3, 10]),
+        (Stratified(), [1, 4, 9, 16, 25]),
+        (MultiJitter(), [1, 2, 3, 4, 6, 8, 9, 12, 15, 24]),
+        (Orthogonal(), [4, 9, 25, 49]),
+        (LDSampler(), [4, 16, 64]),
+    ],
+)
+def test_valid_sample_counts(sampler: Sampler, valid: list[int]) -> None:
+    for count in valid:
+        assert sampler.valid_sample_count(count) == count
+        assert sampler.valid_sample_count(count, round_up=False) == count
+        assert sampler.with_sample_count(count).sample_count == count
+
+
+@pytest.mark.parametrize(
+    ("sampler", "count", "up", "down"),
+    [
+        (Stratified(), 10, 16, 9),
+        (MultiJitter(), 10, 12, 9),
+        (MultiJitter(), 13, 15, 12),
+        (MultiJitter(), 16, 16, 16),
+        (Orthogonal(), 10, 25, 9),
+        (Orthogonal(), 2, 4, 4),
+        (LDSampler(), 5, 16, 4),
+        (LDSampler(), 1, 4, 4),
+    ],
+)
+def test_rounding(sampler: Sampler, count: int, up: int, down: int) -> None:
+    assert sampler.valid_sample_count(count) == up
+    assert sampler.valid_sample_count(count, round_up=False) == down
+
+
+@pytest.mark.parametrize(("sampler", "count"), [(Stratified(), 10), (MultiJitter(), 10), (LDSampler(), 5)])
+def test_invalid_sample_count_is_rejected(sampler: Sampler, count: int) -> None:
+    with pytest.raises(ValueError, match="cannot take"):
+        _ = sampler.model_validate({**dict(sampler), "sample_count": count})
+
+
+@pytest.mark.parametrize("sampler", SAMPLERS, ids=lambda sampler: sampler.type)
+@pytest.mark.parametrize("round_up", [True, False])
+def test_with_sample_count_is_valid(sampler: Sampler, round_up: bool) -> None:
+    for count in range(1, 300):
+        rounded = sampler.with_sample_count(count, round_up)
+        assert rounded.valid_sample_count(rounded.sample_count) == rounded.sample_count
+        if round_up:
+            assert rounded.sample_count >= count